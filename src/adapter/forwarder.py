@@ -0,0 +1,450 @@
+"""
+src/adapter/forwarder.py
+Batched forwarding of processed tracks to downstream (C2) consumers.
+
+`Forwarder.submit` appends a track to the current batch. A batch is closed
+when it holds `batch_max` tracks or `linger_s` after its first track,
+encoded once (`common.codec`, JSON or binary) and queued for every
+endpoint:
+
+  tcp://host:port  `connections` persistent connections per endpoint, each
+                   a writer task taking batches off the endpoint's queue and
+                   writing them length-prefixed; a failed connection is
+                   re-opened with exponential backoff (with jitter) and its
+                   unsent batch goes back to the front of the queue;
+  udp://host:port  one datagram per batch.
+
+The connections of an endpoint share its queue, so batches keep their order
+per connection only: with `connections > 1` a consumer may see a newer
+update of a track before an older one and should order by `ts` (or run with
+one connection). A TCP writer notices the peer closing while idle or
+between batches, and on Linux also re-queues the batches the peer's kernel
+had not acknowledged when the connection dropped. Delivery is therefore
+at least once for a consumer that closes cleanly, but with no
+application-level acknowledgement, data a consumer received and never read
+(a crash, a reset) is still lost.
+
+Each endpoint queue is bounded by `buffer_tracks`: when a consumer is slow or
+down, the oldest batches are dropped (a C2 display wants fresh tracks) and
+counted. Exported per endpoint: queued tracks, open connections, tracks and
+bytes written, dropped tracks by reason; plus the time from a batch's first
+track to its write.
+"""
+
+import asyncio
+import logging
+import random
+import struct
+from collections import deque
+from typing import Deque, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from prometheus_client import Gauge
+
+from common.codec import ENCODINGS, LENGTH, MAX_BATCH, encodable, encode_tracks
+from common.metrics import LocalCounter, LocalHistogram
+from common.ratelog import RateLimitedLog
+from common.records import AnyTrack
+
+try:  # unacknowledged bytes in a TCP send queue (Linux)
+    import fcntl
+    import termios
+
+    _TIOCOUTQ: Optional[int] = termios.TIOCOUTQ
+except (ImportError, AttributeError):
+    _TIOCOUTQ = None
+
+log = logging.getLogger("ingest")
+
+SCHEMES = ("tcp", "udp")
+MAX_UDP_PAYLOAD = 65507
+
+FORWARD_TRACKS_TOTAL = LocalCounter(
+    "radar_forward_tracks_total",
+    "Tracks written to a downstream endpoint",
+    labelnames=("endpoint",),
+)
+FORWARD_BYTES_TOTAL = LocalCounter(
+    "radar_forward_bytes_total",
+    "Bytes written to a downstream endpoint (including framing)",
+    labelnames=("endpoint",),
+)
+FORWARD_DROPPED_TOTAL = LocalCounter(
+    "radar_forward_dropped_tracks_total",
+    "Tracks not forwarded: overflow (queue full), oversize (UDP), closed or "
+    "unencodable (e.g. an id past uint64 in binary)",
+    labelnames=("endpoint", "reason"),
+)
+FORWARD_QUEUE_TRACKS = Gauge(
+    "radar_forward_queue_tracks",
+    "Tracks queued for a downstream endpoint",
+    labelnames=("endpoint",),
+)
+FORWARD_CONNECTIONS = Gauge(
+    "radar_forward_connections",
+    "Open TCP connections to a downstream endpoint",
+    labelnames=("endpoint",),
+)
+FORWARD_LATENCY = LocalHistogram(
+    "radar_forward_latency_seconds",
+    "Time from a batch's first track to its write to an endpoint",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class Endpoint(NamedTuple):
+    scheme: str
+    host: str
+    port: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.scheme}://{self.host}:{self.port}"
+
+
+def parse_endpoints(spec: str) -> List[Endpoint]:
+    """`"tcp://10.0.0.9:7000,udp://10.0.0.9:7001"` -> endpoints."""
+    endpoints = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        scheme, sep, rest = item.partition("://")
+        host, _, port = rest.rpartition(":")
+        if not sep or scheme not in SCHEMES or not host or not port.isdigit():
+            raise ValueError(
+                f"expected tcp://host:port or udp://host:port, got {item!r}"
+            )
+        endpoints.append(Endpoint(scheme, host.strip("[]"), int(port)))
+    return endpoints
+
+
+class Batch(NamedTuple):
+    body: bytes
+    tracks: int
+    started: float  # loop time of the batch's first track
+
+
+class EndpointQueue:
+    """Bounded FIFO of encoded batches for one endpoint; drops oldest on overflow."""
+
+    def __init__(self, endpoint: Endpoint, max_tracks: int):
+        self.endpoint = endpoint
+        self.max_tracks = max_tracks
+        self.tracks = 0
+        self._batches: Deque[Batch] = deque()
+        self._ready = asyncio.Event()
+        label = endpoint.label
+        self._depth = FORWARD_QUEUE_TRACKS.labels(endpoint=label)
+        self._overflow = FORWARD_DROPPED_TOTAL.labels(endpoint=label, reason="overflow")
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    def put(self, batch: Batch) -> None:
+        self._batches.append(batch)
+        self.tracks += batch.tracks
+        while self.tracks > self.max_tracks and len(self._batches) > 1:
+            old = self._batches.popleft()
+            self.tracks -= old.tracks
+            self._overflow.inc(old.tracks)
+        self._depth.set(self.tracks)
+        self._ready.set()
+
+    def put_back(self, batch: Batch) -> None:
+        """Return an unsent batch to the front (dropped if the queue is full)."""
+        if self.tracks + batch.tracks > self.max_tracks:
+            self._overflow.inc(batch.tracks)
+            return
+        self._batches.appendleft(batch)
+        self.tracks += batch.tracks
+        self._depth.set(self.tracks)
+        self._ready.set()
+
+    async def get(self) -> Batch:
+        while not self._batches:
+            self._ready.clear()
+            await self._ready.wait()
+        batch = self._batches.popleft()
+        self.tracks -= batch.tracks
+        self._depth.set(self.tracks)
+        return batch
+
+    def clear(self) -> int:
+        """Drop everything still queued; returns the number of tracks dropped."""
+        dropped = self.tracks
+        self._batches.clear()
+        self.tracks = 0
+        self._depth.set(0)
+        return dropped
+
+
+def _unacked_bytes(writer: asyncio.StreamWriter) -> int:
+    """Bytes written to `writer` that the peer has not acknowledged yet."""
+    n = writer.transport.get_write_buffer_size()
+    sock = writer.get_extra_info("socket")
+    fd = sock.fileno() if sock is not None else -1
+    if _TIOCOUTQ is not None and fd >= 0:  # -1 once the transport has closed
+        try:
+            n += struct.unpack("i", fcntl.ioctl(fd, _TIOCOUTQ, b"\0\0\0\0"))[0]
+        except OSError:
+            pass
+    return n
+
+
+async def _until_closed(reader: asyncio.StreamReader) -> None:
+    """Read and discard what the peer sends; return when it closes."""
+    try:
+        while await reader.read(1 << 16):
+            pass
+    except (OSError, ConnectionError):
+        pass
+
+
+class Forwarder:
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        encoding: str = "json",
+        batch_max: int = 256,
+        linger_s: float = 0.05,
+        buffer_tracks: int = 10_000,
+        connections: int = 2,
+        backoff_min_s: float = 0.1,
+        backoff_max_s: float = 5.0,
+        connect_timeout_s: float = 5.0,
+    ):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+        if not 1 <= batch_max <= MAX_BATCH:
+            raise ValueError(f"batch_max must be in 1..{MAX_BATCH}")
+        if connections < 1:
+            raise ValueError("connections must be >= 1")
+        self.endpoints = list(endpoints)
+        self.encoding = encoding
+        self.batch_max = batch_max
+        self.linger_s = linger_s
+        self.buffer_tracks = buffer_tracks
+        self.connections = connections
+        self.backoff_min_s = backoff_min_s
+        self.backoff_max_s = backoff_max_s
+        self.connect_timeout_s = connect_timeout_s
+        self.queues: List[EndpointQueue] = []
+        self._batch: List[AnyTrack] = []
+        self._started = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._error_log = RateLimitedLog(log, interval_s=5.0, burst=1)
+
+    def start(self) -> None:
+        """Open the endpoints; call from the event loop that will submit."""
+        self._loop = asyncio.get_running_loop()
+        for ep in self.endpoints:
+            q = EndpointQueue(ep, self.buffer_tracks)
+            self.queues.append(q)
+            if ep.scheme == "tcp":
+                for _ in range(self.connections):
+                    self._workers.append(asyncio.create_task(self._tcp_worker(q)))
+            else:
+                self._workers.append(asyncio.create_task(self._udp_worker(q)))
+        log.info(
+            "forwarding %s batches of up to %d tracks to %s",
+            self.encoding,
+            self.batch_max,
+            ", ".join(ep.label for ep in self.endpoints),
+        )
+
+    def tune(
+        self,
+        batch_max: Optional[int] = None,
+        linger_s: Optional[float] = None,
+        buffer_tracks: Optional[int] = None,
+    ) -> None:
+        """Change batching and buffering while running; endpoints stay open."""
+        if batch_max is not None:
+            if not 1 <= batch_max <= MAX_BATCH:
+                raise ValueError(f"batch_max must be in 1..{MAX_BATCH}")
+            self.batch_max = batch_max
+            if len(self._batch) >= batch_max:
+                self.flush()
+        if linger_s is not None:
+            self.linger_s = linger_s  # from the next batch on
+        if buffer_tracks is not None:
+            self.buffer_tracks = buffer_tracks
+            for q in self.queues:
+                q.max_tracks = buffer_tracks  # trimmed on the next put
+
+    # ---- batching (event loop) -----------------------------------------------
+
+    def submit(self, track: AnyTrack) -> None:
+        batch = self._batch
+        batch.append(track)
+        if len(batch) >= self.batch_max:
+            self.flush()
+        elif len(batch) == 1:
+            self._open_batch()
+
+    def submit_many(self, tracks: Iterable[AnyTrack]) -> None:
+        for track in tracks:
+            self.submit(track)
+
+    def _open_batch(self) -> None:
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("Forwarder.start() was not called")
+        self._started = loop.time()
+        self._timer = loop.call_later(self.linger_s, self.flush)
+
+    def flush(self) -> None:
+        """Close the current batch and queue it for every endpoint."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        tracks = self._batch
+        if not tracks:
+            return
+        try:
+            data = encode_tracks(tracks, self.encoding)
+        except (struct.error, OverflowError):
+            # A track out of the encoding's range: count it, send the rest
+            self._batch = [t for t in tracks if encodable(t, self.encoding)]
+            self._drop_unencodable(len(tracks) - len(self._batch))
+            return self.flush()
+        self._batch = []
+        batch = Batch(data, len(tracks), self._started)
+        for q in self.queues:
+            q.put(batch)
+
+    def _drop_unencodable(self, n: int) -> None:
+        for q in self.queues:
+            FORWARD_DROPPED_TOTAL.labels(
+                endpoint=q.endpoint.label, reason="unencodable"
+            ).inc(n)
+        self._error_log.error(
+            "encode", "dropped %d tracks %s cannot encode", n, self.encoding
+        )
+
+    async def close(self, timeout_s: float = 2.0) -> None:
+        """Flush, give the writers `timeout_s` to empty the queues, then stop."""
+        self.flush()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        while any(q.tracks for q in self.queues) and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        for q in self.queues:
+            dropped = q.clear()
+            if dropped:
+                FORWARD_DROPPED_TOTAL.labels(
+                    endpoint=q.endpoint.label, reason="closed"
+                ).inc(dropped)
+
+    # ---- writers ---------------------------------------------------------------
+
+    async def _tcp_worker(self, q: EndpointQueue) -> None:
+        ep = q.endpoint
+        label = ep.label
+        connected = FORWARD_CONNECTIONS.labels(endpoint=label)
+        tracks_out = FORWARD_TRACKS_TOTAL.labels(endpoint=label)
+        bytes_out = FORWARD_BYTES_TOTAL.labels(endpoint=label)
+        loop = asyncio.get_running_loop()
+        backoff = self.backoff_min_s
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ep.host, ep.port),
+                    self.connect_timeout_s,
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self._error_log.error(
+                    label, "forward: cannot connect to %s: %s", label, e or "timeout"
+                )
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.backoff_max_s)
+                continue
+            backoff = self.backoff_min_s
+            connected.inc()
+            closed = asyncio.ensure_future(_until_closed(reader))
+            # (end offset, batch) written here and maybe not yet acknowledged
+            sent: Deque[Tuple[int, Batch]] = deque()
+            written = 0
+            batch = None
+            try:
+                while True:
+                    if q:
+                        batch = await q.get()  # does not yield: let the loop
+                        await asyncio.sleep(0)  # see a close from the peer
+                    else:
+                        # Idle: wake for the next batch or for the peer closing
+                        getter = asyncio.ensure_future(q.get())
+                        try:
+                            await asyncio.wait(
+                                (getter, closed), return_when=asyncio.FIRST_COMPLETED
+                            )
+                        finally:
+                            waiting = not getter.done()
+                            if waiting:
+                                getter.cancel()  # nothing was taken off the queue
+                        if waiting:
+                            raise ConnectionResetError("closed by peer")
+                        batch = getter.result()
+                    if closed.done():
+                        raise ConnectionResetError("closed by peer")
+                    writer.write(LENGTH.pack(len(batch.body)))
+                    writer.write(batch.body)
+                    await writer.drain()
+                    written += LENGTH.size + len(batch.body)
+                    tracks_out.inc(batch.tracks)
+                    bytes_out.inc(LENGTH.size + len(batch.body))
+                    FORWARD_LATENCY.observe(loop.time() - batch.started)
+                    sent.append((written, batch))
+                    batch = None
+                    acked = written - _unacked_bytes(writer)
+                    while sent and sent[0][0] <= acked:
+                        sent.popleft()
+            except (OSError, ConnectionError) as e:
+                self._error_log.error(
+                    label, "forward: connection to %s lost: %s", label, e
+                )
+                if batch is not None:
+                    q.put_back(batch)
+                # Written but never acknowledged: send again on a new connection
+                acked = written - _unacked_bytes(writer)
+                for end, unacked in reversed(sent):
+                    if end > acked:
+                        q.put_back(unacked)
+            finally:
+                closed.cancel()
+                connected.dec()
+                writer.close()
+
+    async def _udp_worker(self, q: EndpointQueue) -> None:
+        ep = q.endpoint
+        label = ep.label
+        tracks_out = FORWARD_TRACKS_TOTAL.labels(endpoint=label)
+        bytes_out = FORWARD_BYTES_TOTAL.labels(endpoint=label)
+        oversize = FORWARD_DROPPED_TOTAL.labels(endpoint=label, reason="oversize")
+        loop = asyncio.get_running_loop()
+        backoff = self.backoff_min_s
+        while True:
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    asyncio.DatagramProtocol, remote_addr=(ep.host, ep.port)
+                )
+                break
+            except OSError as e:
+                self._error_log.error(label, "forward: cannot open %s: %s", label, e)
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.backoff_max_s)
+        try:
+            while True:
+                batch = await q.get()
+                if len(batch.body) > MAX_UDP_PAYLOAD:
+                    oversize.inc(batch.tracks)
+                    continue
+                transport.sendto(batch.body)
+                tracks_out.inc(batch.tracks)
+                bytes_out.inc(len(batch.body))
+                FORWARD_LATENCY.observe(loop.time() - batch.started)
+        finally:
+            transport.close()
@@ -0,0 +1,224 @@
+"""
+src/adapter/handoff.py
+Zero-downtime restart: hand the bound UDP socket to a successor process.
+
+Closing the UDP socket on restart (R-REL-052) drops every datagram sent
+while no process is bound. Instead, the running process listens on a Unix
+control socket; a new process started with the same path connects and
+
+  1. receives the UDP socket's file descriptor (SCM_RIGHTS) and starts
+     reading from it; both processes now share one kernel receive queue;
+  2. tells the old process it is reading; the old process stops reading,
+     processes what it already received, and sends its state (the active
+     track table, see `TrackTable.export_state`) as one JSON message;
+  3. merges that state, then takes over the control socket path for the
+     next restart, while the old process exits.
+
+No datagram is lost: the socket is never closed, and anything queued after
+the old process stopped reading is read by the new one.
+
+Wire format on the control socket: 4-byte big-endian length + JSON object.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+log = logging.getLogger("ingest")
+
+_LEN = struct.Struct(">I")
+MAX_MESSAGE = 64 << 20
+TIMEOUT_S = 10.0
+
+
+def send_msg(conn: socket.socket, obj: Dict[str, Any], fds: Sequence[int] = ()) -> None:
+    body = json.dumps(obj, separators=(",", ":")).encode()
+    frame = _LEN.pack(len(body)) + body
+    if fds:
+        # Ancillary data rides on the first bytes; send those with the fds
+        socket.send_fds(conn, [frame[: _LEN.size]], list(fds))
+        conn.sendall(frame[_LEN.size :])
+    else:
+        conn.sendall(frame)
+
+
+def recv_msg(conn: socket.socket, maxfds: int = 0):
+    """One framed message as (obj, fds)."""
+    if maxfds:
+        head, fds, _, _ = socket.recv_fds(conn, _LEN.size, maxfds)
+        head += _recv_exact(conn, _LEN.size - len(head))
+    else:
+        head, fds = _recv_exact(conn, _LEN.size), []
+    (size,) = _LEN.unpack(head)
+    if size > MAX_MESSAGE:
+        raise ValueError(f"handoff message too large ({size} bytes)")
+    return json.loads(_recv_exact(conn, size)), fds
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("handoff peer closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+def _expect(obj: Dict[str, Any], op: str) -> Dict[str, Any]:
+    if obj.get("op") != op:
+        raise ValueError(f"handoff: expected {op!r}, got {obj.get('op')!r}")
+    return obj
+
+
+# ---- successor (new process) ------------------------------------------------
+
+
+class Takeover:
+    """A UDP socket inherited from a predecessor, pending its state."""
+
+    def __init__(self, conn: socket.socket, sock: socket.socket, peer_pid: int):
+        self.conn = conn
+        self.sock = sock
+        self.peer_pid = peer_pid
+
+    async def finish(self, import_state: Callable[[List[Any]], int]) -> int:
+        """
+        Tell the predecessor we are reading (it stops and drains), then merge
+        the track state it sends. Returns the number of tracks taken over.
+        """
+
+        def exchange() -> Dict[str, Any]:
+            send_msg(self.conn, {"op": "reading", "pid": os.getpid()})
+            return _expect(recv_msg(self.conn)[0], "state")
+
+        try:
+            state = await asyncio.to_thread(exchange)
+        finally:
+            self.conn.close()
+        taken = import_state(state.get("tracks", []))
+        log.info("handoff: took over %d tracks from pid %d", taken, self.peer_pid)
+        return taken
+
+
+async def take_over(path: str) -> Optional[Takeover]:
+    """
+    Connect to a running predecessor at `path` and inherit its UDP socket.
+    Returns None if nobody is listening there (a normal cold start).
+    """
+
+    def connect() -> Optional[Takeover]:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(TIMEOUT_S)
+        try:
+            conn.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            conn.close()
+            return None
+        try:
+            send_msg(conn, {"op": "takeover", "pid": os.getpid()})
+            obj, fds = recv_msg(conn, maxfds=1)
+            _expect(obj, "socket")
+            if len(fds) != 1:
+                raise ValueError("handoff: no socket received")
+        except BaseException:
+            conn.close()
+            raise
+        sock = socket.socket(fileno=fds[0])
+        return Takeover(conn, sock, int(obj.get("pid", 0)))
+
+    takeover = await asyncio.to_thread(connect)
+    if takeover is not None:
+        log.info(
+            "handoff: inherited UDP socket %s from pid %d",
+            takeover.sock.getsockname(),
+            takeover.peer_pid,
+        )
+    return takeover
+
+
+# ---- predecessor (running process) ------------------------------------------
+
+
+class HandoffResult(NamedTuple):
+    peer_pid: int
+    tracks: int
+
+
+async def serve_handoff(
+    path: str,
+    sock: socket.socket,
+    stop: Callable[[], Awaitable[None]],
+    export_state: Callable[[], List[Any]],
+) -> HandoffResult:
+    """
+    Listen on `path` until a successor takes over `sock`. Once it is reading,
+    `stop()` must stop ingest and process everything already received; then
+    `export_state()` is sent over. Returns when the handoff is complete; the
+    caller should then exit. A failed attempt is logged and listening resumes.
+    """
+    loop = asyncio.get_running_loop()
+    listener = _listen(path)
+    try:
+        while True:
+            conn, _ = await loop.sock_accept(listener)
+            conn.setblocking(True)
+            conn.settimeout(TIMEOUT_S)
+
+            def hand_socket() -> int:
+                obj = _expect(recv_msg(conn)[0], "takeover")
+                send_msg(
+                    conn,
+                    {"op": "socket", "pid": os.getpid()},
+                    fds=[sock.fileno()],
+                )
+                _expect(recv_msg(conn)[0], "reading")
+                return int(obj.get("pid", 0))
+
+            try:
+                peer = await asyncio.to_thread(hand_socket)
+            except (OSError, ValueError) as e:
+                log.error("handoff attempt failed, still serving: %s", e)
+                conn.close()
+                continue
+            break
+
+        # The successor owns the path from here on
+        listener.close()
+        listener = None
+        _unlink(path)
+        log.info("handoff: pid %d is reading; draining", peer)
+        await stop()
+        tracks = export_state()
+        try:
+            await asyncio.to_thread(send_msg, conn, {"op": "state", "tracks": tracks})
+        except OSError as e:
+            log.error("handoff: could not send state to pid %d: %s", peer, e)
+        finally:
+            conn.close()
+        log.info("handoff: complete, handed %d tracks to pid %d", len(tracks), peer)
+        return HandoffResult(peer, len(tracks))
+    finally:
+        if listener is not None:
+            listener.close()
+            _unlink(path)
+
+
+def _listen(path: str) -> socket.socket:
+    _unlink(path)  # stale path from a process that did not exit cleanly
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+    listener.setblocking(False)
+    return listener
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
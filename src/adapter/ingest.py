@@ -3,13 +3,21 @@ src/ingest.py
 UDP ingest module for receiving and parsing radar track data packets.
 """
 
-import asyncio # type: ignore
-import logging # type: ignore
-from typing import Callable # type: ignore
+import asyncio  # type: ignore
+import logging  # type: ignore
+import socket
+import time
+from typing import Callable, Optional, Set  # type: ignore
 
-from prometheus_client import Counter # type: ignore
+from common.metrics import LocalCounter
+from common.ratelog import RateLimitedLog
 
-from .parser import parse_packet, Parsed # type: ignore
+from .overload import OverloadController
+from .parser import parse_packet, Parsed  # type: ignore
+from .peek import HEALTH, classify
+from .prefilter import PreFilter
+from .sequence import SequenceTracker, peek_seq
+from .validation import ValidationPolicy
 
 
 log = logging.getLogger("ingest")
@@ -19,37 +27,205 @@ logging.basicConfig(
 
 Handler = Callable[[Parsed], None]
 
-# Prometheus counters for ingest path
-INGEST_PACKETS_TOTAL = Counter(
+# Prometheus counters for ingest path (lock-free, exported at scrape time)
+INGEST_PACKETS_TOTAL = LocalCounter(
     "radar_ingest_packets_total", "Total UDP datagrams received"
 )
-PARSE_ERRORS_TOTAL = Counter(
+PARSE_ERRORS_TOTAL = LocalCounter(
     "radar_parse_errors_total", "Total UDP datagrams that failed to parse"
 )
 
 
 class UdpIngest(asyncio.DatagramProtocol):
-    def __init__(self, handler: Handler):
+    def __init__(
+        self,
+        handler: Handler,
+        records: bool = False,
+        overload: Optional[OverloadController] = None,
+        sequencer: Optional[SequenceTracker] = None,
+        validation: Optional[ValidationPolicy] = None,
+        prefilter: Optional[PreFilter] = None,
+    ):
         self.handler = handler
+        self.records = records  # hand TrackRecords (not pydantic Tracks) to handler
+        self.overload = overload
+        self.sequencer = sequencer
+        self.validation = validation
+        self.prefilter = prefilter
+        if sequencer is not None:
+            sequencer.deliver = self._dispatch
+        self._release_scheduled = False
+        self._expiry_scheduled = False
+        self._tasks: Set[asyncio.Task] = set()  # in flight; strong refs for drain()
+        # Bind counter cells once; the hot path is then a plain increment
+        self._ingested = INGEST_PACKETS_TOTAL.labels()
+        self._parse_errors = PARSE_ERRORS_TOTAL.labels()
+        self._error_log = RateLimitedLog(log)
 
     def datagram_received(self, data: bytes, addr):
         # Count every datagram as soon as it arrives
-        INGEST_PACKETS_TOTAL.inc()
-        asyncio.create_task(self._process(data, addr))
+        self._ingested.inc()
+        prefilter = self.prefilter
+        if prefilter is not None:
+            data = prefilter.check(data, addr)
+            if data is None:
+                return
+        sequencer = self.sequencer
+        if sequencer is not None:
+            seq = peek_seq(data)
+            if seq is not None:
+                # Dedup / reorder; in-order packets come back via _dispatch
+                source = sequencer.source_for(data, addr)
+                sequencer.push(source, seq, data, addr, time.monotonic())
+                if sequencer.held and not self._expiry_scheduled:
+                    self._expiry_scheduled = True
+                    asyncio.get_running_loop().call_later(
+                        sequencer.max_delay_s, self._expire_sequences
+                    )
+                return
+        self._dispatch(data, addr)
 
-    async def _process(self, data: bytes, addr):
+    def _expire_sequences(self):
+        self._expiry_scheduled = False
+        if self.sequencer is None:
+            return
+        self.sequencer.expire(time.monotonic())
+        if self.sequencer.held:
+            self._expiry_scheduled = True
+            asyncio.get_running_loop().call_later(
+                self.sequencer.max_delay_s, self._expire_sequences
+            )
+
+    def _dispatch(self, data: bytes, addr):
+        overload = self.overload
+        if overload is None:
+            self._spawn(self._process(data, addr))
+            return
+
+        kind = classify(data)
+        if overload.shedding and kind == HEALTH:
+            # Health jumps the backlog of queued track tasks
+            self._handle(data, addr)
+        elif overload.admit(kind, data, addr):
+            self._spawn(self._process(data, addr, time.monotonic()))
+        elif overload.held and not self._release_scheduled:
+            self._release_scheduled = True
+            asyncio.get_running_loop().call_later(
+                overload.decimate_interval_s, self._release_held
+            )
+
+    def _release_held(self):
+        self._release_scheduled = False
+        if self.overload is None:
+            return
+        now = time.monotonic()
+        for data, addr in self.overload.take_held():
+            self._spawn(self._process(data, addr, now))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """
+        Process everything already received: packets held for reordering or
+        decimation are released, then in-flight tasks are awaited.
+        """
+        if self.sequencer is not None and self.sequencer.held:
+            self.sequencer.expire(float("inf"))
+        if self.overload is not None and self.overload.held:
+            self._release_held()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _process(self, data: bytes, addr, received_at: Optional[float] = None):
+        if received_at is not None and self.overload is not None:
+            self.overload.observe_delay(time.monotonic() - received_at)
+        self._handle(data, addr)
+
+    def _handle(self, data: bytes, addr):
+        policy = self.validation
+        msg = None
         try:
-            msg = parse_packet(data)
+            if policy is None:
+                msg = parse_packet(data, records=self.records)
+            else:
+                source = policy.source_for(data, addr)
+                msg = parse_packet(
+                    data,
+                    records=self.records,
+                    validation=policy.validation_for(source),
+                )
             self.handler(msg)
         except Exception as e:
-            PARSE_ERRORS_TOTAL.inc()
-            log.error("parse error from %s: %s", addr, e)
+            self._parse_errors.inc()
+            self._error_log.error("parse", "parse error from %s: %s", addr, e)
+            if policy is not None and msg is None:
+                policy.failed(source)  # the packet, not the handler, was bad
+
+
+BACKENDS = ("asyncio", "threaded")
 
 
-async def run_udp_ingest(handler: Handler, host: str = "0.0.0.0", port: int = 9999):
+async def run_udp_ingest(
+    handler: Handler,
+    host: str = "0.0.0.0",
+    port: int = 9999,
+    records: bool = False,
+    overload: Optional[OverloadController] = None,
+    sequencer: Optional[SequenceTracker] = None,
+    validation: Optional[ValidationPolicy] = None,
+    prefilter: Optional[PreFilter] = None,
+    backend: str = "asyncio",
+    reader_threads: int = 1,
+    sock: Optional[socket.socket] = None,
+    reader_batch: int = 256,
+):
+    """
+    Receive on host:port until cancelled. `backend="threaded"` reads on
+    `reader_threads` OS threads instead of the loop (see `adapter.reader`),
+    each handing up to `reader_batch` datagrams to the loop at a time.
+    An already bound `sock` (e.g. inherited on restart) is used instead of
+    binding host:port. A `prefilter` rejects bad datagrams before they are
+    parsed. On cancellation, whatever was already received is processed
+    before returning.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if backend == "threaded":
+        if overload is not None:
+            raise ValueError("overload shedding requires the asyncio backend")
+        await _run_threaded(
+            handler,
+            host,
+            port,
+            records,
+            sequencer,
+            validation,
+            prefilter,
+            reader_threads,
+            sock,
+            reader_batch,
+        )
+        return
+
     loop = asyncio.get_running_loop()
-    transport, _ = await loop.create_datagram_endpoint(
-        lambda: UdpIngest(handler), local_addr=(host, port)
+    if sock is None:
+        endpoint = {"local_addr": (host, port)}
+    else:
+        endpoint = {"sock": sock}
+        host, port = sock.getsockname()[:2]
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: UdpIngest(
+            handler,
+            records=records,
+            overload=overload,
+            sequencer=sequencer,
+            validation=validation,
+            prefilter=prefilter,
+        ),
+        **endpoint,
     )
     log.info("UDP ingest listening on %s:%d", host, port)
     try:
@@ -57,3 +233,44 @@ async def run_udp_ingest(handler: Handler, host: str = "0.0.0.0", port: int = 99
             await asyncio.sleep(3600)
     finally:
         transport.close()
+        await protocol.drain()
+
+
+async def _run_threaded(
+    handler,
+    host,
+    port,
+    records,
+    sequencer,
+    validation,
+    prefilter,
+    threads,
+    sock,
+    batch_max=256,
+):
+    from .reader import ThreadedUdpReader, bind_udp
+
+    if sock is None:
+        sock = bind_udp(host, port)
+    else:
+        host, port = sock.getsockname()[:2]
+    reader = ThreadedUdpReader(
+        sock,
+        handler,
+        asyncio.get_running_loop(),
+        records=records,
+        threads=threads,
+        batch_max=batch_max,
+        sequencer=sequencer,
+        validation=validation,
+        prefilter=prefilter,
+    )
+    reader.start()
+    log.info("UDP ingest listening on %s:%d (threaded)", host, port)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        reader.stop()
+        sock.close()
+        await asyncio.sleep(0)  # run batches the readers posted before stopping
@@ -0,0 +1,128 @@
+"""
+src/adapter/overload.py
+Priority-aware load shedding for the UDP ingest path.
+
+The controller watches queue delay (datagram receipt -> start of processing)
+as an EWMA and switches shedding on above `on_delay_s` and off again below
+`off_delay_s`. While shedding:
+
+  - health packets are never shed and are processed ahead of the backlog
+    (they drive RADAR_MODE and fault detection);
+  - track and frame packets are shed according to the policy:
+      "sample"  keep 1 in `keep_one_in` packets;
+      "latest"  per-track-id decimation: hold only the newest packet per id
+                and release the survivors every `decimate_interval_s`
+                (frames, which carry many ids, fall back to sampling).
+
+Classification uses `adapter.peek` on raw bytes, so a shed packet is never
+JSON-decoded.
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+from prometheus_client import Gauge
+
+from common.metrics import LocalCounter
+
+from .peek import FRAME, HEALTH, TRACK, track_id
+
+log = logging.getLogger("ingest")
+
+POLICIES = ("sample", "latest")
+
+SHED_PACKETS_TOTAL = LocalCounter(
+    "radar_shed_packets_total",
+    "UDP datagrams dropped by the overload controller, by kind",
+    labelnames=("kind",),
+)
+OVERLOAD_ACTIVE = Gauge(
+    "radar_overload_active", "1 while the ingest overload controller is shedding"
+)
+QUEUE_DELAY_S = Gauge(
+    "radar_ingest_queue_delay_seconds",
+    "Smoothed delay from datagram receipt to processing (EWMA)",
+)
+
+
+class OverloadController:
+    def __init__(
+        self,
+        policy: str = "sample",
+        keep_one_in: int = 4,
+        on_delay_s: float = 0.05,
+        off_delay_s: float = 0.01,
+        alpha: float = 0.1,
+        decimate_interval_s: float = 0.1,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        if keep_one_in < 1:
+            raise ValueError("keep_one_in must be >= 1")
+        if off_delay_s > on_delay_s:
+            raise ValueError("off_delay_s must not exceed on_delay_s")
+        self.policy = policy
+        self.keep_one_in = keep_one_in
+        self.on_delay_s = on_delay_s
+        self.off_delay_s = off_delay_s
+        self.alpha = alpha
+        self.decimate_interval_s = decimate_interval_s
+
+        self.shedding = False
+        self.delay_s = 0.0
+        self._seq = 0
+        self._samples = 0
+        self._latest: Dict[int, Tuple[bytes, object]] = {}
+        self._shed = {k: SHED_PACKETS_TOTAL.labels(kind=k) for k in (TRACK, FRAME)}
+
+    def observe_delay(self, delay_s: float) -> None:
+        """Feed one queue-delay sample; toggles shedding with hysteresis."""
+        self.delay_s += self.alpha * (delay_s - self.delay_s)
+        self._samples += 1
+        if not self._samples & 63:  # keep the gauge's lock off the per-packet path
+            QUEUE_DELAY_S.set(self.delay_s)
+        if not self.shedding and self.delay_s > self.on_delay_s:
+            self._set_shedding(True)
+        elif self.shedding and self.delay_s < self.off_delay_s:
+            self._set_shedding(False)
+
+    def _set_shedding(self, on: bool) -> None:
+        self.shedding = on
+        OVERLOAD_ACTIVE.set(1 if on else 0)
+        QUEUE_DELAY_S.set(self.delay_s)
+        log.warning(
+            "overload shedding %s (queue delay %.1f ms, policy=%s)",
+            "ON" if on else "OFF",
+            self.delay_s * 1e3,
+            self.policy,
+        )
+
+    def admit(self, kind: str, data: bytes, addr=None) -> bool:
+        """
+        True if the packet should be processed now. False means it was either
+        shed (counted) or, under the "latest" policy, held for `take_held()`.
+        """
+        if not self.shedding or kind == HEALTH:
+            return True
+        if self.policy == "latest" and kind == TRACK:
+            tid = track_id(data)
+            if tid is not None:
+                if tid in self._latest:
+                    self._shed[TRACK].inc()  # superseded by a newer packet
+                self._latest[tid] = (data, addr)
+                return False
+        self._seq += 1
+        if self._seq % self.keep_one_in == 0:
+            return True
+        self._shed[kind].inc()
+        return False
+
+    @property
+    def held(self) -> int:
+        return len(self._latest)
+
+    def take_held(self) -> List[Tuple[bytes, object]]:
+        """Newest held packet per track id, clearing the hold."""
+        held = list(self._latest.values())
+        self._latest.clear()
+        return held
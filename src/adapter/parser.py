@@ -6,9 +6,33 @@ Parser for incoming UDP packets into validated objects.
 from __future__ import annotations
 
 import json
+from datetime import datetime
 from typing import Any, Literal
 
+from common.codec import MAGIC, decode_binary
 from common.models import BaseModel, HealthStatus, Track
+from common.records import TrackRecord, to_datetime
+
+# "full": every field validated; "structural": required keys and JSON types
+# only, built without range checks (for trusted sources, see adapter.validation)
+VALIDATION = ("full", "structural")
+_HEALTH_KEYS = {"radar_mode", "temperature_c", "supply_v", "cpu_load_pct"}
+_TRACK_FIELDS = (
+    ("ts", datetime),
+    ("id", int),
+    ("range_m", float),
+    ("az_deg", float),
+    ("el_deg", float),
+    ("vr_mps", float),
+    ("snr_db", float),
+)
+_HEALTH_FIELDS = (
+    ("ts", datetime),
+    ("radar_mode", frozenset({"BOOT", "STANDBY", "OPERATIONAL", "FAULT"})),
+    ("temperature_c", float),
+    ("supply_v", float),
+    ("cpu_load_pct", float),
+)
 
 
 class Parsed(BaseModel):
@@ -16,31 +40,119 @@ class Parsed(BaseModel):
     payload: Any
 
 
-def parse_packet(pkt: bytes) -> Parsed:
+def parse_packet(
+    pkt: bytes | bytearray | memoryview,
+    *,
+    records: bool = False,
+    validation: str = "full",
+) -> Parsed:
     """
-    Accepts raw UDP payload (bytes) and returns a validated Parsed object.
+    Accepts raw UDP payload (bytes, or a memoryview slice of a receive
+    buffer) and returns a validated Parsed object.
 
     Supports:
       - Single Track JSON
       - HealthStatus JSON
       - Frame JSON: {"tracks": [Track, ...]}
+      - Binary track batch (`common.codec`), parsed as a frame
+
+    With `records=True` tracks are returned as slotted `TrackRecord`s (same
+    constraints, no pydantic model per track) for the ingest hot path.
+
+    With `validation="structural"` only the packet's shape is checked and
+    value constraints are skipped.
     """
-    obj = json.loads(pkt.decode("utf-8"))
+    if pkt[:2] == MAGIC:
+        return _binary_frame(pkt, records, validation)
+    obj = json.loads(str(pkt, "utf-8"))  # decodes any buffer without a bytes copy
+    if validation == "full":
+        make_track = TrackRecord.from_dict if records else _track_model
+        make_health = _health_model
+    elif validation == "structural":
+        make_track = TrackRecord.structural if records else _track_structural
+        make_health = _health_structural
+    else:
+        raise ValueError(f"validation must be one of {VALIDATION}, got {validation!r}")
 
     # Frame: {"tracks": [ {...}, {...} ]}
     if isinstance(obj, dict) and "tracks" in obj and isinstance(obj["tracks"], list):
-        tracks = [Track(**t) for t in obj["tracks"]]
+        tracks = [make_track(t) for t in obj["tracks"]]
         return Parsed(kind="frame", payload={"tracks": tracks})
 
     # HealthStatus: presence of required keys (heuristic)
-    if isinstance(obj, dict) and {
-        "radar_mode",
-        "temperature_c",
-        "supply_v",
-        "cpu_load_pct",
-    }.issubset(obj.keys()):
-        hs = HealthStatus(**obj)
-        return Parsed(kind="health", payload=hs)
+    if isinstance(obj, dict) and _HEALTH_KEYS.issubset(obj.keys()):
+        return Parsed(kind="health", payload=make_health(obj))
 
     # Default: treat as a single Track
-    return Parsed(kind="track", payload=Track(**obj))
+    return Parsed(kind="track", payload=make_track(obj))
+
+
+def _binary_frame(pkt, records: bool, validation: str) -> Parsed:
+    if validation not in VALIDATION:
+        raise ValueError(f"validation must be one of {VALIDATION}, got {validation!r}")
+    tracks: list = decode_binary(pkt, validate=validation == "full")
+    if not records:
+        tracks = [
+            Track.model_construct(
+                ts=r.ts,
+                id=r.id,
+                range_m=r.range_m,
+                az_deg=r.az_deg,
+                el_deg=r.el_deg,
+                vr_mps=r.vr_mps,
+                snr_db=r.snr_db,
+            )
+            for r in tracks
+        ]
+    return Parsed(kind="frame", payload={"tracks": tracks})
+
+
+def _track_model(obj) -> Track:
+    return Track(**_ns_ts(obj))
+
+
+def _health_model(obj) -> HealthStatus:
+    return HealthStatus(**_ns_ts(obj))
+
+
+def _ns_ts(obj):
+    # pydantic would read an integer ts as epoch seconds/ms, not ns
+    if isinstance(obj, dict) and type(obj.get("ts")) is int:
+        return {**obj, "ts": to_datetime(obj["ts"])}
+    return obj
+
+
+def _structural(cls, obj, fields):
+    """
+    Model from `obj` with required keys and JSON types checked, nothing else.
+    `fields` lists (name, check) in model order; numbers come back as float.
+    """
+    values = {}
+    try:
+        for key, check in fields:
+            v = obj[key]
+            if check is float:
+                if type(v) is not float and type(v) is not int:
+                    raise ValueError(f"{key}: expected a number, got {v!r}")
+                v = float(v)
+            elif check is int:
+                if type(v) is not int:
+                    raise ValueError(f"{key}: expected an integer, got {v!r}")
+            elif check is datetime:
+                v = to_datetime(v)
+            elif v not in check:
+                raise ValueError(f"{key}: unexpected value {v!r}")
+            values[key] = v
+    except KeyError as e:
+        raise ValueError(f"{e.args[0]}: field required") from None
+    except TypeError:
+        raise ValueError(f"expected a JSON object, got {obj!r}") from None
+    return cls.model_construct(**values)
+
+
+def _track_structural(obj) -> Track:
+    return _structural(Track, obj, _TRACK_FIELDS)
+
+
+def _health_structural(obj) -> HealthStatus:
+    return _structural(HealthStatus, obj, _HEALTH_FIELDS)
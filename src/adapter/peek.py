@@ -0,0 +1,40 @@
+"""
+src/adapter/peek.py
+Cheap inspection of raw datagrams before the full JSON parse.
+
+These helpers only look at bytes (substring search / one small regex), so
+they cost far less than `json.loads` and can drive admission decisions on
+the receive path. They are heuristics: the parser remains the authority on
+what a packet really is. Binary track batches (`common.codec`) are
+recognised by their magic bytes and always classify as frames.
+"""
+
+import re
+from typing import Optional
+
+from common.codec import MAGIC
+
+HEALTH = "health"
+FRAME = "frame"
+TRACK = "track"
+
+_HEALTH_KEY = b'"radar_mode"'
+_FRAME_KEY = b'"tracks"'
+_ID_RE = re.compile(rb'"id"\s*:\s*(\d+)')
+
+
+def classify(data: bytes) -> str:
+    """Best-effort packet kind from a byte scan: health, frame or track."""
+    if data[:2] == MAGIC:
+        return FRAME
+    if _HEALTH_KEY in data:
+        return HEALTH
+    if _FRAME_KEY in data:
+        return FRAME
+    return TRACK
+
+
+def track_id(data: bytes) -> Optional[int]:
+    """First `"id": <int>` in the datagram, or None."""
+    m = _ID_RE.search(data)
+    return int(m.group(1)) if m else None
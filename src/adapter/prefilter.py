@@ -0,0 +1,236 @@
+"""
+src/adapter/prefilter.py
+Pre-parse rejection: source allowlist, size / leading-byte checks and HMAC.
+
+A bad datagram that reaches the parser pays for `json.loads`, an exception
+and a log line, which is more than a good one costs. `PreFilter.check` runs
+first, on the raw bytes, and rejects in order of cost:
+
+  "source"        sender address not in the CIDR allowlist (R-SEC-092);
+  "size"          shorter than `min_size` or longer than `max_size` bytes;
+  "leading_byte"  does not start with `{` (ignoring leading whitespace) or
+                  the binary batch magic, so it cannot be a JSON object or
+                  a binary track batch (`common.codec`);
+  "hmac"          signing is enabled and the tag is missing, wrong, or no key
+                  exists for the source (R-SEC-090).
+
+Rejections are counted in `radar_prefilter_rejected_total{reason}` and logged
+at most a few times per second per reason.
+
+Signed datagrams carry the raw 32-byte HMAC-SHA256 of the payload after it
+(see `sign`). The key is chosen by the payload's `"src"` id, then the sender
+host, then `"*"`. Keys are held as pre-keyed HMAC objects that are copied
+per packet, so the key schedule is not recomputed for every datagram.
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import logging
+import socket
+from typing import Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from common.codec import MAGIC
+from common.metrics import CounterCell, LocalCounter
+from common.ratelog import RateLimitedLog
+
+from .sequence import peek_src
+
+log = logging.getLogger("ingest")
+
+REASONS = ("source", "size", "leading_byte", "hmac")
+
+PREFILTER_REJECTED_TOTAL = LocalCounter(
+    "radar_prefilter_rejected_total",
+    "UDP datagrams rejected before parsing, by reason",
+    labelnames=("reason",),
+)
+
+TAG_SIZE = hashlib.sha256().digest_size
+MAX_DATAGRAM = 65507  # largest UDP payload over IPv4
+_OBJECT_START = ord("{")
+_WHITESPACE = frozenset(b" \t\r\n")
+_BINARY_START = MAGIC[0]
+
+
+def sign(payload: bytes, key: bytes) -> bytes:
+    """`payload` followed by its HMAC-SHA256 tag, as senders should emit it."""
+    return payload + hmac.new(key, payload, hashlib.sha256).digest()
+
+
+class SourceAllowlist:
+    """
+    Set of CIDR networks with an O(1) membership test on the sender host.
+
+    Networks are stored as integer prefixes grouped by prefix length, so a
+    lookup is one set probe per distinct prefix length in the list. Decisions
+    are cached per host string; the cache is bounded and simply cleared when
+    full, so spoofed random sources cannot grow it.
+    """
+
+    def __init__(self, cidrs: Iterable[str], cache_size: int = 4096):
+        self._prefixes: Dict[int, Dict[int, Set[int]]] = {4: {}, 6: {}}
+        for cidr in cidrs:
+            net = ipaddress.ip_network(cidr.strip(), strict=False)
+            self._prefixes[net.version].setdefault(net.prefixlen, set()).add(
+                int(net.network_address)
+            )
+        self._v4: Tuple[Tuple[int, Set[int]], ...] = self._masks(4, 32)
+        self._v6: Tuple[Tuple[int, Set[int]], ...] = self._masks(6, 128)
+        self.cache_size = cache_size
+        self._cache: Dict[str, bool] = {}
+
+    def _masks(self, version: int, bits: int) -> Tuple[Tuple[int, Set[int]], ...]:
+        full = (1 << bits) - 1
+        return tuple(
+            (full ^ ((1 << (bits - plen)) - 1), nets)
+            for plen, nets in sorted(self._prefixes[version].items(), reverse=True)
+        )
+
+    def __contains__(self, host: str) -> bool:
+        allowed = self._cache.get(host)
+        if allowed is None:
+            allowed = self._lookup(host)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[host] = allowed
+        return allowed
+
+    def _lookup(self, host: str) -> bool:
+        try:
+            if ":" in host:
+                masks = self._v6
+                ip = int.from_bytes(
+                    socket.inet_pton(socket.AF_INET6, host.split("%", 1)[0]), "big"
+                )
+            else:
+                masks = self._v4
+                ip = int.from_bytes(socket.inet_aton(host), "big")
+        except OSError:
+            return False
+        for mask, nets in masks:
+            if ip & mask in nets:
+                return True
+        return False
+
+
+class HmacKeys:
+    """Per-source HMAC-SHA256 keys, kept as pre-keyed objects."""
+
+    def __init__(self, keys: Mapping[str, bytes]):
+        if not keys:
+            raise ValueError("at least one HMAC key is required")
+        self._keyed = {
+            source: hmac.new(key, digestmod=hashlib.sha256)
+            for source, key in keys.items()
+        }
+        self._default = self._keyed.get("*")
+
+    def verify(self, data, host: str):
+        """The payload of a signed datagram, or None if the tag does not verify."""
+        if len(data) <= TAG_SIZE:
+            return None
+        payload = data[:-TAG_SIZE]
+        keyed = None
+        src = peek_src(payload)
+        if src is not None:
+            keyed = self._keyed.get(src)
+        if keyed is None:
+            keyed = self._keyed.get(host, self._default)
+        if keyed is None:
+            return None
+        mac = keyed.copy()
+        mac.update(payload)
+        if not hmac.compare_digest(mac.digest(), data[-TAG_SIZE:]):
+            return None
+        return payload
+
+
+class PreFilter:
+    def __init__(
+        self,
+        allow: Optional[Iterable[str]] = None,
+        min_size: int = 2,
+        max_size: int = MAX_DATAGRAM,
+        hmac_keys: Optional[Mapping[str, bytes]] = None,
+        log_interval_s: Optional[float] = None,
+    ):
+        if min_size < 1 or max_size < min_size:
+            raise ValueError("need 1 <= min_size <= max_size")
+        self.allow = SourceAllowlist(allow) if allow is not None else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.hmac = HmacKeys(hmac_keys) if hmac_keys else None
+        if self.hmac is not None:
+            # The size limits apply to the payload, not to payload + tag
+            min_size += TAG_SIZE
+            max_size += TAG_SIZE
+        self._min = min_size
+        self._max = max_size
+        self._log = RateLimitedLog(log, interval_s=log_interval_s)
+        self._cells = self.cells(PREFILTER_REJECTED_TOTAL.labels)
+
+    @staticmethod
+    def cells(labels=None) -> Dict[str, CounterCell]:
+        """Bound rejection counters; reader threads pass their own shard's labels."""
+        if labels is None:
+            labels = PREFILTER_REJECTED_TOTAL.shard().labels
+        return {reason: labels(reason=reason) for reason in REASONS}
+
+    def check(self, data, addr, cells: Optional[Dict[str, CounterCell]] = None):
+        """The datagram's payload (tag stripped), or None if it is rejected."""
+        host = addr[0] if isinstance(addr, tuple) else str(addr)
+        if self.allow is not None and host not in self.allow:
+            return self._reject("source", host, cells)
+        n = len(data)
+        if n < self._min or n > self._max:
+            return self._reject("size", host, cells)
+        first = data[0]
+        if first != _OBJECT_START and not (
+            data[:2] == MAGIC if first == _BINARY_START else _starts_object(data, first)
+        ):
+            return self._reject("leading_byte", host, cells)
+        if self.hmac is not None:
+            data = self.hmac.verify(data, host)
+            if data is None:
+                return self._reject("hmac", host, cells)
+        return data
+
+    def _reject(self, reason: str, host: str, cells) -> None:
+        (cells or self._cells)[reason].inc()
+        self._log.error(
+            reason, "prefilter: rejected datagram from %s (%s)", host, reason
+        )
+        return None
+
+
+def _starts_object(data, first: int) -> bool:
+    """Slow path: skip leading JSON whitespace before looking for `{`."""
+    if first not in _WHITESPACE:
+        return False
+    for b in bytes(data[:64]):
+        if b not in _WHITESPACE:
+            return b == _OBJECT_START
+    return False
+
+
+def parse_cidrs(spec: str) -> Optional[Tuple[str, ...]]:
+    """`"10.0.0.0/8, 192.168.1.5"` -> CIDRs (validated); None if empty."""
+    cidrs = tuple(filter(None, (s.strip() for s in spec.split(","))))
+    for cidr in cidrs:
+        ipaddress.ip_network(cidr, strict=False)  # ValueError names the entry
+    return cidrs or None
+
+
+def parse_keys(spec: str) -> Dict[str, bytes]:
+    """`"radar-a=<hex>,10.0.0.5=<hex>,*=<hex>"` -> {source: key}."""
+    keys = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        source, sep, key = item.rpartition("=")
+        if not sep or not source:
+            raise ValueError(f"expected source=hexkey, got {item!r}")
+        try:
+            keys[source.strip()] = bytes.fromhex(key.strip())
+        except ValueError:
+            raise ValueError(f"HMAC key for {source.strip()!r} is not hex") from None
+    return keys
@@ -0,0 +1,310 @@
+"""
+src/adapter/reader.py
+Threaded UDP ingest backend: `recv_into` on OS threads, off the event loop.
+
+The asyncio `DatagramProtocol` path allocates a fresh `bytes` per datagram
+and runs the parse on the event loop, next to the handler and everything
+else the loop serves. This backend moves receive and parse off the loop:
+
+  - each reader thread takes a slab from a preallocated `BufferPool` and
+    `recv_into`s a burst of datagrams back to back into it (the first recv
+    waits in `select`, the rest run non-blocking until the socket is drained,
+    the slab is full or `batch_max` is reached);
+  - every datagram is a `memoryview` slice of the slab, passed to
+    `parse_packet` without copying;
+  - the burst's parsed results go to the loop in one `call_soon_threadsafe`,
+    where the handler runs exactly as it does for the asyncio backend.
+
+Sequenced packets (see `adapter.sequence`) share one tracker behind a lock.
+In-order packets are released at once and parsed from their slab view; only
+packets the reorder buffer holds past the burst are copied out. Each release
+takes its place in one loop-side queue while the lock is held, so with
+several reader threads the handler still sees packets in release order even
+though they are parsed in parallel. Overload shedding stays with the asyncio
+backend: here the kernel socket buffer is the queue.
+"""
+
+import asyncio
+import logging
+import queue
+import select
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from common.ratelog import RateLimitedLog
+
+from .ingest import INGEST_PACKETS_TOTAL, PARSE_ERRORS_TOTAL, Handler
+from .parser import Parsed, parse_packet
+from .prefilter import PreFilter
+from .sequence import SequenceTracker, peek_seq
+from .validation import ValidationPolicy
+
+log = logging.getLogger("ingest")
+
+MAX_DATAGRAM = 65535
+
+
+class BufferPool:
+    """Fixed set of preallocated receive slabs, reused for the process lifetime."""
+
+    def __init__(self, count: int, size: int = 1 << 20):
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        self.size = size
+        self._free: "queue.SimpleQueue[bytearray]" = queue.SimpleQueue()
+        for _ in range(count):
+            self._free.put(bytearray(size))
+
+    def acquire(self, timeout: Optional[float] = None) -> bytearray:
+        """Take a slab, waiting up to `timeout` s (raises `queue.Empty`)."""
+        return self._free.get(timeout=timeout)
+
+    def release(self, buf: bytearray) -> None:
+        self._free.put(buf)
+
+    @property
+    def available(self) -> int:
+        return self._free.qsize()
+
+
+def bind_udp(host: str, port: int, rcvbuf: Optional[int] = None) -> socket.socket:
+    """Bound UDP socket for the threaded backend (`rcvbuf` bytes if given)."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((host, port))
+    return sock
+
+
+class _Release:
+    """Parsed packets of one sequencer release, in release order."""
+
+    __slots__ = ("raw", "results", "ready")
+
+    def __init__(self, raw: List[Tuple[object, object]]):
+        self.raw = raw  # (data, addr) as released; parsed by `_finish`
+        self.results: List[Parsed] = []
+        self.ready = False  # set by the parsing thread when `results` is final
+
+
+class ThreadedUdpReader:
+    def __init__(
+        self,
+        sock: socket.socket,
+        handler: Handler,
+        loop: asyncio.AbstractEventLoop,
+        records: bool = False,
+        threads: int = 1,
+        pool: Optional[BufferPool] = None,
+        batch_max: int = 256,
+        max_datagram: int = MAX_DATAGRAM,
+        sequencer: Optional[SequenceTracker] = None,
+        validation: Optional[ValidationPolicy] = None,
+        prefilter: Optional[PreFilter] = None,
+        poll_interval_s: float = 0.1,
+    ):
+        if threads < 1:
+            raise ValueError("threads must be >= 1")
+        self.sock = sock
+        self.handler = handler
+        self.loop = loop
+        self.records = records
+        self.threads = threads
+        self.pool = pool or BufferPool(threads)
+        if self.pool.size < max_datagram:
+            raise ValueError("pool buffers must hold at least one max_datagram")
+        self.batch_max = batch_max
+        self.max_datagram = max_datagram
+        self.sequencer = sequencer
+        self.validation = validation
+        self.prefilter = prefilter
+        self._seq_lock = threading.Lock()
+        self._seq_out: List[Tuple[object, object]] = []
+        # Releases in the order the tracker made them; the loop delivers the
+        # ready prefix, so a fast thread cannot overtake an earlier release
+        self._releases: Deque[_Release] = deque()
+        if sequencer is not None:
+            sequencer.deliver = self._sequenced
+        # Wake up this often to check for stop and expire reorder gaps
+        self.poll_interval_s = poll_interval_s
+        if sequencer is not None:
+            self.poll_interval_s = min(poll_interval_s, sequencer.max_delay_s / 2)
+        self.sock.setblocking(False)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._loop_errors = PARSE_ERRORS_TOTAL.labels()
+        self._error_log = RateLimitedLog(log)
+
+    def start(self) -> None:
+        for i in range(self.threads):
+            t = threading.Thread(target=self._run, name=f"udp-reader-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        log.info(
+            "UDP ingest: %d reader thread(s), %d x %d KiB buffers",
+            self.threads,
+            self.pool.available,
+            self.pool.size >> 10,
+        )
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the readers; packets still held for reordering are released."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+        if self.sequencer is not None and self.sequencer.held:
+            with self._seq_lock:
+                self.sequencer.expire(float("inf"))
+                release = self._take_released()
+            if release is not None:
+                self._finish(release, self._loop_errors)
+                self.loop.call_soon_threadsafe(self._deliver_releases)
+
+    # ---- reader threads ----------------------------------------------------
+
+    def _run(self) -> None:
+        # Per-thread counter shards: increments never contend
+        ingested = INGEST_PACKETS_TOTAL.shard().labels()
+        errors = PARSE_ERRORS_TOTAL.shard().labels()
+        rejected = PreFilter.cells() if self.prefilter is not None else None
+        while not self._stop.is_set():
+            try:
+                buf = self.pool.acquire(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                views = self._recv_burst(buf)
+                if views:
+                    ingested.inc(len(views))
+                    results = self._parse(views, errors, rejected)
+                    if results:
+                        self.loop.call_soon_threadsafe(self._deliver, results)
+            except OSError as e:
+                if self._stop.is_set():
+                    break
+                log.error("UDP reader error: %s", e)
+            finally:
+                self.pool.release(buf)
+            if self.sequencer is not None and self.sequencer.held:
+                self._expire_sequences(errors)
+
+    def _recv_burst(self, buf: bytearray) -> List[Tuple[memoryview, object]]:
+        """Fill `buf` with the datagrams queued on the socket (waits for the first)."""
+        sock = self.sock
+        views: List[Tuple[memoryview, object]] = []
+        if not select.select((sock,), (), (), self.poll_interval_s)[0]:
+            return views
+        mv = memoryview(buf)
+        limit = len(buf) - self.max_datagram
+        max_datagram = self.max_datagram
+        off = 0
+        while off <= limit and len(views) < self.batch_max:
+            try:
+                n, addr = sock.recvfrom_into(mv[off:], max_datagram)
+            except BlockingIOError:
+                break  # drained (or another reader got there first)
+            views.append((mv[off : off + n], addr))
+            off += n
+        return views
+
+    def _parse(self, views, errors, rejected=None) -> List[Parsed]:
+        results: List[Parsed] = []
+        sequencer = self.sequencer
+        prefilter = self.prefilter
+        sequenced = False
+        for view, addr in views:
+            if prefilter is not None:
+                view = prefilter.check(view, addr, rejected)
+                if view is None:
+                    continue
+            if sequencer is not None:
+                seq = peek_seq(view)
+                if seq is not None:
+                    # The tracker copies out only what it holds past this slab
+                    sequenced |= self._push_sequenced(view, seq, addr, errors)
+                    continue
+            self._parse_one(view, addr, results, errors)
+        if sequenced:
+            self.loop.call_soon_threadsafe(self._deliver_releases)
+        return results
+
+    def _parse_one(self, data, addr, results: List[Parsed], errors) -> None:
+        policy = self.validation
+        try:
+            if policy is None:
+                results.append(parse_packet(data, records=self.records))
+            else:
+                source = policy.source_for(data, addr)
+                results.append(
+                    parse_packet(
+                        data,
+                        records=self.records,
+                        validation=policy.validation_for(source),
+                    )
+                )
+        except Exception as e:
+            errors.inc()
+            self._error_log.error("parse", "parse error from %s: %s", addr, e)
+            if policy is not None:
+                policy.failed(source)
+
+    def _sequenced(self, data: bytes, addr) -> None:
+        # SequenceTracker.deliver; only called with _seq_lock held
+        self._seq_out.append((data, addr))
+
+    def _take_released(self) -> Optional[_Release]:
+        # With _seq_lock held: queue a slot for what the tracker just released
+        if not self._seq_out:
+            return None
+        release = _Release(self._seq_out)
+        self._seq_out = []
+        self._releases.append(release)
+        return release
+
+    def _finish(self, release: _Release, errors) -> None:
+        """Parse a queued release outside the lock and mark it deliverable."""
+        for data, addr in release.raw:
+            self._parse_one(data, addr, release.results, errors)
+        release.raw = []
+        release.ready = True
+
+    def _push_sequenced(self, data, seq: int, addr, errors) -> bool:
+        """Push one packet; True if it released anything (now ready)."""
+        sequencer = self.sequencer
+        with self._seq_lock:
+            source = sequencer.source_for(data, addr)  # type: ignore[union-attr]
+            sequencer.push(source, seq, data, addr, time.monotonic())  # type: ignore[union-attr]
+            release = self._take_released()
+        if release is None:
+            return False
+        self._finish(release, errors)
+        return True
+
+    def _expire_sequences(self, errors) -> None:
+        with self._seq_lock:
+            self.sequencer.expire(time.monotonic())  # type: ignore[union-attr]
+            release = self._take_released()
+        if release is not None:
+            self._finish(release, errors)
+            self.loop.call_soon_threadsafe(self._deliver_releases)
+
+    # ---- event loop ----------------------------------------------------------
+
+    def _deliver_releases(self) -> None:
+        releases = self._releases
+        while releases and releases[0].ready:
+            self._deliver(releases.popleft().results)
+
+    def _deliver(self, results: List[Parsed]) -> None:
+        handler = self.handler
+        for msg in results:
+            try:
+                handler(msg)
+            except Exception as e:
+                self._loop_errors.inc()
+                log.error("handler error for %s: %s", msg.kind, e)
@@ -0,0 +1,284 @@
+"""
+src/adapter/sequence.py
+Per-source sequence tracking: duplicate drop and a bounded reorder buffer.
+
+Packets may carry an optional top-level `"seq"` (unsigned, incrementing per
+sender) and an optional `"src"` sensor id; without `"src"` the sender
+address identifies the source. For each source we keep:
+
+  - `released`: the highest sequence number handed on in order;
+  - a 64-bit bitmap of which of the last 64 sequence numbers at or below
+    `released` were seen, so duplicates are dropped in O(1);
+  - a fixed ring of `window` slots for packets that arrived ahead of a gap.
+
+A gap is waited on for at most `max_delay_s` or until the ring is full; then
+the missing numbers are counted as lost and the held packets are released in
+order. `data` may be a view into the caller's receive buffer: in-order
+packets are handed straight back, and only packets held ahead of a gap are
+copied. All per-source state is allocated once, when the source first
+appears, so the steady state does not allocate per packet. A source silent
+for `idle_ttl_s` (a sender restarted on a new ephemeral port, a sensor taken
+out of service) is forgotten, together with its metric series, so sources
+that come and go never fill the `max_sources` slots.
+"""
+
+import logging
+import re
+from typing import Callable, Dict, List, Optional
+
+from common.metrics import CounterCell, LocalCounter
+
+log = logging.getLogger("ingest")
+
+EVENTS = ("duplicate", "reordered", "gap", "lost", "late", "reset")
+
+SEQ_EVENTS_TOTAL = LocalCounter(
+    "radar_seq_events_total",
+    "Sequence anomalies per source: duplicate, reordered, gap, lost, late, reset",
+    labelnames=("source", "event"),
+)
+
+_SEQ_RE = re.compile(rb'"seq"\s*:\s*(\d+)')
+_SRC_RE = re.compile(rb'"src"\s*:\s*"([^"\\]{1,64})"')
+_BITMAP_BITS = 64
+_BITMAP_MASK = (1 << _BITMAP_BITS) - 1
+
+Deliver = Callable[[bytes, object], None]
+
+
+def peek_seq(data: bytes) -> Optional[int]:
+    """Top-level `"seq"` of a raw datagram, or None if it carries none."""
+    m = _SEQ_RE.search(data)
+    return int(m.group(1)) if m else None
+
+
+def peek_src(data: bytes) -> Optional[str]:
+    """Top-level `"src"` sensor id of a raw datagram, or None."""
+    # `in` on a memoryview compares single bytes, so views go to the regex
+    if type(data) is memoryview or b'"src"' in data:
+        m = _SRC_RE.search(data)
+        if m:
+            return m.group(1).decode("utf-8", "replace")
+    return None
+
+
+class SourceWindow:
+    """Sliding sequence window for one source."""
+
+    __slots__ = (
+        "source",
+        "released",
+        "seen",
+        "data",
+        "addrs",
+        "held",
+        "hold_since",
+        "last_seen",
+        "cells",
+    )
+
+    def __init__(self, source: str, window: int):
+        self.source = source
+        self.released = -1  # set from the first packet
+        self.seen = 0  # bit k => (released - k) was seen
+        self.data: List[Optional[bytes]] = [None] * window
+        self.addrs: List[object] = [None] * window
+        self.held = 0
+        self.hold_since = 0.0
+        self.last_seen = 0.0
+        self.cells: Dict[str, CounterCell] = {
+            e: SEQ_EVENTS_TOTAL.labels(source=source, event=e) for e in EVENTS
+        }
+
+
+class SequenceTracker:
+    def __init__(
+        self,
+        deliver: Optional[Deliver] = None,
+        window: int = 64,
+        max_delay_s: float = 0.05,
+        max_sources: int = 1024,
+        idle_ttl_s: float = 300.0,
+    ):
+        if not 1 <= window <= _BITMAP_BITS:
+            raise ValueError(f"window must be in 1..{_BITMAP_BITS}")
+        self.deliver = deliver
+        self.window = window
+        self.max_delay_s = max_delay_s
+        self.max_sources = max_sources
+        self.idle_ttl_s = idle_ttl_s
+        self._next_sweep = 0.0
+        self.sources: Dict[str, SourceWindow] = {}
+        self._addr_names: Dict[object, str] = {}
+        self.held = 0  # packets waiting in reorder buffers, all sources
+
+    def source_for(self, data: bytes, addr) -> str:
+        """`"src"` sensor id if present, else `host:port` of the sender."""
+        src = peek_src(data)
+        if src is not None:
+            return src
+        name = self._addr_names.get(addr)
+        if name is None:
+            name = f"{addr[0]}:{addr[1]}" if isinstance(addr, tuple) else str(addr)
+            if len(self._addr_names) < self.max_sources:
+                self._addr_names[addr] = name
+        return name
+
+    def _window(self, source: str) -> Optional[SourceWindow]:
+        w = self.sources.get(source)
+        if w is None:
+            if len(self.sources) >= self.max_sources:
+                return None  # untracked: pass straight through
+            w = self.sources[source] = SourceWindow(source, self.window)
+        return w
+
+    def push(self, source: str, seq: int, data: bytes, addr, now: float) -> None:
+        """Accept one sequenced packet; in-order packets are delivered at once."""
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+        w = self._window(source)
+        if w is None:
+            self.deliver(data, addr)  # type: ignore[misc]
+            return
+        w.last_seen = now
+
+        if w.released < 0:
+            w.released = seq - 1
+        ahead = seq - w.released
+
+        if ahead <= 0:
+            back = -ahead
+            if back >= _BITMAP_BITS * 4:
+                # Far behind: the sender restarted its counter
+                self._reset(w, seq)
+                w.cells["reset"].inc()
+                self._release(w, seq, data, addr)
+            elif back < _BITMAP_BITS and w.seen >> back & 1:
+                w.cells["duplicate"].inc()
+            else:
+                w.cells["late"].inc()  # already written off as lost
+            return
+
+        if ahead == 1:
+            if w.held:
+                w.cells["reordered"].inc()  # filled the gap others waited on
+            self._release(w, seq, data, addr)
+            self._drain(w)
+            return
+
+        # Ahead of a gap: hold it, unless that slot is already taken
+        if ahead > self.window:
+            # No room: give up on the oldest gap(s) until seq fits the ring
+            self._skip_to(w, seq - self.window)
+            self._drain(w)
+            if seq - w.released == 1:
+                self._release(w, seq, data, addr)
+                self._drain(w)
+                return
+        slot = seq % self.window
+        if w.data[slot] is not None:
+            w.cells["duplicate"].inc()
+            return
+        if not w.held:
+            w.hold_since = now
+        # A held packet outlives the caller's receive buffer: keep a copy
+        w.data[slot] = data if type(data) is bytes else bytes(data)
+        w.addrs[slot] = addr
+        w.held += 1
+        self.held += 1
+        if now - w.hold_since >= self.max_delay_s:
+            self._flush(w)
+
+    def expire(self, now: float) -> None:
+        """Give up on gaps older than `max_delay_s` (call periodically)."""
+        for w in self.sources.values():
+            if w.held and now - w.hold_since >= self.max_delay_s:
+                self._flush(w)
+
+    def evict_idle(self, now: float) -> int:
+        """Forget sources silent for `idle_ttl_s`; returns how many went."""
+        self._next_sweep = now + self.idle_ttl_s / 4
+        idle = [
+            w
+            for w in self.sources.values()
+            if not w.held and now - w.last_seen >= self.idle_ttl_s
+        ]
+        for w in idle:
+            del self.sources[w.source]
+            for e in EVENTS:
+                SEQ_EVENTS_TOTAL.remove(source=w.source, event=e)
+        if idle:
+            sources = self.sources
+            self._addr_names = {
+                a: n for a, n in self._addr_names.items() if n in sources
+            }
+        return len(idle)
+
+    # ---- internals -------------------------------------------------------
+
+    def _release(self, w: SourceWindow, seq: int, data, addr) -> None:
+        shift = seq - w.released
+        w.seen = ((w.seen << shift) | 1) & _BITMAP_MASK
+        w.released = seq
+        self.deliver(data, addr)  # type: ignore[misc]
+
+    def _drain(self, w: SourceWindow) -> None:
+        """Release consecutive held packets following `released`."""
+        window = self.window
+        while w.held:
+            slot = (w.released + 1) % window
+            data = w.data[slot]
+            if data is None:
+                return
+            addr = w.addrs[slot]
+            w.data[slot] = w.addrs[slot] = None
+            w.held -= 1
+            self.held -= 1
+            self._release(w, w.released + 1, data, addr)
+
+    def _skip_to(self, w: SourceWindow, target: int) -> None:
+        """Advance `released` to `target`, counting holes as lost."""
+        missing = 0
+        while w.released < target:
+            nxt = w.released + 1
+            slot = nxt % self.window
+            data = w.data[slot]
+            if data is None:
+                missing += 1
+                # Mark as not seen, so a late arrival is counted as late
+                w.seen = (w.seen << 1) & _BITMAP_MASK
+                w.released = nxt
+            else:
+                addr = w.addrs[slot]
+                w.data[slot] = w.addrs[slot] = None
+                w.held -= 1
+                self.held -= 1
+                self._release(w, nxt, data, addr)
+            if not w.held and missing and w.released < target:
+                # Nothing else held: jump the rest of the way in one step
+                rest = target - w.released
+                missing += rest
+                w.seen = (w.seen << min(rest, _BITMAP_BITS)) & _BITMAP_MASK
+                w.released = target
+        if missing:
+            w.cells["gap"].inc()
+            w.cells["lost"].inc(missing)
+
+    def _flush(self, w: SourceWindow) -> None:
+        """Stop waiting for the current gap(s) and release everything held."""
+        while w.held:
+            # Skip to just before the next held packet, then drain from there
+            nxt = w.released + 1
+            while w.data[nxt % self.window] is None:
+                nxt += 1
+            self._skip_to(w, nxt - 1)
+            self._drain(w)
+
+    def _reset(self, w: SourceWindow, seq: int) -> None:
+        for i in range(self.window):
+            w.data[i] = w.addrs[i] = None
+        self.held -= w.held
+        w.held = 0
+        w.seen = 0
+        w.released = seq - 1
+        log.warning("sequence reset for source %s at seq %d", w.source, seq)
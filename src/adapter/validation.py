@@ -0,0 +1,139 @@
+"""
+src/adapter/validation.py
+Per-source validation policy for trusted sensors.
+
+Full field validation is paid on every packet, but most sources are
+well-behaved sensors. Each source (its `"src"` id, or the
+sender host) runs in one of three modes:
+
+  "full"        every packet fully validated (the default);
+  "sampled"     1 in `sample_one_in` packets fully validated, the rest built
+                with structural checks only;
+  "structural"  structural checks only (keys present, JSON types right).
+
+A source that is not on "full" and sends a packet failing either check is
+promoted to "full" and stays there until it is reconfigured. The current
+mode per source is exported as `radar_validation_mode{source}`.
+"""
+
+import logging
+from typing import Dict, Mapping, Optional
+
+from prometheus_client import Enum
+
+from .sequence import peek_src
+
+log = logging.getLogger("ingest")
+
+FULL = "full"
+SAMPLED = "sampled"
+STRUCTURAL = "structural"
+MODES = (FULL, SAMPLED, STRUCTURAL)
+
+VALIDATION_MODE = Enum(
+    "radar_validation_mode",
+    "Current validation mode per source",
+    labelnames=("source",),
+    states=list(MODES),
+)
+
+
+class _SourceState:
+    __slots__ = ("mode", "countdown")
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.countdown = 0  # packets until the next fully validated sample
+
+
+class ValidationPolicy:
+    def __init__(
+        self,
+        default: str = FULL,
+        sample_one_in: int = 16,
+        sources: Optional[Mapping[str, str]] = None,
+        max_sources: int = 1024,
+    ):
+        for mode in (default, *(sources or {}).values()):
+            if mode not in MODES:
+                raise ValueError(
+                    f"validation mode must be one of {MODES}, got {mode!r}"
+                )
+        if sample_one_in < 1:
+            raise ValueError("sample_one_in must be >= 1")
+        self.default = default
+        self.sample_one_in = sample_one_in
+        self.max_sources = max_sources
+        self.configured: Dict[str, str] = dict(sources or {})
+        self._states: Dict[str, _SourceState] = {}
+
+    @staticmethod
+    def source_for(data, addr) -> str:
+        """`"src"` sensor id if present, else the sender host."""
+        src = peek_src(data)
+        if src is not None:
+            return src
+        return addr[0] if isinstance(addr, tuple) else str(addr)
+
+    def _state(self, source: str) -> Optional[_SourceState]:
+        st = self._states.get(source)
+        if st is None:
+            if len(self._states) >= self.max_sources:
+                return None  # untracked sources are always fully validated
+            st = self._states[source] = _SourceState(
+                self.configured.get(source, self.default)
+            )
+            VALIDATION_MODE.labels(source=source).state(st.mode)
+        return st
+
+    def validation_for(self, source: str) -> str:
+        """`parse_packet` validation ("full" or "structural") for the next packet."""
+        st = self._state(source)
+        if st is None or st.mode == FULL:
+            return "full"
+        if st.mode == STRUCTURAL:
+            return "structural"
+        st.countdown -= 1
+        if st.countdown <= 0:
+            st.countdown = self.sample_one_in
+            return "full"
+        return "structural"
+
+    def mode(self, source: str) -> str:
+        st = self._states.get(source)
+        return st.mode if st is not None else FULL
+
+    def failed(self, source: str) -> None:
+        """A packet from `source` failed validation: promote it to full."""
+        st = self._states.get(source)
+        if st is None or st.mode == FULL:
+            return
+        log.warning(
+            "validation: packet from %s failed in %s mode; promoting to full",
+            source,
+            st.mode,
+        )
+        st.mode = FULL
+        VALIDATION_MODE.labels(source=source).state(FULL)
+
+    def configure(self, source: str, mode: str) -> None:
+        """Set (or restore, after a promotion) the mode of one source."""
+        if mode not in MODES:
+            raise ValueError(f"validation mode must be one of {MODES}, got {mode!r}")
+        self.configured[source] = mode
+        st = self._state(source)
+        if st is not None:
+            st.mode = mode
+            st.countdown = 0
+            VALIDATION_MODE.labels(source=source).state(mode)
+
+
+def parse_sources(spec: str) -> Dict[str, str]:
+    """`"10.0.0.5=sampled,radar-b=structural"` -> {source: mode}."""
+    sources = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        source, sep, mode = item.rpartition("=")
+        if not sep or not source:
+            raise ValueError(f"expected source=mode, got {item!r}")
+        sources[source.strip()] = mode.strip()
+    return sources
@@ -0,0 +1,215 @@
+"""
+src/api/debug.py
+On-demand profiling and memory diagnostics for a running ingest process.
+
+GET /debug/profile?seconds=5&mode=cprofile
+    Profile the event loop thread with cProfile for `seconds` and return a
+    pstats file (load with `pstats.Stats(path)` or snakeviz).
+GET /debug/profile?seconds=5&mode=sample&hz=100
+    Statistically sample the event loop thread's stack and return collapsed
+    stacks (`a;b;c <count>` lines) for flamegraph.pl / speedscope.
+GET /debug/tracemalloc?action=start&frames=10
+GET /debug/tracemalloc?action=snapshot&limit=25&key=lineno
+    Take a snapshot; returns the top allocations, or the diff against the
+    previous snapshot once there is one.
+GET /debug/tracemalloc?action=stop
+
+Only mounted when enabled in config. Profilers and tracemalloc are switched
+on per request, so nothing is paid while the endpoints sit idle. cProfile is
+switched on and off by the loop thread itself; when the loop does not run
+them within `loop_timeout_s` the request fails with 503, and a profiler that
+was not switched on yet never is.
+"""
+
+import asyncio
+import cProfile
+import concurrent.futures
+import json
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+from api.server import json_response, not_found
+
+MAX_PROFILE_S = 60.0
+LOOP_TIMEOUT_S = 5.0
+
+
+def _text_response(start_response, status: str, body: bytes, content_type: str):
+    start_response(
+        status, [("Content-Type", content_type), ("Content-Length", str(len(body)))]
+    )
+    return [body]
+
+
+def _error(start_response, status: str, message: str):
+    return json_response(
+        start_response, status, json.dumps({"error": message}).encode()
+    )
+
+
+def collapse_stack(frame) -> str:
+    """Render a frame chain root-first in collapsed-stack notation."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class DebugApp:
+    """WSGI app mounted at /debug. Must be created on the event loop thread."""
+
+    def __init__(
+        self,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        max_seconds: float = MAX_PROFILE_S,
+        loop_timeout_s: float = LOOP_TIMEOUT_S,
+    ):
+        self.loop = loop or asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.max_seconds = max_seconds
+        self.loop_timeout_s = loop_timeout_s
+        self._profiling = threading.Lock()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def __call__(self, environ, start_response):
+        params = {
+            k: v[-1] for k, v in parse_qs(environ.get("QUERY_STRING", "")).items()
+        }
+        path = environ.get("PATH_INFO", "").rstrip("/")
+        try:
+            if path == "/debug/profile":
+                return self._profile(params, start_response)
+            if path == "/debug/tracemalloc":
+                return self._tracemalloc(params, start_response)
+        except ValueError as e:
+            return _error(start_response, "400 Bad Request", str(e))
+        except TimeoutError:
+            return _error(
+                start_response, "503 Service Unavailable", "loop unresponsive"
+            )
+        return not_found(environ, start_response)
+
+    # ---- CPU -------------------------------------------------------------
+
+    def _profile(self, params, start_response):
+        seconds = float(params.get("seconds", 5.0))
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be in (0, {self.max_seconds}]")
+        mode = params.get("mode", "cprofile")
+        if mode not in ("cprofile", "sample"):
+            raise ValueError("mode must be cprofile or sample")
+        if not self._profiling.acquire(blocking=False):
+            return _error(start_response, "409 Conflict", "profile already running")
+        try:
+            if mode == "cprofile":
+                body = self.run_cprofile(seconds)
+                return _text_response(
+                    start_response, "200 OK", body, "application/octet-stream"
+                )
+            hz = float(params.get("hz", 100.0))
+            if not 0 < hz <= 1000:
+                raise ValueError("hz must be in (0, 1000]")
+            body = self.run_sampler(seconds, hz)
+            return _text_response(
+                start_response, "200 OK", body, "text/plain; charset=utf-8"
+            )
+        finally:
+            self._profiling.release()
+
+    def _on_loop(self, fn, cancel: bool = True) -> None:
+        """
+        Run `fn` on the event loop thread and wait for it. TimeoutError if the
+        loop has not run it within `loop_timeout_s`; `fn` is then dropped if
+        `cancel`, or still runs once the loop gets to it.
+        """
+        done: concurrent.futures.Future = concurrent.futures.Future()
+
+        def call():
+            if not done.set_running_or_notify_cancel():
+                return  # the caller gave up on it
+            try:
+                done.set_result(fn())
+            except BaseException as e:  # propagate to the HTTP thread
+                done.set_exception(e)
+
+        self.loop.call_soon_threadsafe(call)
+        try:
+            done.result(timeout=self.loop_timeout_s)
+        except TimeoutError:
+            if not cancel or done.cancel():
+                raise
+            done.result()  # the loop got to it just now
+
+    def run_cprofile(self, seconds: float) -> bytes:
+        """cProfile the loop thread; returns a marshalled pstats dump."""
+        prof = cProfile.Profile()
+        self._on_loop(prof.enable)
+        try:
+            time.sleep(seconds)
+        finally:
+            self._on_loop(prof.disable, cancel=False)  # never leave it on
+        prof.create_stats()
+        return marshal.dumps(prof.stats)  # same format as Profile.dump_stats
+
+    def run_sampler(self, seconds: float, hz: float) -> bytes:
+        """Sample the loop thread's stack; returns collapsed stacks."""
+        stacks: Counter = Counter()
+        interval = 1.0 / hz
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                stacks[collapse_stack(frame)] += 1
+            del frame
+            time.sleep(interval)
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return ("\n".join(lines) + "\n").encode()
+
+    # ---- Memory ----------------------------------------------------------
+
+    def _tracemalloc(self, params, start_response):
+        action = params.get("action", "snapshot")
+        if action == "start":
+            frames = int(params.get("frames", 10))
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._snapshot = None
+            return json_response(start_response, "200 OK", b'{"tracing":true}')
+        if action == "stop":
+            tracemalloc.stop()
+            self._snapshot = None
+            return json_response(start_response, "200 OK", b'{"tracing":false}')
+        if action != "snapshot":
+            raise ValueError("action must be start, snapshot or stop")
+        if not tracemalloc.is_tracing():
+            return _error(start_response, "409 Conflict", "tracemalloc not started")
+
+        limit = int(params.get("limit", 25))
+        key = params.get("key", "lineno")
+        if key not in ("lineno", "filename", "traceback"):
+            raise ValueError("key must be lineno, filename or traceback")
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            stats = snapshot.statistics(key)[:limit]
+            header = "Top allocations (first snapshot)"
+        else:
+            stats = snapshot.compare_to(previous, key)[:limit]
+            header = "Top growth since previous snapshot"
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# {header}; traced={current} peak={peak}"]
+        lines += [str(s) for s in stats]
+        body = ("\n".join(lines) + "\n").encode()
+        return _text_response(
+            start_response, "200 OK", body, "text/plain; charset=utf-8"
+        )
@@ -0,0 +1,93 @@
+"""
+src/api/server.py
+HTTP server shared by /metrics and the read-only query endpoints.
+
+Replaces `prometheus_client.start_http_server` with the same threading WSGI
+server, plus a small prefix router so additional apps can live on the same
+port as the Prometheus exposition.
+"""
+
+import logging
+import threading
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from prometheus_client import REGISTRY, make_wsgi_app
+
+log = logging.getLogger("api")
+
+WsgiApp = Callable[[Dict[str, Any], Callable], Iterable[bytes]]
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """One thread per request so a slow client never blocks a scrape."""
+
+    daemon_threads = True
+
+
+class _SilentHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def json_response(
+    start_response: Callable,
+    status: str,
+    body: bytes,
+    headers: Optional[Iterable[Tuple[str, str]]] = None,
+) -> Iterable[bytes]:
+    start_response(
+        status,
+        [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body))),
+            *(headers or ()),
+        ],
+    )
+    return [body]
+
+
+def not_found(environ, start_response) -> Iterable[bytes]:
+    return json_response(start_response, "404 Not Found", b'{"error":"not found"}')
+
+
+def make_app(routes: Optional[Dict[str, WsgiApp]] = None, registry=REGISTRY) -> WsgiApp:
+    """Dispatch on the longest matching path prefix; `/metrics` is always served."""
+    table = {"/metrics": make_wsgi_app(registry)}
+    table.update(routes or {})
+    prefixes = sorted(table, key=len, reverse=True)
+
+    def app(environ, start_response):
+        path = environ.get("PATH_INFO", "") or "/"
+        for prefix in prefixes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return table[prefix](environ, start_response)
+        return not_found(environ, start_response)
+
+    return app
+
+
+def start_http_server(
+    port: int,
+    addr: str = "0.0.0.0",
+    routes: Optional[Dict[str, WsgiApp]] = None,
+    registry=REGISTRY,
+) -> Tuple[WSGIServer, threading.Thread]:
+    """Serve /metrics and `routes` from a daemon thread."""
+    httpd = make_server(
+        addr,
+        port,
+        make_app(routes, registry),
+        ThreadingWSGIServer,
+        handler_class=_SilentHandler,
+    )
+    t = threading.Thread(target=httpd.serve_forever, name="http", daemon=True)
+    t.start()
+    log.info(
+        "HTTP server listening on %s:%d (%s)",
+        addr,
+        httpd.server_port,
+        ", ".join(["/metrics", *(routes or {})]),
+    )
+    return httpd, t
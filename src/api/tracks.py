@@ -0,0 +1,153 @@
+"""
+src/api/tracks.py
+Read-only track query API served from published TrackTable snapshots.
+
+GET /tracks            filtered, paged list of active tracks
+GET /tracks/<id>       single active track
+
+Filters (all optional): id (comma separated), range_min, range_max, az_min,
+az_max, el_min, el_max, snr_min, snr_max, vr_min, vr_max, limit, offset.
+
+Responses are cached per snapshot version and carry an ETag, so repeated polls
+between publications cost a dict lookup (or a 304).
+"""
+
+import json
+import zlib
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs
+
+from api.server import json_response
+from common.track_table import TrackSnapshot, TrackTable
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# (query parameter, track attribute, is lower bound)
+_BOUNDS = (
+    ("range_min", "range_m", True),
+    ("range_max", "range_m", False),
+    ("az_min", "az_deg", True),
+    ("az_max", "az_deg", False),
+    ("el_min", "el_deg", True),
+    ("el_max", "el_deg", False),
+    ("snr_min", "snr_db", True),
+    ("snr_max", "snr_db", False),
+    ("vr_min", "vr_mps", True),
+    ("vr_max", "vr_mps", False),
+)
+
+
+class TrackQuery(NamedTuple):
+    ids: Optional[FrozenSet[int]] = None
+    bounds: Tuple[Tuple[str, float, bool], ...] = ()  # (attr, value, is_lower)
+    limit: int = DEFAULT_LIMIT
+    offset: int = 0
+
+    @classmethod
+    def from_query_string(cls, qs: str) -> "TrackQuery":
+        """Raises ValueError on malformed parameters."""
+        params = {k: v[-1] for k, v in parse_qs(qs, strict_parsing=False).items()}
+        ids = None
+        if "id" in params:
+            ids = frozenset(int(x) for x in params["id"].split(",") if x)
+        bounds = tuple(
+            (attr, float(params[name]), lower)
+            for name, attr, lower in _BOUNDS
+            if name in params
+        )
+        limit = int(params.get("limit", DEFAULT_LIMIT))
+        offset = int(params.get("offset", 0))
+        if not 0 < limit <= MAX_LIMIT or offset < 0:
+            raise ValueError(f"limit must be 1..{MAX_LIMIT} and offset >= 0")
+        return cls(ids=ids, bounds=bounds, limit=limit, offset=offset)
+
+    def matches(self, t) -> bool:
+        if self.ids is not None and t.id not in self.ids:
+            return False
+        for attr, value, lower in self.bounds:
+            v = getattr(t, attr)
+            if (v < value) if lower else (v > value):
+                return False
+        return True
+
+
+def run_query(snapshot: TrackSnapshot, query: TrackQuery) -> dict:
+    if query.ids is not None and len(query.ids) < len(snapshot.tracks):
+        candidates: Iterable = (
+            snapshot.by_id[i] for i in sorted(query.ids) if i in snapshot.by_id
+        )
+    else:
+        candidates = snapshot.tracks
+    matched = [t for t in candidates if query.matches(t)]
+    page = matched[query.offset : query.offset + query.limit]
+    return {
+        "version": snapshot.version,
+        "published_at": snapshot.published_at,
+        "total": len(matched),
+        "offset": query.offset,
+        "count": len(page),
+        "tracks": [t.model_dump(mode="json") for t in page],
+    }
+
+
+class TrackQueryApp:
+    """WSGI app mounted at /tracks."""
+
+    def __init__(self, table: TrackTable, cache_size: int = 256):
+        self.table = table
+        self.cache_size = cache_size
+        # (snapshot version, {request key: (status, etag, body)}), swapped whole
+        self._cache: Tuple[int, Dict[str, Tuple[str, str, bytes]]] = (-1, {})
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD", "GET") not in ("GET", "HEAD"):
+            return json_response(
+                start_response,
+                "405 Method Not Allowed",
+                b'{"error":"read only"}',
+                [("Allow", "GET, HEAD")],
+            )
+        snapshot = self.table.snapshot  # single atomic read; never locks
+        path = environ.get("PATH_INFO", "").rstrip("/")
+        qs = environ.get("QUERY_STRING", "")
+        key = f"{path}?{qs}"
+
+        version, cache = self._cache
+        if version != snapshot.version or len(cache) >= self.cache_size:
+            # New snapshot (or full): start over rather than evict piecemeal
+            cache = {}
+            self._cache = (snapshot.version, cache)
+        cached = cache.get(key)
+        if cached is None:
+            cached = cache[key] = self._render(snapshot, path, qs)
+
+        status, etag, body = cached
+        if etag and environ.get("HTTP_IF_NONE_MATCH") == etag:
+            start_response("304 Not Modified", [("ETag", etag)])
+            return [b""]
+        headers = [("ETag", etag), ("Cache-Control", "no-cache")] if etag else []
+        return json_response(start_response, status, body, headers)
+
+    def _render(self, snapshot: TrackSnapshot, path: str, qs: str):
+        tail = path[len("/tracks") :].lstrip("/")
+        try:
+            if tail:
+                query = TrackQuery(ids=frozenset([int(tail)]), limit=1)
+            else:
+                query = TrackQuery.from_query_string(qs)
+        except ValueError as e:
+            return ("400 Bad Request", "", json.dumps({"error": str(e)}).encode())
+
+        result = run_query(snapshot, query)
+        if tail:
+            if not result["tracks"]:
+                return ("404 Not Found", "", b'{"error":"not found"}')
+            result = {
+                "version": result["version"],
+                "published_at": result["published_at"],
+                "track": result["tracks"][0],
+            }
+        body = json.dumps(result, separators=(",", ":")).encode()
+        etag = f'"{snapshot.version}-{zlib.crc32(body):08x}"'
+        return ("200 OK", etag, body)
@@ -63,18 +63,54 @@ cd ~/radar
 uv run python -m tools.sim_udp
 
 Go back to first terminal to see application logs.
+Set RADAR_DEBUG_ENDPOINTS=1 to mount the /debug profiling endpoints, e.g.:
+curl -o ingest.pstats 'http://localhost:8000/debug/profile?seconds=10'
+curl 'http://localhost:8000/debug/profile?seconds=10&mode=sample' > ingest.folded
+
+Settings (ports, backends, batch sizes, sampling and log rates, ...) come
+from common.config: a --config file, RADAR_* variables and --set
+section.field=value. `kill -HUP <pid>` reloads the tunable ones in place.
+
+Set RADAR_HANDOFF_SOCKET=/tmp/radar-ingest.sock to restart without losing
+packets: a second instance started with the same setting takes over the UDP
+socket and the active tracks, and the running one exits.
+
 You can then access Prometheus metrics at http://localhost:8000/metrics
+and query active tracks at http://localhost:8000/tracks, for example:
+curl 'http://localhost:8000/tracks?range_max=5000&az_min=-10&az_max=10&snr_min=20'
 
 """
 
+import argparse
 import asyncio
+import json
 import logging
+import signal
+import sys
+from typing import Optional, Sequence
 
-from prometheus_client import Counter, Gauge, Enum, start_http_server
+from prometheus_client import Gauge, Enum, Info
 
+from adapter.forwarder import Forwarder, parse_endpoints
+from adapter.handoff import serve_handoff, take_over
 from adapter.ingest import run_udp_ingest
+from adapter.overload import OverloadController
+from adapter.prefilter import PreFilter, parse_cidrs, parse_keys
+from adapter.reader import bind_udp
+from adapter.sequence import SequenceTracker
+from adapter.validation import ValidationPolicy, parse_sources
 from adapter.parser import Parsed
-from common.models import HealthStatus, Track
+from api.debug import DebugApp
+from api.server import start_http_server
+from api.tracks import TrackQueryApp
+from common.config import Config, add_arguments, load_config, reload_config
+from common.loops import describe, run
+from common.metrics import LocalCounter
+from common.models import HealthStatus
+from common.ratelog import set_default_limits
+from common.records import AnyTrack
+from common.track_stats import TrackStats
+from common.track_table import TrackTable
 
 log = logging.getLogger("app")
 TEMP_C = Gauge("radar_temperature_c", "Internal temperature (C)")
@@ -85,17 +121,57 @@ RADAR_MODE = Enum(
     "Current radar operating mode",
     states=["BOOT", "STANDBY", "OPERATIONAL", "FAULT"],
 )
-PKTS_TOTAL = Counter(
+PKTS_TOTAL = LocalCounter(
     "radar_packets_total",
     "Total UDP packets received by kind",
     labelnames=("kind",),
 )
+# Pre-bound cells: no label lookup or lock per packet
+_PKTS_TRACK = PKTS_TOTAL.labels(kind="track")
+_PKTS_HEALTH = PKTS_TOTAL.labels(kind="health")
+_PKTS_FRAME = PKTS_TOTAL.labels(kind="frame")
+_PKTS_UNKNOWN = PKTS_TOTAL.labels(kind="unknown")
+RUNTIME = Info("radar_runtime", "Event loop and UDP ingest backend in use")
+
+# Settings: defaults < config file (--config / RADAR_CONFIG) < RADAR_* env <
+# --set section.field=value; see common.config. Read by load(), not on import
+# (importing never fails on a bad setting), and re-read on SIGHUP.
+CLI = argparse.ArgumentParser(prog="app", description="Radar UDP ingest")
+add_arguments(CLI)
+ARGS = CLI.parse_args([])
+CONFIG = Config()
+
+# Active tracks, published to the query API as immutable snapshots
+TRACKS = TrackTable(ttl_s=CONFIG.tracks.ttl_s)
+
+# Range / SNR / radial-velocity distributions and active tracks per sector
+STATS = TrackStats(
+    TRACKS,
+    window_s=CONFIG.tracks.stats_window_s,
+    sectors=CONFIG.tracks.stats_sectors,
+    batch_max=CONFIG.tracks.stats_batch_max,
+)
+
+FORWARDER: Optional[Forwarder] = None  # created in main() when endpoints are set
+
+# Log one track update in this many (log.track_one_in)
+TRACK_LOG_ONE_IN = CONFIG.log.track_one_in
+_tracks_unlogged = 0
 
 
 def handle(msg: Parsed):
+    global _tracks_unlogged
     if msg.kind == "track":
-        PKTS_TOTAL.labels(kind="track").inc()
-        t: Track = msg.payload  # type: ignore
+        _PKTS_TRACK.inc()
+        t: AnyTrack = msg.payload  # type: ignore
+        TRACKS.update(t)
+        STATS.add(t)
+        if FORWARDER is not None:
+            FORWARDER.submit(t)
+        _tracks_unlogged += 1
+        if _tracks_unlogged < TRACK_LOG_ONE_IN:
+            return
+        _tracks_unlogged = 0
         log.info(
             "Track id=%s range=%.1f az=%.1f el=%.1f vr=%.1f snr=%.1f",
             t.id,
@@ -106,7 +182,7 @@ def handle(msg: Parsed):
             t.snr_db,
         )
     elif msg.kind == "health":
-        PKTS_TOTAL.labels(kind="health").inc()
+        _PKTS_HEALTH.inc()
         h: HealthStatus = msg.payload  # type: ignore
         TEMP_C.set(h.temperature_c)
         CPU_PCT.set(float(h.cpu_load_pct))
@@ -120,18 +196,215 @@ def handle(msg: Parsed):
             h.supply_v,
         )
     elif msg.kind == "frame":
-        PKTS_TOTAL.labels(kind="frame").inc()
+        _PKTS_FRAME.inc()
         tracks = msg.payload.get("tracks", [])  # type: ignore
+        for t in tracks:
+            TRACKS.update(t)
+        STATS.add_many(tracks)
+        if FORWARDER is not None:
+            FORWARDER.submit_many(tracks)
         log.info("Frame received: %d tracks", len(tracks))
     else:
-        PKTS_TOTAL.labels(kind="unknown").inc()
+        _PKTS_UNKNOWN.inc()
         log.warning("Unknown packet kind: %s", msg.kind)
 
 
+def load(argv: Optional[Sequence[str]] = None) -> Config:
+    """
+    Parse the command line (`sys.argv` by default) and the settings into
+    `ARGS` / `CONFIG`, and size the module-level objects to them. Raises
+    ValueError (or OSError for an unreadable file) on bad settings.
+    """
+    global ARGS, CONFIG
+    args = CLI.parse_args(argv)
+    cfg = load_config(args.config, args.set)
+    STATS.configure(cfg.tracks.stats_window_s, cfg.tracks.stats_sectors)
+    ARGS, CONFIG = args, cfg
+    apply_tunables(cfg)
+    return cfg
+
+
+def configure_logging(cfg: Config) -> None:
+    level = getattr(logging, cfg.log.level)
+    for name in ("app", "ingest"):
+        logging.getLogger(name).setLevel(level)
+    set_default_limits(cfg.log.error_interval_s, cfg.log.error_burst)
+
+
+def apply_tunables(
+    cfg: Config,
+    overload: Optional[OverloadController] = None,
+    sequencer: Optional[SequenceTracker] = None,
+    validation: Optional[ValidationPolicy] = None,
+) -> None:
+    """Push the reloadable settings (`config.TUNABLE`) into running objects."""
+    global TRACK_LOG_ONE_IN
+    configure_logging(cfg)
+    TRACK_LOG_ONE_IN = cfg.log.track_one_in
+    TRACKS.ttl_s = cfg.tracks.ttl_s
+    STATS.batch_max = cfg.tracks.stats_batch_max
+    if overload is not None:
+        overload.keep_one_in = cfg.overload.keep_one_in
+        overload.on_delay_s = cfg.overload.on_delay_s
+        overload.off_delay_s = cfg.overload.off_delay_s
+    if sequencer is not None:
+        sequencer.max_delay_s = cfg.sequence.max_delay_s
+        sequencer.idle_ttl_s = cfg.sequence.idle_ttl_s
+    if validation is not None:
+        validation.sample_one_in = cfg.validation.sample_one_in
+    if FORWARDER is not None:
+        FORWARDER.tune(
+            batch_max=cfg.forward.batch,
+            linger_s=cfg.forward.linger_s,
+            buffer_tracks=cfg.forward.buffer,
+        )
+
+
 async def main():
-    start_http_server(8000)  # /metrics
-    await run_udp_ingest(handler=handle, port=9999)
+    global FORWARDER
+    cfg = CONFIG
+    configure_logging(cfg)
+    ing = cfg.ingest
+
+    # Restart: inherit the bound UDP socket from a running instance, if any.
+    # The socket is bound here, once; nothing after this point rebinds it.
+    takeover = await take_over(ing.handoff_socket) if ing.handoff_socket else None
+    if takeover is not None:
+        sock = takeover.sock
+    else:
+        sock = bind_udp(ing.host, ing.port, rcvbuf=ing.rcvbuf_bytes or None)
+
+    overload = None
+    if cfg.overload.policy != "off" and ing.backend == "asyncio":
+        overload = OverloadController(
+            cfg.overload.policy,
+            keep_one_in=cfg.overload.keep_one_in,
+            on_delay_s=cfg.overload.on_delay_s,
+            off_delay_s=cfg.overload.off_delay_s,
+        )
+    sequencer = None
+    if cfg.sequence.window > 0:
+        sequencer = SequenceTracker(
+            window=cfg.sequence.window,
+            max_delay_s=cfg.sequence.max_delay_s,
+            idle_ttl_s=cfg.sequence.idle_ttl_s,
+        )
+
+    validation = None
+    sources = parse_sources(cfg.validation.sources)
+    if cfg.validation.default != "full" or sources:
+        validation = ValidationPolicy(
+            cfg.validation.default,
+            sample_one_in=cfg.validation.sample_one_in,
+            sources=sources,
+        )
+
+    prefilter = PreFilter(
+        allow=parse_cidrs(ing.allow_sources), hmac_keys=parse_keys(ing.hmac_keys)
+    )
+
+    endpoints = parse_endpoints(cfg.forward.endpoints)
+    if endpoints:
+        FORWARDER = Forwarder(
+            endpoints,
+            encoding=cfg.forward.encoding,
+            batch_max=cfg.forward.batch,
+            linger_s=cfg.forward.linger_s,
+            buffer_tracks=cfg.forward.buffer,
+            connections=cfg.forward.connections,
+        )
+        FORWARDER.start()
+
+    def reload() -> None:
+        global CONFIG
+        try:
+            CONFIG, changed = reload_config(CONFIG, ARGS.config, ARGS.set)
+        except (OSError, ValueError) as e:
+            log.error("config reload failed; keeping current settings: %s", e)
+            return
+        apply_tunables(CONFIG, overload, sequencer, validation)
+        log.info(
+            "config reloaded: %s",
+            ", ".join(f"{k}={v}" for k, v in changed.items()) or "no changes",
+        )
+
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload)
+
+    loop_name = describe()
+    threads = ing.reader_threads if ing.backend == "threaded" else 0
+    log.info(
+        "event loop: %s; ingest backend: %s%s",
+        loop_name,
+        ing.backend,
+        f" ({threads} reader threads)" if threads else "",
+    )
+    RUNTIME.info(
+        {
+            "event_loop": loop_name,
+            "ingest_backend": ing.backend,
+            "reader_threads": str(threads),
+        }
+    )
+
+    ingest = asyncio.create_task(
+        run_udp_ingest(
+            handler=handle,
+            records=True,
+            overload=overload,
+            sequencer=sequencer,
+            validation=validation,
+            prefilter=prefilter,
+            backend=ing.backend,
+            reader_threads=ing.reader_threads,
+            sock=sock,
+            reader_batch=ing.reader_batch,
+        )
+    )
+    if takeover is not None:
+        # Predecessor stops reading, drains and frees the HTTP port
+        await takeover.finish(TRACKS.import_state)
+
+    routes = {"/tracks": TrackQueryApp(TRACKS)}
+    if cfg.http.debug_endpoints:
+        routes["/debug"] = DebugApp(asyncio.get_running_loop())
+    httpd, _ = start_http_server(cfg.http.port, cfg.http.host, routes=routes)
+
+    async def stop_for_handoff():
+        ingest.cancel()
+        await asyncio.gather(ingest, return_exceptions=True)  # drains
+        await asyncio.to_thread(httpd.shutdown)
+        httpd.server_close()
+
+    interval_s = cfg.tracks.snapshot_interval_s
+    publisher = asyncio.create_task(TRACKS.publish_forever(interval_s))
+    stats = asyncio.create_task(STATS.flush_forever(interval_s))
+    handoff = None
+    if ing.handoff_socket:
+        handoff = asyncio.create_task(
+            serve_handoff(
+                ing.handoff_socket, sock, stop_for_handoff, TRACKS.export_state
+            )
+        )
+    try:
+        # With handoff enabled, run until a successor has taken over
+        await (ingest if handoff is None else handoff)
+    finally:
+        for task in (publisher, stats, ingest, handoff):
+            if task is not None:
+                task.cancel()
+        if FORWARDER is not None:
+            await FORWARDER.close()  # send what is still batched or queued
+        await asyncio.to_thread(httpd.shutdown)
+        httpd.server_close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        load()
+    except (OSError, ValueError) as e:
+        CLI.exit(2, f"app: invalid settings: {e}\n")
+    if ARGS.print_config:
+        print(json.dumps(CONFIG.model_dump(), indent=2))
+        sys.exit(0)
+    run(main(), loop=CONFIG.ingest.event_loop)
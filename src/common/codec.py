@@ -0,0 +1,159 @@
+"""
+Track batch encodings for downstream consumers.
+
+Two encodings of a batch of tracks:
+
+  "json"    the frame packet ingest accepts, `{"tracks": [{...}, ...]}`, with
+            `ts` as integer epoch nanoseconds;
+  "binary"  a 5-byte header (magic `b"RT"`, version, little-endian uint16
+            track count) followed by one 56-byte record per track:
+            int64 ts_ns, uint64 id, then float64 range_m, az_deg, el_deg,
+            vr_mps, snr_db (all little-endian).
+
+A binary batch never starts with `{`, so the two are told apart by the
+first byte; ingest parses both (`adapter.parser.parse_packet`). On stream
+transports each batch is framed with a 4-byte big-endian length (`frame`); a
+UDP datagram carries one batch unframed.
+"""
+
+import json
+import struct
+from typing import Iterable, List, Sequence, Tuple
+
+from common.records import AnyTrack, TrackRecord
+
+ENCODINGS = ("json", "binary")
+
+MAGIC = b"RT"
+VERSION = 1
+HEADER = struct.Struct("<2sBH")
+RECORD = struct.Struct("<qQ5d")
+LENGTH = struct.Struct(">I")
+_ID = struct.Struct("<Q")
+_ID_OFFSET = 8  # of the id within a record
+MAX_BATCH = 0xFFFF  # binary track count field
+
+TrackRow = Tuple[int, int, float, float, float, float, float]
+
+
+def track_row(t: AnyTrack) -> TrackRow:
+    """(ts_ns, id, range_m, az_deg, el_deg, vr_mps, snr_db) of any track type."""
+    if not isinstance(t, TrackRecord):
+        t = TrackRecord.from_model(t)
+    return (t.ts_ns, t.id, t.range_m, t.az_deg, t.el_deg, t.vr_mps, t.snr_db)
+
+
+def encode_tracks(tracks: Sequence[AnyTrack], encoding: str = "json") -> bytes:
+    """One batch of tracks in `encoding` (unframed)."""
+    if encoding == "binary":
+        if len(tracks) > MAX_BATCH:
+            raise ValueError(f"binary batch holds at most {MAX_BATCH} tracks")
+        buf = bytearray(HEADER.size + RECORD.size * len(tracks))
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, len(tracks))
+        pack_into = RECORD.pack_into
+        off = HEADER.size
+        for t in tracks:
+            pack_into(buf, off, *track_row(t))
+            off += RECORD.size
+        return bytes(buf)
+    if encoding == "json":
+        rows = []
+        for t in tracks:
+            ts_ns, tid, rng, az, el, vr, snr = track_row(t)
+            rows.append(
+                {
+                    "ts": ts_ns,
+                    "id": tid,
+                    "range_m": rng,
+                    "az_deg": az,
+                    "el_deg": el,
+                    "vr_mps": vr,
+                    "snr_db": snr,
+                }
+            )
+        return json.dumps({"tracks": rows}, separators=(",", ":")).encode()
+    raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+
+
+def encodable(t: AnyTrack, encoding: str = "json") -> bool:
+    """Whether `t` fits `encoding`; binary needs an int64 ts_ns and uint64 id."""
+    try:
+        encode_tracks((t,), encoding)
+    except (struct.error, OverflowError):
+        return False
+    return True
+
+
+def is_binary(data) -> bool:
+    return data[:2] == MAGIC
+
+
+def decode_tracks(data) -> List[TrackRecord]:
+    """Tracks of one JSON or binary batch (raises ValueError if malformed)."""
+    if is_binary(data):
+        return decode_binary(data)
+    obj = json.loads(str(data, "utf-8"))
+    if not isinstance(obj, dict) or not isinstance(obj.get("tracks"), list):
+        raise ValueError('expected a {"tracks": [...]} batch')
+    return [TrackRecord.from_dict(t) for t in obj["tracks"]]
+
+
+def binary_count(data) -> int:
+    """Track count of a binary batch after checking its header and length."""
+    if len(data) < HEADER.size:
+        raise ValueError("binary batch: truncated header")
+    magic, version, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("binary batch: bad magic")
+    if version != VERSION:
+        raise ValueError(f"binary batch: unsupported version {version}")
+    if len(data) != HEADER.size + count * RECORD.size:
+        raise ValueError(f"binary batch: {len(data)} bytes for {count} tracks")
+    return count
+
+
+def decode_binary(data, validate: bool = True) -> List[TrackRecord]:
+    """
+    Tracks of a binary batch. With `validate`, each record gets `Track`'s
+    value constraints (`TrackRecord.validated`); otherwise it is taken as is.
+    """
+    binary_count(data)
+    rows = RECORD.iter_unpack(memoryview(data)[HEADER.size :])
+    if validate:
+        return [TrackRecord.validated(*row) for row in rows]
+    return [TrackRecord(*row) for row in rows]
+
+
+def binary_ids(data) -> List[int]:
+    """Track ids of a binary batch, without decoding the records."""
+    count = binary_count(data)
+    unpack_from = _ID.unpack_from
+    base = HEADER.size + _ID_OFFSET
+    return [unpack_from(data, base + i * RECORD.size)[0] for i in range(count)]
+
+
+def binary_subset(data, indices: Sequence[int]) -> bytes:
+    """A binary batch holding the records of `data` at `indices`, in order."""
+    view = memoryview(data)
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(indices)))
+    for i in indices:
+        start = HEADER.size + i * RECORD.size
+        out += view[start : start + RECORD.size]
+    return bytes(out)
+
+
+def frame(body: bytes) -> bytes:
+    """`body` with its 4-byte big-endian length prefix, for stream transports."""
+    return LENGTH.pack(len(body)) + body
+
+
+def iter_frames(buf: bytearray) -> Iterable[bytes]:
+    """Pop every complete length-prefixed frame off the front of `buf`."""
+    while len(buf) >= LENGTH.size:
+        (size,) = LENGTH.unpack_from(buf, 0)
+        end = LENGTH.size + size
+        if len(buf) < end:
+            break
+        body = bytes(buf[LENGTH.size : end])
+        del buf[:end]
+        yield body
@@ -0,0 +1,336 @@
+"""
+Typed runtime configuration for the app, the simulator and the tools.
+
+Settings come from four sources, lowest precedence first:
+
+  defaults       the field defaults below;
+  config file    TOML (Python 3.11+) or JSON with one table per section,
+                 named by `--config` or RADAR_CONFIG;
+  environment    the RADAR_* variables in `ENV`;
+  command line   `--set section.field=value` (repeatable).
+
+Everything is validated on load (types, ranges, choices), so a bad value
+fails at startup instead of in the middle of ingest.
+
+`reload_config` reads the same sources again, typically on SIGHUP. Changes to
+`TUNABLE` fields (batch sizes, sampling rates, log rates, delays) are
+returned for the caller to apply to the running objects. Any other change
+(ports, backends, endpoints, ...) is logged and ignored until the next
+restart. A reload therefore never rebinds the UDP socket or drops packets
+already queued.
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Literal, Mapping, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+log = logging.getLogger("app")
+
+
+class _Section(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class IngestConfig(_Section):
+    host: str = "0.0.0.0"
+    port: int = Field(9999, ge=0, le=65535)
+    backend: Literal["asyncio", "threaded"] = "asyncio"
+    reader_threads: int = Field(1, ge=1)
+    reader_batch: int = Field(256, ge=1)  # datagrams per reader-thread hand-off
+    rcvbuf_bytes: int = Field(0, ge=0)  # SO_RCVBUF; 0 keeps the OS default
+    event_loop: Literal["asyncio", "uvloop", "auto"] = "asyncio"
+    handoff_socket: str = ""
+    allow_sources: str = ""  # CIDRs, "10.0.0.0/8,192.168.1.5"; empty admits all
+    hmac_keys: str = ""  # "radar-a=<hex>,10.0.0.5=<hex>,*=<hex>"
+
+
+class HttpConfig(_Section):
+    host: str = "0.0.0.0"
+    port: int = Field(8000, ge=0, le=65535)
+    debug_endpoints: bool = False
+
+
+class OverloadConfig(_Section):
+    policy: Literal["sample", "latest", "off"] = "sample"
+    keep_one_in: int = Field(4, ge=1)
+    on_delay_s: float = Field(0.05, gt=0)
+    off_delay_s: float = Field(0.01, ge=0)
+
+    @model_validator(mode="after")
+    def _hysteresis(self):
+        if self.off_delay_s > self.on_delay_s:
+            raise ValueError("off_delay_s must not exceed on_delay_s")
+        return self
+
+
+class SequenceConfig(_Section):
+    window: int = Field(64, ge=0, le=64)  # packets; 0 disables sequencing
+    max_delay_s: float = Field(0.05, gt=0)
+    idle_ttl_s: float = Field(300.0, gt=0)  # forget sources silent this long
+
+
+class ValidationConfig(_Section):
+    default: Literal["full", "sampled", "structural"] = "full"
+    sample_one_in: int = Field(16, ge=1)
+    sources: str = ""  # "10.0.0.5=sampled,radar-b=structural"
+
+
+class ForwardConfig(_Section):
+    endpoints: str = ""  # "tcp://10.0.0.9:7000,udp://10.0.0.9:7001"
+    encoding: Literal["json", "binary"] = "json"
+    batch: int = Field(256, ge=1, le=0xFFFF)
+    linger_s: float = Field(0.05, ge=0)
+    buffer: int = Field(10_000, ge=1)  # queued tracks per endpoint
+    connections: int = Field(2, ge=1)
+
+
+class TracksConfig(_Section):
+    ttl_s: float = Field(10.0, gt=0)
+    snapshot_interval_s: float = Field(0.5, gt=0)
+    stats_window_s: float = Field(60.0, gt=0)
+    stats_sectors: int = Field(12, ge=1)
+    stats_batch_max: int = Field(4096, ge=1)
+
+    @field_validator("stats_sectors")
+    @classmethod
+    def _divides_circle(cls, v: int) -> int:
+        if 360 % v:
+            raise ValueError("stats_sectors must divide 360")
+        return v
+
+
+class LogConfig(_Section):
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    error_interval_s: float = Field(1.0, gt=0)  # per-packet error log budget...
+    error_burst: int = Field(5, ge=1)  # ...records per key per interval
+    track_one_in: int = Field(1, ge=1)  # log every Nth track update
+
+
+class SimulatorConfig(_Section):
+    host: str = "127.0.0.1"
+    port: int = Field(9999, ge=1, le=65535)
+    rate_hz: float = Field(10.0, gt=0)
+    health_every: int = Field(50, ge=1)  # tracks between health packets
+    hmac_key: str = ""  # hex; signs every packet when set
+    event_loop: Literal["asyncio", "uvloop", "auto"] = "asyncio"
+
+    @field_validator("hmac_key")
+    @classmethod
+    def _hex(cls, v: str) -> str:
+        bytes.fromhex(v)
+        return v
+
+
+class Config(_Section):
+    ingest: IngestConfig = Field(default_factory=IngestConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
+    overload: OverloadConfig = Field(default_factory=OverloadConfig)
+    sequence: SequenceConfig = Field(default_factory=SequenceConfig)
+    validation: ValidationConfig = Field(default_factory=ValidationConfig)
+    forward: ForwardConfig = Field(default_factory=ForwardConfig)
+    tracks: TracksConfig = Field(default_factory=TracksConfig)
+    log: LogConfig = Field(default_factory=LogConfig)
+    simulator: SimulatorConfig = Field(default_factory=SimulatorConfig)
+
+
+# Environment variable -> the field(s) it sets
+ENV: Dict[str, Tuple[str, ...]] = {
+    "RADAR_INGEST_HOST": ("ingest.host",),
+    "RADAR_INGEST_PORT": ("ingest.port",),
+    "RADAR_INGEST_BACKEND": ("ingest.backend",),
+    "RADAR_READER_THREADS": ("ingest.reader_threads",),
+    "RADAR_READER_BATCH": ("ingest.reader_batch",),
+    "RADAR_RCVBUF_BYTES": ("ingest.rcvbuf_bytes",),
+    "RADAR_EVENT_LOOP": ("ingest.event_loop", "simulator.event_loop"),
+    "RADAR_HANDOFF_SOCKET": ("ingest.handoff_socket",),
+    "RADAR_ALLOW_SOURCES": ("ingest.allow_sources",),
+    "RADAR_HMAC_KEYS": ("ingest.hmac_keys",),
+    "RADAR_HTTP_PORT": ("http.port",),
+    "RADAR_DEBUG_ENDPOINTS": ("http.debug_endpoints",),
+    "RADAR_SHED_POLICY": ("overload.policy",),
+    "RADAR_SHED_KEEP_ONE_IN": ("overload.keep_one_in",),
+    "RADAR_SHED_ON_DELAY_S": ("overload.on_delay_s",),
+    "RADAR_SHED_OFF_DELAY_S": ("overload.off_delay_s",),
+    "RADAR_SEQ_WINDOW": ("sequence.window",),
+    "RADAR_SEQ_MAX_DELAY_S": ("sequence.max_delay_s",),
+    "RADAR_SEQ_IDLE_TTL_S": ("sequence.idle_ttl_s",),
+    "RADAR_VALIDATION": ("validation.default",),
+    "RADAR_VALIDATION_SAMPLE_ONE_IN": ("validation.sample_one_in",),
+    "RADAR_VALIDATION_SOURCES": ("validation.sources",),
+    "RADAR_FORWARD_ENDPOINTS": ("forward.endpoints",),
+    "RADAR_FORWARD_ENCODING": ("forward.encoding",),
+    "RADAR_FORWARD_BATCH": ("forward.batch",),
+    "RADAR_FORWARD_LINGER_S": ("forward.linger_s",),
+    "RADAR_FORWARD_BUFFER": ("forward.buffer",),
+    "RADAR_FORWARD_CONNECTIONS": ("forward.connections",),
+    "RADAR_TRACK_TTL_S": ("tracks.ttl_s",),
+    "RADAR_SNAPSHOT_INTERVAL_S": ("tracks.snapshot_interval_s",),
+    "RADAR_STATS_WINDOW_S": ("tracks.stats_window_s",),
+    "RADAR_STATS_SECTORS": ("tracks.stats_sectors",),
+    "RADAR_STATS_BATCH_MAX": ("tracks.stats_batch_max",),
+    "RADAR_LOG_LEVEL": ("log.level",),
+    "RADAR_LOG_ERROR_INTERVAL_S": ("log.error_interval_s",),
+    "RADAR_LOG_ERROR_BURST": ("log.error_burst",),
+    "RADAR_LOG_TRACK_ONE_IN": ("log.track_one_in",),
+    # Simulator target (kept short for docker-compose)
+    "RADAR_HOST": ("simulator.host",),
+    "RADAR_PORT": ("simulator.port",),
+    "RADAR_SIM_RATE_HZ": ("simulator.rate_hz",),
+    "RADAR_SIM_HEALTH_EVERY": ("simulator.health_every",),
+    "RADAR_HMAC_KEY": ("simulator.hmac_key",),
+}
+
+# Fields a reload applies to running objects; others need a restart
+TUNABLE = frozenset(
+    {
+        "overload.keep_one_in",
+        "overload.on_delay_s",
+        "overload.off_delay_s",
+        "sequence.max_delay_s",
+        "sequence.idle_ttl_s",
+        "validation.sample_one_in",
+        "forward.batch",
+        "forward.linger_s",
+        "forward.buffer",
+        "tracks.ttl_s",
+        "tracks.stats_batch_max",
+        "log.level",
+        "log.error_interval_s",
+        "log.error_burst",
+        "log.track_one_in",
+        "simulator.rate_hz",
+        "simulator.health_every",
+    }
+)
+
+
+def _put(tree: Dict[str, Any], key: str, value: Any) -> None:
+    section, sep, field = key.partition(".")
+    if not sep or not section or not field:
+        raise ValueError(f"expected section.field, got {key!r}")
+    sub = tree.setdefault(section, {})
+    if not isinstance(sub, dict):
+        raise ValueError(f"{section!r} must be a table of settings")
+    sub[field] = value
+
+
+def _merge(base: Dict[str, Any], layer: Mapping[str, Any]) -> None:
+    for section, values in layer.items():
+        if not isinstance(values, Mapping):
+            raise ValueError(f"{section!r} must be a table of settings")
+        base.setdefault(section, {}).update(values)
+
+
+def read_file(path: str) -> Dict[str, Any]:
+    """Settings from a TOML or JSON file, by extension."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(
+                f"{path}: TOML config needs Python 3.11+; use JSON"
+            ) from None
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a table of sections")
+    return data
+
+
+def from_env(environ: Mapping[str, str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for var, keys in ENV.items():
+        if var in environ:
+            for key in keys:
+                _put(tree, key, environ[var])
+    return tree
+
+
+def from_overrides(items: Iterable[str]) -> Dict[str, Any]:
+    """`["forward.batch=512", ...]` -> settings."""
+    tree: Dict[str, Any] = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"expected section.field=value, got {item!r}")
+        _put(tree, key.strip(), value.strip())
+    return tree
+
+
+def load_config(
+    path: Optional[str] = None,
+    overrides: Iterable[str] = (),
+    environ: Optional[Mapping[str, str]] = None,
+) -> Config:
+    """Validated settings from defaults < file < environment < overrides."""
+    environ = os.environ if environ is None else environ
+    path = path or environ.get("RADAR_CONFIG") or None
+    tree: Dict[str, Any] = {}
+    if path:
+        _merge(tree, read_file(path))
+    _merge(tree, from_env(environ))
+    _merge(tree, from_overrides(overrides))
+    return Config.model_validate(tree)
+
+
+def flatten(config: Config) -> Dict[str, Any]:
+    """{"section.field": value} for every setting."""
+    return {
+        f"{section}.{field}": value
+        for section, values in config.model_dump().items()
+        for field, value in values.items()
+    }
+
+
+def changes(old: Config, new: Config) -> Dict[str, Any]:
+    """Settings whose value differs in `new`, with the new values."""
+    before = flatten(old)
+    return {k: v for k, v in flatten(new).items() if before[k] != v}
+
+
+def reload_config(
+    current: Config,
+    path: Optional[str] = None,
+    overrides: Iterable[str] = (),
+    environ: Optional[Mapping[str, str]] = None,
+) -> Tuple[Config, Dict[str, Any]]:
+    """
+    Re-read the sources. Returns the config to run with (`current` plus the
+    tunable changes) and those changes; raises ValueError / OSError, leaving
+    `current` untouched, if the sources no longer load.
+    """
+    new = load_config(path, overrides, environ)
+    changed = changes(current, new)
+    fixed = sorted(k for k in changed if k not in TUNABLE)
+    if fixed:
+        log.warning("config: restart needed to apply %s", ", ".join(fixed))
+    tunable = {k: v for k, v in changed.items() if k in TUNABLE}
+    tree = current.model_dump()
+    for key, value in tunable.items():
+        _put(tree, key, value)
+    return Config.model_validate(tree), tunable
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--config", help="TOML or JSON settings file (default: $RADAR_CONFIG)"
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="SECTION.FIELD=VALUE",
+        help="override one setting; repeatable",
+    )
+    parser.add_argument(
+        "--print-config",
+        action="store_true",
+        help="print the effective settings as JSON and exit",
+    )
@@ -0,0 +1,83 @@
+"""
+Event loop implementation selection.
+
+`run(main, loop=...)` replaces `asyncio.run(main)` with a choice of loop:
+
+  "asyncio"  the standard library loop (the default);
+  "uvloop"   uvloop, which must be installed (`pip install uvloop`);
+  "auto"     uvloop if it is installed, else the standard loop.
+
+The choice is independent of the ingest backend (`RADAR_INGEST_BACKEND`):
+the threaded reader still delivers to whichever loop is running.
+"""
+
+import asyncio
+import sys
+from typing import Any, Callable, Coroutine, Optional
+
+LOOPS = ("asyncio", "uvloop", "auto")
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+
+def uvloop_available() -> bool:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve(name: str) -> str:
+    """The concrete loop ("asyncio" or "uvloop") that `name` selects."""
+    if name not in LOOPS:
+        raise ValueError(f"event loop must be one of {LOOPS}, got {name!r}")
+    if name == "auto":
+        return "uvloop" if uvloop_available() else "asyncio"
+    return name
+
+
+def loop_factory(name: str) -> LoopFactory:
+    """Factory for the named loop; raise if it is unknown or not installed."""
+    if resolve(name) == "asyncio":
+        return asyncio.new_event_loop
+    try:
+        import uvloop
+    except ImportError:
+        raise RuntimeError("event loop 'uvloop' requested but not installed") from None
+    return uvloop.new_event_loop
+
+
+def run(main: Coroutine[Any, Any, Any], loop: str = "asyncio") -> Any:
+    """`asyncio.run(main)` on the chosen loop implementation."""
+    factory = loop_factory(loop)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=factory) as runner:
+            return runner.run(main)
+    ev = factory()
+    try:
+        asyncio.set_event_loop(ev)
+        return ev.run_until_complete(main)
+    finally:
+        try:
+            tasks = asyncio.all_tasks(ev)
+            for task in tasks:
+                task.cancel()
+            ev.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            ev.run_until_complete(ev.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            ev.close()
+
+
+def describe(loop: Optional[asyncio.AbstractEventLoop] = None) -> str:
+    """Human-readable name of `loop` (default: the running one) for startup logs."""
+    loop = loop or asyncio.get_running_loop()
+    cls = type(loop)
+    if cls.__module__.startswith("uvloop"):
+        import uvloop
+
+        return f"uvloop {uvloop.__version__}"
+    selector = getattr(loop, "_selector", None)
+    detail = f", {type(selector).__name__}" if selector is not None else ""
+    return f"asyncio ({cls.__name__}{detail})"
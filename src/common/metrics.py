@@ -0,0 +1,214 @@
+"""
+Lock-free metric accumulation for the hot path.
+
+`prometheus_client` metrics take a lock on every `inc()`/`observe()` and a
+label lookup on every `.labels(...)`. The classes here keep plain Python
+numbers per worker instead and are exported by a custom collector at scrape
+time, so the per-packet cost is a single attribute increment.
+
+Each worker thread gets its own *shard* (the creating thread uses the default
+shard). A cell is only ever written by its owning thread; the scrape thread
+only reads, and reading a Python number is atomic under the GIL, so no
+locking is needed on either side.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from prometheus_client import REGISTRY
+from prometheus_client.metrics_core import (
+    CounterMetricFamily,
+    HistogramMetricFamily,
+)
+from prometheus_client.registry import Collector
+from prometheus_client.utils import floatToGoString
+
+
+class CounterCell:
+    """One label combination of a LocalCounter, owned by one thread."""
+
+    __slots__ = ("value", "created")
+
+    def __init__(self):
+        self.value = 0
+        self.created = time.time()
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class HistogramCell:
+    """Bucket counts for one LocalHistogram shard, owned by one thread."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def observe_many(self, values: Iterable[float]) -> None:
+        bounds, counts = self.bounds, self.counts
+        total = 0.0
+        for v in values:
+            counts[bisect_left(bounds, v)] += 1
+            total += v
+        self.sum += total
+
+
+class CounterShard:
+    """Per-thread set of counter cells, keyed by label values."""
+
+    __slots__ = ("labelnames", "cells")
+
+    def __init__(self, labelnames: Tuple[str, ...]):
+        self.labelnames = labelnames
+        self.cells: Dict[Tuple[str, ...], CounterCell] = {}
+
+    def labels(self, *labelvalues: str, **labelkwargs: str) -> CounterCell:
+        """Return the cell for these labels; bind it once, outside the hot path."""
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[n] for n in self.labelnames)
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"expected labels {self.labelnames}, got {labelvalues}")
+        key = tuple(str(v) for v in labelvalues)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = CounterCell()
+        return cell
+
+
+class LocalCounter(Collector):
+    """Counter exported with the same exposition as `prometheus_client.Counter`."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry=REGISTRY,
+    ):
+        self.name = name[: -len("_total")] if name.endswith("_total") else name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._shards: Tuple[CounterShard, ...] = ()
+        self._default = self.shard()
+        if not self.labelnames:
+            self._default.labels()
+        if registry is not None:
+            registry.register(self)
+
+    def shard(self) -> CounterShard:
+        """Create a shard for a new worker thread."""
+        shard = CounterShard(self.labelnames)
+        with self._lock:
+            self._shards = self._shards + (shard,)
+        return shard
+
+    def labels(self, *labelvalues: str, **labelkwargs: str) -> CounterCell:
+        return self._default.labels(*labelvalues, **labelkwargs)
+
+    def inc(self, amount: int = 1) -> None:
+        self._default.labels().inc(amount)
+
+    def get(self, *labelvalues: str, **labelkwargs: str) -> float:
+        """Current total across all shards."""
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[n] for n in self.labelnames)
+        key = tuple(str(v) for v in labelvalues)
+        return sum(s.cells[key].value for s in self._shards if key in s.cells)
+
+    def remove(self, *labelvalues: str, **labelkwargs: str) -> None:
+        """Drop one label combination from every shard (and from exposition)."""
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[n] for n in self.labelnames)
+        key = tuple(str(v) for v in labelvalues)
+        for shard in self._shards:
+            shard.cells.pop(key, None)
+
+    def total(self) -> float:
+        """Current total across all shards and label values."""
+        return sum(c.value for s in self._shards for c in tuple(s.cells.values()))
+
+    def describe(self) -> List[CounterMetricFamily]:
+        return [
+            CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        ]
+
+    def collect(self) -> Iterable[CounterMetricFamily]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._shards:
+            for key, cell in tuple(shard.cells.items()):
+                acc = totals.get(key)
+                if acc is None:
+                    totals[key] = [cell.value, cell.created]
+                else:
+                    acc[0] += cell.value
+                    acc[1] = min(acc[1], cell.created)
+        family = CounterMetricFamily(
+            self.name, self.documentation, labels=self.labelnames
+        )
+        for key, (value, created) in totals.items():
+            family.add_metric(key, value, created=created)
+        yield family
+
+
+class LocalHistogram(Collector):
+    """Unlabelled histogram with fixed buckets, exported at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        registry=REGISTRY,
+    ):
+        bounds = tuple(sorted(float(b) for b in buckets if b != float("inf")))
+        if not bounds:
+            raise ValueError("histogram needs at least one finite bucket")
+        self.name = name
+        self.documentation = documentation
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self._shards: Tuple[HistogramCell, ...] = ()
+        self._default = self.shard()
+        if registry is not None:
+            registry.register(self)
+
+    def shard(self) -> HistogramCell:
+        cell = HistogramCell(self.bounds)
+        with self._lock:
+            self._shards = self._shards + (cell,)
+        return cell
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def observe_many(self, values: Iterable[float]) -> None:
+        self._default.observe_many(values)
+
+    def describe(self) -> List[HistogramMetricFamily]:
+        return [HistogramMetricFamily(self.name, self.documentation)]
+
+    def collect(self) -> Iterable[HistogramMetricFamily]:
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for cell in self._shards:
+            total += cell.sum
+            for i, c in enumerate(list(cell.counts)):
+                counts[i] += c
+        buckets = []
+        cumulative = 0
+        for bound, c in zip(self.bounds + (float("inf"),), counts):
+            cumulative += c
+            buckets.append((floatToGoString(bound), cumulative))
+        yield HistogramMetricFamily(
+            self.name, self.documentation, buckets=buckets, sum_value=total
+        )
@@ -0,0 +1,93 @@
+"""
+Rate-limited logging for per-packet error paths.
+
+A flood of bad datagrams must not turn into a flood of log lines: formatting
+and writing a record costs more than rejecting the packet. `RateLimitedLog`
+lets the first `burst` records of each key through per `interval_s` window
+and counts the rest; the count is reported with the first record of a later
+window ("... (123 similar suppressed)").
+
+Keys should come from a small fixed set (a rejection reason, "parse"), not
+from packet contents. Reader threads may share one instance: the counters are
+updated without a lock, so under contention a suppressed count can be off by
+a few, which is acceptable for a log line.
+
+An instance created without `interval_s` / `burst` uses the process-wide
+defaults and follows later `set_default_limits` calls, so the per-packet
+error paths can be retuned at runtime (config reload).
+"""
+
+import logging
+import time
+import weakref
+from typing import Callable, Dict, List, Optional
+
+_defaults = {"interval_s": 1.0, "burst": 5}
+_following: "weakref.WeakSet[RateLimitedLog]" = weakref.WeakSet()
+
+
+def set_default_limits(interval_s: float, burst: int) -> None:
+    """Change the default budget, including of live instances that use it."""
+    if burst < 1:
+        raise ValueError("burst must be >= 1")
+    _defaults.update(interval_s=interval_s, burst=burst)
+    for rl in list(_following):
+        for name in rl._follows:
+            setattr(rl, name, _defaults[name])
+
+
+class RateLimitedLog:
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval_s: Optional[float] = None,
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if burst is not None and burst < 1:
+            raise ValueError("burst must be >= 1")
+        self.logger = logger
+        self.interval_s = _defaults["interval_s"] if interval_s is None else interval_s
+        self.burst = _defaults["burst"] if burst is None else burst
+        self.clock = clock
+        self._follows = tuple(
+            name
+            for name, value in (("interval_s", interval_s), ("burst", burst))
+            if value is None
+        )
+        if self._follows:
+            _following.add(self)
+        # key -> [window start, emitted in window, suppressed since last emit]
+        self._windows: Dict[str, List[float]] = {}
+
+    def log(self, level: int, key: str, msg: str, *args) -> bool:
+        """Log `msg % args` unless `key` is over its budget; True if logged."""
+        now = self.clock()
+        w = self._windows.get(key)
+        if w is None:
+            w = self._windows[key] = [now, 0, 0]
+        elif now - w[0] >= self.interval_s:
+            w[0] = now
+            w[1] = 0
+        if w[1] >= self.burst:
+            w[2] += 1
+            return False
+        w[1] += 1
+        suppressed = int(w[2])
+        if suppressed:
+            w[2] = 0
+            msg += " (%d similar suppressed)"
+            args += (suppressed,)
+        self.logger.log(level, msg, *args)
+        return True
+
+    def error(self, key: str, msg: str, *args) -> bool:
+        return self.log(logging.ERROR, key, msg, *args)
+
+    def warning(self, key: str, msg: str, *args) -> bool:
+        return self.log(logging.WARNING, key, msg, *args)
+
+    def suppressed(self, key: str) -> int:
+        """Records of `key` dropped since its last emitted record."""
+        w = self._windows.get(key)
+        return int(w[2]) if w is not None else 0
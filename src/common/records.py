@@ -0,0 +1,258 @@
+"""
+Compact internal track record for the hot path.
+
+`Track` (pydantic) stays the type at API and serialization boundaries. From
+the parser onward the ingest path carries `TrackRecord` instead: a
+`__slots__` class with an integer epoch-nanosecond timestamp that applies the
+same field constraints as `Track` with plain comparisons. Attribute names
+match `Track`, so handlers can read either.
+
+JSON-native values take a fast path; anything else (numeric strings, a
+float `ts`) is coerced by pydantic's lax mode, so a packet `Track` accepts
+is accepted here too. Unlike `Track`, a `ts` without a UTC offset is read
+as UTC, since the record holds epoch nanoseconds.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+from pydantic import TypeAdapter, ValidationError
+
+from common.models import Track
+from common.timestamps import (
+    datetime_to_ns,
+    ns_to_datetime,
+    parse_rfc3339,
+    rfc3339_to_ns,
+)
+
+Timestamp = Union[int, str, datetime]
+
+# pydantic's coercions, for the inputs the fast paths below do not take
+_LAX_INT = TypeAdapter(int)
+_LAX_FLOAT = TypeAdapter(float)
+_LAX_DATETIME = TypeAdapter(datetime)
+
+
+def _lax(adapter: TypeAdapter, v: Any, error: str) -> Any:
+    try:
+        return adapter.validate_python(v)
+    except ValidationError:
+        raise ValueError(f"{error}: {v!r}") from None
+
+
+def to_datetime(ts: Timestamp) -> datetime:
+    """Accept epoch-ns int, RFC 3339 string or datetime; raise ValueError otherwise."""
+    if isinstance(ts, str):
+        return parse_rfc3339(ts)
+    if isinstance(ts, datetime):
+        return ts
+    return ns_to_datetime(to_ns(ts))
+
+
+def to_ns(ts: Timestamp) -> int:
+    """
+    Epoch ns from an epoch-ns int, RFC 3339 string or datetime, or whatever
+    else `Track.ts` accepts (e.g. float epoch seconds); raise ValueError otherwise.
+    """
+    if isinstance(ts, str):
+        try:
+            return rfc3339_to_ns(ts)
+        except ValueError:
+            pass  # e.g. "1763072104": epoch seconds to pydantic
+    elif isinstance(ts, int) and not isinstance(ts, bool):
+        return ts
+    elif isinstance(ts, datetime):
+        return datetime_to_ns(ts)
+    error = "ts: expected RFC 3339 string or epoch-ns int"
+    return datetime_to_ns(_lax(_LAX_DATETIME, ts, error))
+
+
+def _float(name: str, v: Any, lo: Optional[float], hi: Optional[float]) -> float:
+    f = v if isinstance(v, float) else _lax(_LAX_FLOAT, v, f"{name}: not a number")
+    # Written so that NaN fails the bound checks, as with confloat(ge=.., le=..)
+    if lo is not None and not f >= lo:
+        raise ValueError(f"{name}: {f} is below {lo}")
+    if hi is not None and not f <= hi:
+        raise ValueError(f"{name}: {f} is above {hi}")
+    return f
+
+
+def _track_id(v: Any) -> int:
+    i = v if type(v) is int else _lax(_LAX_INT, v, "id: not an integer")
+    if i < 0:
+        raise ValueError(f"id: {i} is negative")
+    return i
+
+
+class TrackRecord:
+    """Slotted, validated equivalent of `Track` with `ts_ns` epoch nanoseconds."""
+
+    __slots__ = (
+        "ts_ns",
+        "id",
+        "range_m",
+        "az_deg",
+        "el_deg",
+        "vr_mps",
+        "snr_db",
+        "_ts",
+    )
+
+    def __init__(
+        self,
+        ts_ns: int,
+        id: int,
+        range_m: float,
+        az_deg: float,
+        el_deg: float,
+        vr_mps: float,
+        snr_db: float,
+    ):
+        """Unchecked construction; use `validated()` for untrusted input."""
+        self.ts_ns = ts_ns
+        self.id = id
+        self.range_m = range_m
+        self.az_deg = az_deg
+        self.el_deg = el_deg
+        self.vr_mps = vr_mps
+        self.snr_db = snr_db
+        self._ts: Optional[datetime] = None
+
+    @classmethod
+    def validated(
+        cls,
+        ts: Timestamp,
+        id: Any,
+        range_m: Any,
+        az_deg: Any,
+        el_deg: Any,
+        vr_mps: Any,
+        snr_db: Any,
+    ) -> "TrackRecord":
+        """Build a record applying `Track`'s constraints (raises ValueError)."""
+        # Fast path for the JSON-native types; anything else goes through the
+        # coercing helpers. Chained comparisons are False for NaN, matching
+        # confloat(ge=.., le=..).
+        if type(id) is not int or id < 0:
+            id = _track_id(id)
+        if type(range_m) is not float or not 0 <= range_m <= 30000:
+            range_m = _float("range_m", range_m, 0, 30000)
+        if type(az_deg) is not float or not -180 <= az_deg <= 180:
+            az_deg = _float("az_deg", az_deg, -180, 180)
+        if type(el_deg) is not float or not -10 <= el_deg <= 90:
+            el_deg = _float("el_deg", el_deg, -10, 90)
+        if type(vr_mps) is not float:
+            vr_mps = _float("vr_mps", vr_mps, None, None)
+        if type(snr_db) is not float:
+            snr_db = _float("snr_db", snr_db, None, None)
+        return cls(to_ns(ts), id, range_m, az_deg, el_deg, vr_mps, snr_db)
+
+    @classmethod
+    def from_dict(cls, obj: Dict[str, Any]) -> "TrackRecord":
+        """Validate a decoded JSON object (extra keys are ignored, as in `Track`)."""
+        try:
+            return cls.validated(
+                obj["ts"],
+                obj["id"],
+                obj["range_m"],
+                obj["az_deg"],
+                obj["el_deg"],
+                obj["vr_mps"],
+                obj["snr_db"],
+            )
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]}: field required") from None
+        except TypeError:
+            raise ValueError(f"track must be a JSON object, got {obj!r}") from None
+
+    @classmethod
+    def structural(cls, obj: Dict[str, Any]) -> "TrackRecord":
+        """
+        Unchecked build for trusted sources: required keys and JSON types
+        only, no range checks (raises ValueError if the shape is wrong).
+        """
+        try:
+            id = obj["id"]
+            floats = (
+                obj["range_m"],
+                obj["az_deg"],
+                obj["el_deg"],
+                obj["vr_mps"],
+                obj["snr_db"],
+            )
+            ts = obj["ts"]
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]}: field required") from None
+        except TypeError:
+            raise ValueError(f"track must be a JSON object, got {obj!r}") from None
+        if type(id) is not int:
+            raise ValueError(f"id: expected an integer, got {id!r}")
+        for v in floats:
+            if type(v) is not float and type(v) is not int:
+                raise ValueError(f"expected a number, got {v!r}")
+        range_m, az_deg, el_deg, vr_mps, snr_db = floats
+        return cls(
+            to_ns(ts),
+            id,
+            float(range_m),
+            float(az_deg),
+            float(el_deg),
+            float(vr_mps),
+            float(snr_db),
+        )
+
+    @classmethod
+    def from_model(cls, track: Track) -> "TrackRecord":
+        record = cls(
+            datetime_to_ns(track.ts),
+            track.id,
+            track.range_m,
+            track.az_deg,
+            track.el_deg,
+            track.vr_mps,
+            track.snr_db,
+        )
+        record._ts = track.ts
+        return record
+
+    @property
+    def ts(self) -> datetime:
+        """Timestamp as a UTC datetime, converted on first access."""
+        if self._ts is None:
+            self._ts = ns_to_datetime(self.ts_ns)
+        return self._ts
+
+    def to_model(self) -> Track:
+        """Pydantic `Track` for the API/serialization edge (already validated)."""
+        return Track.model_construct(
+            ts=self.ts,
+            id=self.id,
+            range_m=self.range_m,
+            az_deg=self.az_deg,
+            el_deg=self.el_deg,
+            vr_mps=self.vr_mps,
+            snr_db=self.snr_db,
+        )
+
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        """Same output as `Track.model_dump`, so edges can treat both alike."""
+        return self.to_model().model_dump(**kwargs)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TrackRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__[:-1])
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"TrackRecord(ts_ns={self.ts_ns}, id={self.id}, range_m={self.range_m}, "
+            f"az_deg={self.az_deg}, el_deg={self.el_deg}, vr_mps={self.vr_mps}, "
+            f"snr_db={self.snr_db})"
+        )
+
+
+# Either representation; handlers and the track table accept both
+AnyTrack = Union[Track, TrackRecord]
@@ -0,0 +1,59 @@
+"""
+RFC 3339 / epoch-ns timestamp decoding for the ingest hot path.
+
+Timestamps are decoded once into integer epoch nanoseconds; `TrackRecord`
+turns them into a `datetime` only when something asks for one.
+
+Decoding stays on the C `datetime.fromisoformat` followed by integer
+arithmetic. Caching the epoch of the shared `YYYY-MM-DDTHH` prefix and
+slicing out the remainder in Python was measured and is slower than the C
+parser in CPython (see `python -m tools.bench ts`). What does pay off is the
+frame case: the tracks of one frame usually carry the very same `ts`, so the
+last decoded string is remembered and a repeat costs one string compare.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+# fromisoformat() accepts a trailing "Z" from 3.11 on
+_NATIVE_Z = sys.version_info >= (3, 11)
+
+# (string, ns) of the last decode; one tuple so threads never see a torn pair
+_last: Tuple[str, int] = ("", 0)
+
+
+def datetime_to_ns(dt: datetime) -> int:
+    """Exact epoch-ns for a datetime; naive datetimes are taken as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return ((dt - EPOCH) // _US) * 1000
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    """UTC datetime for epoch-ns (truncated to the microsecond)."""
+    return EPOCH + timedelta(microseconds=ns // 1000)
+
+
+def parse_rfc3339(ts: str) -> datetime:
+    """Datetime for an RFC 3339 string; raise ValueError mentioning `ts`."""
+    if ts[-1:] == "z" or (not _NATIVE_Z and ts[-1:] == "Z"):
+        ts = ts[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(ts)
+    except ValueError:
+        raise ValueError(f"ts: invalid RFC 3339 timestamp {ts!r}") from None
+
+
+def rfc3339_to_ns(ts: str) -> int:
+    """Epoch-ns for an RFC 3339 string (naive times are UTC); raise ValueError."""
+    global _last
+    last = _last
+    if ts == last[0]:
+        return last[1]
+    ns = datetime_to_ns(parse_rfc3339(ts))
+    _last = (ts, ns)
+    return ns
@@ -0,0 +1,244 @@
+"""
+Streaming statistics over the track population, as fixed-cardinality metrics.
+
+Packet counters say how many tracks arrived, not what they looked like.
+`TrackStats` adds, for dashboards on capacity and sensor performance:
+
+  radar_track_range_m, radar_track_snr_db, radar_track_vr_mps
+      cumulative histograms with fixed buckets (use `rate()` for windows);
+  radar_track_range_quantile_m{quantile}, radar_track_snr_quantile_db{quantile}
+      p50 / p90 / p99 over the last `window_s` seconds;
+  radar_active_tracks_by_sector{sector}
+      active tracks per azimuth sector, from the published track snapshot.
+
+Tracks are queued by `add` (one list append) and binned in batches by
+`flush`, which the event loop runs every `interval_s` or when `batch_max`
+tracks are pending. Binning is O(1) per track: histograms bisect a dozen
+bounds, and the quantile sketches index a uniform bin grid arithmetically.
+Each sketch keeps one count array per slice of the window; a slice is
+cleared when the window moves past it, so memory and the exported series
+do not grow with traffic. Quantiles are accurate to half a bin
+(`range_resolution_m`, `snr_resolution_db`).
+"""
+
+import asyncio
+import math
+import time
+from math import isfinite
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from prometheus_client import REGISTRY
+from prometheus_client.metrics_core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from common.metrics import LocalHistogram
+from common.records import AnyTrack
+from common.track_table import TrackTable
+
+RANGE_BUCKETS_M = tuple(float(b) for b in range(2500, 30001, 2500))
+SNR_BUCKETS_DB = tuple(float(b) for b in range(-10, 61, 5))
+VR_BUCKETS_MPS = (-100.0, -50.0, -25.0, -10.0, -2.0, 2.0, 10.0, 25.0, 50.0, 100.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class WindowedSketch:
+    """
+    Quantiles of the values seen in the last `window_s` seconds, from counts
+    on a uniform grid of `resolution`-wide bins over [lo, hi). Values outside
+    the grid are clamped into the first or last bin; they must be finite.
+    """
+
+    def __init__(
+        self,
+        lo: float,
+        hi: float,
+        resolution: float,
+        window_s: float = 60.0,
+        slices: int = 6,
+    ):
+        if hi <= lo or resolution <= 0:
+            raise ValueError("need lo < hi and resolution > 0")
+        if slices < 1:
+            raise ValueError("slices must be >= 1")
+        self.lo = lo
+        self.resolution = resolution
+        self.bins = math.ceil((hi - lo) / resolution)
+        self.window_s = window_s
+        self.slice_s = window_s / slices
+        self._zeros = [0] * self.bins
+        self._slices = [list(self._zeros) for _ in range(slices)]
+        self._current = 0
+        self._slice_start: Optional[float] = None
+
+    def rotate(self, now: float) -> None:
+        """Advance the window to `now`, clearing slices that fell out of it."""
+        if self._slice_start is None:
+            self._slice_start = now
+            return
+        steps = int((now - self._slice_start) / self.slice_s)
+        if steps <= 0:
+            return
+        n = len(self._slices)
+        for _ in range(min(steps, n)):
+            self._current = (self._current + 1) % n
+            self._slices[self._current][:] = self._zeros
+        self._slice_start += steps * self.slice_s
+
+    def add_many(self, values: Iterable[float], now: float) -> None:
+        self.rotate(now)
+        counts = self._slices[self._current]
+        lo, inv, last = self.lo, 1.0 / self.resolution, self.bins - 1
+        for v in values:
+            i = int((v - lo) * inv)
+            counts[0 if i < 0 else last if i > last else i] += 1
+
+    def count(self) -> int:
+        return sum(sum(s) for s in self._slices)
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """Value at each quantile in `qs` (ascending); NaN when the window is empty."""
+        totals = [sum(col) for col in zip(*self._slices)]
+        n = sum(totals)
+        if n == 0:
+            return [math.nan] * len(qs)
+        out = []
+        cumulative = 0
+        i = 0
+        for q in qs:
+            rank = q * n
+            while i < self.bins - 1 and cumulative + totals[i] < rank:
+                cumulative += totals[i]
+                i += 1
+            # Interpolate linearly inside the bin holding the rank
+            frac = (rank - cumulative) / totals[i] if totals[i] else 0.0
+            out.append(self.lo + (i + min(max(frac, 0.0), 1.0)) * self.resolution)
+        return out
+
+
+class TrackStats(Collector):
+    def __init__(
+        self,
+        table: Optional[TrackTable] = None,
+        window_s: float = 60.0,
+        sectors: int = 12,
+        range_resolution_m: float = 25.0,
+        snr_resolution_db: float = 0.25,
+        batch_max: int = 4096,
+        registry=REGISTRY,
+    ):
+        self.table = table
+        self.range_resolution_m = range_resolution_m
+        self.snr_resolution_db = snr_resolution_db
+        self.configure(window_s, sectors)
+        self.batch_max = batch_max
+        self._pending: List[AnyTrack] = []
+        self.range_hist = LocalHistogram(
+            "radar_track_range_m",
+            "Track range (m), per track update",
+            RANGE_BUCKETS_M,
+            registry=registry,
+        )
+        self.snr_hist = LocalHistogram(
+            "radar_track_snr_db",
+            "Track SNR (dB), per track update",
+            SNR_BUCKETS_DB,
+            registry=registry,
+        )
+        self.vr_hist = LocalHistogram(
+            "radar_track_vr_mps",
+            "Track radial velocity (m/s), per track update",
+            VR_BUCKETS_MPS,
+            registry=registry,
+        )
+        if registry is not None:
+            registry.register(self)
+
+    def configure(self, window_s: float, sectors: int) -> None:
+        """Set the quantile window and sector count; the window restarts empty."""
+        if sectors < 1 or 360 % sectors:
+            raise ValueError("sectors must divide 360")
+        self.window_s = window_s
+        self.range_sketch = WindowedSketch(
+            0.0, 30000.0, self.range_resolution_m, window_s
+        )
+        self.snr_sketch = WindowedSketch(-20.0, 80.0, self.snr_resolution_db, window_s)
+        self.sector_deg = 360 // sectors
+        self._sector_labels: Tuple[str, ...] = tuple(
+            f"{a}:{a + self.sector_deg}" for a in range(-180, 180, self.sector_deg)
+        )
+
+    # ---- event loop ----------------------------------------------------------
+
+    def add(self, track: AnyTrack) -> None:
+        pending = self._pending
+        pending.append(track)
+        if len(pending) >= self.batch_max:
+            self.flush()
+
+    def add_many(self, tracks: Iterable[AnyTrack]) -> None:
+        self._pending.extend(tracks)
+        if len(self._pending) >= self.batch_max:
+            self.flush()
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """Bin every pending track; returns how many there were."""
+        now = time.monotonic() if now is None else now
+        batch, self._pending = self._pending, []
+        # Column lists first: each pass below is a tight loop over floats.
+        # Range is bounded by the model; SNR and velocity may be NaN or inf,
+        # which are left out rather than poison the sums or the bin index.
+        ranges = [t.range_m for t in batch]
+        snrs = [v for v in (t.snr_db for t in batch) if isfinite(v)]
+        self.range_hist.observe_many(ranges)
+        self.snr_hist.observe_many(snrs)
+        self.vr_hist.observe_many([v for v in (t.vr_mps for t in batch) if isfinite(v)])
+        self.range_sketch.add_many(ranges, now)
+        self.snr_sketch.add_many(snrs, now)
+        return len(batch)
+
+    async def flush_forever(self, interval_s: float = 0.5) -> None:
+        while True:
+            self.flush()
+            await asyncio.sleep(interval_s)
+
+    # ---- scrape --------------------------------------------------------------
+
+    def sector_counts(self) -> List[int]:
+        """Active tracks per azimuth sector, from the last published snapshot."""
+        counts = [0] * len(self._sector_labels)
+        if self.table is None:
+            return counts
+        width, last = self.sector_deg, len(counts) - 1
+        for t in self.table.snapshot.tracks:
+            i = int((t.az_deg + 180.0) // width)
+            counts[0 if i < 0 else last if i > last else i] += 1
+        return counts
+
+    def describe(self) -> List[GaugeMetricFamily]:
+        return list(self._families())
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        return self._families(with_values=True)
+
+    def _families(self, with_values: bool = False) -> Iterable[GaugeMetricFamily]:
+        window = f"{self.window_s:g} s"
+        for name, what, sketch in (
+            ("radar_track_range_quantile_m", "Track range (m)", self.range_sketch),
+            ("radar_track_snr_quantile_db", "Track SNR (dB)", self.snr_sketch),
+        ):
+            family = GaugeMetricFamily(
+                name, f"{what} quantiles over the last {window}", labels=("quantile",)
+            )
+            if with_values:
+                for q, v in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+                    family.add_metric((f"{q:g}",), v)
+            yield family
+        family = GaugeMetricFamily(
+            "radar_active_tracks_by_sector",
+            f"Active tracks per {self.sector_deg} deg azimuth sector",
+            labels=("sector",),
+        )
+        if with_values:
+            for label, n in zip(self._sector_labels, self.sector_counts()):
+                family.add_metric((label,), n)
+        yield family
@@ -0,0 +1,112 @@
+"""
+Active track table with immutable, versioned snapshots.
+
+The ingest side mutates the table from the event loop; readers (e.g. the HTTP
+query API running in server threads) only ever see a published snapshot, so
+they never take a lock on the hot path. Publishing swaps a single attribute,
+which is atomic under the GIL.
+"""
+
+import asyncio
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from common.records import AnyTrack, TrackRecord
+
+# export_state() row: [id, ts_ns, range_m, az_deg, el_deg, vr_mps, snr_db, age_s]
+StateRow = List[float]
+
+
+class TrackSnapshot(NamedTuple):
+    version: int
+    published_at: float  # wall clock (time.time()) of publication
+    tracks: Tuple[AnyTrack, ...]  # sorted by track id
+    by_id: Mapping[int, AnyTrack]
+
+
+EMPTY_SNAPSHOT = TrackSnapshot(0, 0.0, (), MappingProxyType({}))
+
+
+class TrackTable:
+    """Latest state per track id, expired after `ttl_s` without updates."""
+
+    def __init__(self, ttl_s: float = 10.0):
+        self.ttl_s = ttl_s
+        self.snapshot: TrackSnapshot = EMPTY_SNAPSHOT
+        self._active: Dict[int, AnyTrack] = {}
+        self._seen: Dict[int, float] = {}
+        # Coarse clock advanced on publish; avoids a clock call per track
+        self._now = time.monotonic()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def update(self, track: AnyTrack) -> None:
+        self._active[track.id] = track
+        self._seen[track.id] = self._now
+        self._dirty = True
+
+    def publish(self, now: Optional[float] = None) -> TrackSnapshot:
+        """Expire stale tracks and publish a new snapshot if anything changed."""
+        self._now = time.monotonic() if now is None else now
+        cutoff = self._now - self.ttl_s
+        stale = [tid for tid, seen in self._seen.items() if seen < cutoff]
+        for tid in stale:
+            del self._active[tid]
+            del self._seen[tid]
+
+        if self._dirty or stale:
+            by_id = dict(sorted(self._active.items()))
+            self.snapshot = TrackSnapshot(
+                version=self.snapshot.version + 1,
+                published_at=time.time(),
+                tracks=tuple(by_id.values()),
+                by_id=MappingProxyType(by_id),
+            )
+            self._dirty = False
+        return self.snapshot
+
+    def export_state(self) -> List[StateRow]:
+        """
+        Compact, JSON-ready copy of the active tracks for handover to another
+        process: one row per track with its age since the last update.
+        """
+        now = time.monotonic()
+        rows = []
+        for tid, t in self._active.items():
+            r = t if isinstance(t, TrackRecord) else TrackRecord.from_model(t)
+            age = max(0.0, now - self._seen[tid])
+            rows.append(
+                [tid, r.ts_ns, r.range_m, r.az_deg, r.el_deg, r.vr_mps, r.snr_db, age]
+            )
+        return rows
+
+    def import_state(self, rows: Sequence[StateRow]) -> int:
+        """
+        Merge rows from `export_state()`. A track already updated here with a
+        newer timestamp wins. Returns the number of tracks taken over.
+        """
+        now = time.monotonic()
+        taken = 0
+        for tid, ts_ns, rng, az, el, vr, snr, age in rows:
+            tid, ts_ns = int(tid), int(ts_ns)
+            mine = self._active.get(tid)
+            if mine is not None and _ts_ns(mine) >= ts_ns:
+                continue
+            self._active[tid] = TrackRecord(ts_ns, tid, rng, az, el, vr, snr)
+            self._seen[tid] = now - age
+            taken += 1
+        if taken:
+            self._dirty = True
+        return taken
+
+    async def publish_forever(self, interval_s: float = 0.5) -> None:
+        while True:
+            self.publish()
+            await asyncio.sleep(interval_s)
+
+
+def _ts_ns(t: AnyTrack) -> int:
+    return t.ts_ns if isinstance(t, TrackRecord) else TrackRecord.from_model(t).ts_ns
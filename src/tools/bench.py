@@ -0,0 +1,620 @@
+"""
+Micro-benchmarks for the ingest hot path.
+
+Command line:
+export PYTHONPATH=src
+python -m tools.bench models --n 100000
+python -m tools.bench ingest --pps 5000 20000 50000 --seconds 3 --loops asyncio uvloop
+python -m tools.bench parse --n 50000
+python -m tools.bench ts --n 50000 --frame 32
+python -m tools.bench filter --n 50000
+python -m tools.bench stats --n 200000
+python -m tools.bench forward --n 100000
+python -m tools.bench route --n 50000 --nodes 4
+
+Each subcommand prints a small table; numbers are per object / per packet on
+the current machine, so compare rows within one run rather than across hosts.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+
+from prometheus_client import CollectorRegistry, Histogram, generate_latest
+
+from adapter.ingest import UdpIngest
+from adapter.parser import parse_packet
+from adapter.prefilter import PreFilter, sign
+from adapter.reader import ThreadedUdpReader, bind_udp
+from adapter.validation import SAMPLED, ValidationPolicy
+from common.codec import decode_tracks, encode_tracks
+from common.loops import loop_factory, resolve, run, uvloop_available
+from common.models import Track
+from common.ratelog import RateLimitedLog
+from common.records import TrackRecord
+from common.track_stats import (
+    RANGE_BUCKETS_M,
+    SNR_BUCKETS_DB,
+    VR_BUCKETS_MPS,
+    TrackStats,
+)
+from common.track_table import TrackTable
+from common.timestamps import datetime_to_ns, parse_rfc3339, rfc3339_to_ns
+from tools.router import HashRing, UdpRouter
+
+
+def sample_track_dict(i: int) -> Dict:
+    return {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "id": i,
+        "range_m": 1000.0 + i % 20000,
+        "az_deg": (i % 120) - 60.0,
+        "el_deg": (i % 30) - 5.0,
+        "vr_mps": (i % 100) - 50.0,
+        "snr_db": 10.0 + i % 30,
+    }
+
+
+def time_per_call(fn: Callable[[], object], n: int, repeat: int = 3) -> float:
+    """Best-of-`repeat` seconds per call of `fn` over `n` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - start) / n)
+    return best
+
+
+def bytes_per_object(factory: Callable[[int], object], n: int) -> float:
+    """Retained heap bytes per object for `n` objects built by `factory`."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    per = (after - before) / n
+    del objs
+    return per
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[object]]) -> None:
+    widths = [
+        max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)
+    ]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)))
+
+
+def bench_models(n: int) -> None:
+    """Construction time and retained memory: pydantic Track vs TrackRecord."""
+    dicts = [sample_track_dict(i) for i in range(1000)]
+    model = Track(**dicts[0])
+    record = TrackRecord.from_dict(dicts[0])
+    it = iter(range(1 << 62))
+
+    def d() -> Dict:
+        return dicts[next(it) % 1000]
+
+    cases = [
+        # Memory factories build fresh field values so nothing is shared
+        (
+            "Track(**dict)",
+            lambda: Track(**d()),
+            lambda i: Track(**sample_track_dict(i)),
+        ),
+        (
+            "TrackRecord.from_dict",
+            lambda: TrackRecord.from_dict(d()),
+            lambda i: TrackRecord.from_dict(sample_track_dict(i)),
+        ),
+        (
+            "TrackRecord (unchecked)",
+            lambda: TrackRecord(1, 1, 1.0, 1.0, 1.0, 1.0, 1.0),
+            lambda i: TrackRecord(i << 30, i, i * 1.0, 1.0, 1.0, 1.0, 1.0),
+        ),
+        ("TrackRecord.from_model", lambda: TrackRecord.from_model(model), None),
+        ("TrackRecord.to_model", lambda: record.to_model(), None),
+    ]
+    rows = []
+    for name, call, factory in cases:
+        us = time_per_call(call, n) * 1e6
+        mem = f"{bytes_per_object(factory, n):.0f}" if factory else "-"
+        rows.append((name, f"{us:.2f}", mem))
+    print(f"Track construction, n={n}")
+    print_table(("case", "us/obj", "bytes/obj"), rows)
+
+
+def bench_parse(n: int, sample_one_in: int) -> None:
+    """parse_packet cost per track packet for each validation mode."""
+    pkts = [json.dumps(sample_track_dict(i)).encode() for i in range(1000)]
+    policy = ValidationPolicy(SAMPLED, sample_one_in=sample_one_in)
+    it = iter(range(1 << 62))
+
+    def p() -> bytes:
+        return pkts[next(it) % 1000]
+
+    def sampled(records: bool) -> Callable[[], object]:
+        return lambda: parse_packet(
+            p(), records=records, validation=policy.validation_for("bench")
+        )
+
+    rows = []
+    for records in (False, True):
+        payload = "TrackRecord" if records else "Track"
+        cases = [
+            ("full", lambda: parse_packet(p(), records=records)),
+            (
+                f"sampled 1/{sample_one_in}",
+                sampled(records),
+            ),
+            (
+                "structural",
+                lambda: parse_packet(p(), records=records, validation="structural"),
+            ),
+        ]
+        base = None
+        for name, call in cases:
+            us = time_per_call(call, n) * 1e6
+            base = base or us
+            rows.append((payload, name, f"{us:.2f}", f"{base / us:.2f}x"))
+    print(f"parse_packet per track packet, n={n}")
+    print_table(("payload", "validation", "us/pkt", "speedup"), rows)
+
+
+def _fromisoformat_ns(ts: str) -> int:
+    """The decoder without the last-string memo: fromisoformat + datetime math."""
+    return datetime_to_ns(parse_rfc3339(ts))
+
+
+def _records_with(decoder: Callable[[str], int]) -> Callable[[bytes], list]:
+    """JSON track/frame packet -> TrackRecords, decoding `ts` with `decoder`."""
+
+    def parse(pkt: bytes) -> list:
+        obj = json.loads(pkt)
+        return [
+            TrackRecord.validated(
+                decoder(d["ts"]),
+                d["id"],
+                d["range_m"],
+                d["az_deg"],
+                d["el_deg"],
+                d["vr_mps"],
+                d["snr_db"],
+            )
+            for d in (obj["tracks"] if "tracks" in obj else (obj,))
+        ]
+
+    return parse
+
+
+def bench_ts(n: int, frame_size: int) -> None:
+    """Timestamp decoding alone, then track and frame packets end to end."""
+    dicts = [sample_track_dict(i) for i in range(1000)]
+    stamps = [d["ts"] for d in dicts]
+    track_pkts = [json.dumps(d).encode() for d in dicts]
+    frame_pkt = json.dumps({"tracks": dicts[:frame_size]}).encode()
+    # A real frame: every track stamped with the scan time
+    same_ts = [dict(d, ts=stamps[0]) for d in dicts[:frame_size]]
+    scan_pkt = json.dumps({"tracks": same_ts}).encode()
+    it = iter(range(1 << 62))
+
+    def ts() -> str:
+        return stamps[next(it) % 1000]
+
+    def track() -> bytes:
+        return track_pkts[next(it) % 1000]
+
+    rows = []
+    for name, call in [
+        ("fromisoformat -> ns", lambda: _fromisoformat_ns(ts())),
+        ("rfc3339_to_ns (memo)", lambda: rfc3339_to_ns(ts())),
+        ("pydantic datetime (Track)", lambda: Track(**dicts[next(it) % 1000])),
+    ]:
+        rows.append(("ts", name, f"{time_per_call(call, n) * 1e6:.2f}"))
+
+    cases = [
+        ("Track (pydantic)", parse_packet),
+        ("TrackRecord (parse_packet)", lambda p: parse_packet(p, records=True)),
+        ("TrackRecord, fromisoformat", _records_with(_fromisoformat_ns)),
+        ("TrackRecord, rfc3339_to_ns", _records_with(rfc3339_to_ns)),
+    ]
+    for label, packet, count in (
+        ("track", track, n),
+        (f"frame x{frame_size}", lambda: frame_pkt, max(n // frame_size, 100)),
+        (f"scan x{frame_size}", lambda: scan_pkt, max(n // frame_size, 100)),
+    ):
+        for name, parse in cases:
+            us = time_per_call(lambda: parse(packet()), count) * 1e6
+            rows.append((label, name, f"{us:.2f}"))
+    print(f"Timestamp decoding and packet parsing, n={n}")
+    print_table(("input", "path", "us/op"), rows)
+
+
+class _InlineIngest(UdpIngest):
+    """UdpIngest that handles each datagram inline instead of in a task."""
+
+    def _dispatch(self, data, addr):
+        self._handle(data, addr)
+
+
+def bench_filter(n: int) -> None:
+    """Per-datagram cost of good and flood traffic, with and without PreFilter."""
+    key = b"bench-key"
+    good = [json.dumps(sample_track_dict(i)).encode() for i in range(1000)]
+    signed = [sign(p, key) for p in good]
+    floods = {
+        "garbage": os.urandom(200),
+        "bad JSON": b'{"id": 1, "range_m": ' + b"9" * 100,
+        "oversized": b"{" + b" " * 70_000,
+    }
+    addr = ("10.0.0.5", 5000)
+    foreign = ("203.0.113.9", 5000)
+    it = iter(range(1 << 62))
+
+    def ingest(prefilter, unlimited_log=False) -> _InlineIngest:
+        ing = _InlineIngest(lambda msg: None, records=True, prefilter=prefilter)
+        if unlimited_log:
+            # Every parse error logged, as before the rate limit
+            ing._error_log = RateLimitedLog(logging.getLogger("ingest"), burst=1 << 62)
+        return ing
+
+    plain = PreFilter(allow=["10.0.0.0/8"])
+    cases = [
+        ("good", "no filter", ingest(None), lambda: good[next(it) % 1000], addr),
+        (
+            "good",
+            "allowlist+size+byte",
+            ingest(plain),
+            lambda: good[next(it) % 1000],
+            addr,
+        ),
+        (
+            "good",
+            "... + HMAC",
+            ingest(PreFilter(allow=["10.0.0.0/8"], hmac_keys={"*": key})),
+            lambda: signed[next(it) % 1000],
+            addr,
+        ),
+    ]
+    for name, data in floods.items():
+        if name != "oversized":
+            cases.append(
+                (
+                    name,
+                    "no filter, log every error",
+                    ingest(None, True),
+                    lambda d=data: d,
+                    addr,
+                )
+            )
+            cases.append((name, "no filter", ingest(None), lambda d=data: d, addr))
+        cases.append((name, "prefilter", ingest(plain), lambda d=data: d, addr))
+    cases.append(
+        ("foreign source", "prefilter", ingest(plain), lambda: good[0], foreign)
+    )
+
+    rows = []
+    root = logging.getLogger()
+    saved = root.handlers[:]
+    # Error lines are still formatted and written, just not to the terminal
+    with open(os.devnull, "w") as sink:
+        root.handlers = [logging.StreamHandler(sink)]
+        try:
+            for traffic, path, ing, data, src in cases:
+                us = time_per_call(lambda: ing.datagram_received(data(), src), n)
+                # Share of one core spent at 100k datagrams/s of this traffic
+                rows.append((traffic, path, f"{us * 1e6:.2f}", f"{us * 1e7:.0f}%"))
+        finally:
+            root.handlers = saved
+    print(f"Cost per received datagram, n={n}")
+    print_table(("traffic", "path", "us/pkt", "core @100k pps"), rows)
+
+
+def bench_stats(n: int) -> None:
+    """Per-track cost of TrackStats (queue + batched binning) and of a scrape."""
+    registry = CollectorRegistry()
+    tracks = [
+        TrackRecord.from_model(Track(**sample_track_dict(i))) for i in range(1000)
+    ]
+    table = TrackTable()
+    for t in tracks:
+        table.update(t)
+    table.publish()
+    stats = TrackStats(table, registry=registry)
+    hists = [
+        Histogram(name, "", buckets=b, registry=CollectorRegistry())
+        for name, b in (
+            ("range", RANGE_BUCKETS_M),
+            ("snr", SNR_BUCKETS_DB),
+            ("vr", VR_BUCKETS_MPS),
+        )
+    ]
+
+    def per_track_prometheus() -> None:
+        for t in tracks:
+            hists[0].observe(t.range_m)
+            hists[1].observe(t.snr_db)
+            hists[2].observe(t.vr_mps)
+
+    def per_track_stats() -> None:
+        add = stats.add
+        for t in tracks:
+            add(t)
+
+    def batched_stats() -> None:
+        stats.add_many(tracks)
+
+    rows = []
+    rounds = max(n // 1000, 10)
+    for name, call in (
+        ("prometheus Histogram x3, per track", per_track_prometheus),
+        ("TrackStats.add + flush", per_track_stats),
+        ("TrackStats.add_many + flush", batched_stats),
+    ):
+        us = time_per_call(call, rounds) * 1e6 / 1000
+        rows.append((name, f"{us:.3f}", f"{us * 5:.1f}%"))
+    stats.flush()
+    scrape_ms = time_per_call(lambda: generate_latest(registry), 200) * 1e3
+    print(f"Track statistics, {rounds * 1000} tracks/run")
+    print_table(("path", "us/track", "core @50k tracks/s"), rows)
+    print(f"scrape of the TrackStats registry: {scrape_ms:.2f} ms")
+
+
+def bench_forward(n: int, batch: int) -> None:
+    """Encode / decode cost and size per track for each forwarder encoding."""
+    tracks = [
+        TrackRecord.from_model(Track(**sample_track_dict(i))) for i in range(batch)
+    ]
+    rounds = max(n // batch, 10)
+    rows = []
+    for encoding in ("json", "binary"):
+        body = encode_tracks(tracks, encoding)
+        enc = time_per_call(lambda: encode_tracks(tracks, encoding), rounds)
+        dec = time_per_call(lambda: decode_tracks(body), rounds)
+        rows.append(
+            (
+                encoding,
+                f"{enc * 1e6 / batch:.2f}",
+                f"{dec * 1e6 / batch:.2f}",
+                f"{len(body) / batch:.0f}",
+            )
+        )
+    print(f"Forwarder batch encodings, {batch} tracks/batch")
+    print_table(("encoding", "encode us/track", "decode us/track", "bytes/track"), rows)
+
+
+class _NullTransport:
+    def sendto(self, data, addr=None) -> None:
+        pass
+
+
+def bench_route(n: int, nodes: int, frame: int) -> None:
+    """Router cost per datagram and per track for each packet shape."""
+    router = UdpRouter(HashRing([(f"10.0.0.{i + 1}", 9999) for i in range(nodes)]))
+    router.connection_made(_NullTransport())
+    tracks = [
+        TrackRecord.from_model(Track(**sample_track_dict(i))) for i in range(frame)
+    ]
+    cases = [
+        ("json track", json.dumps(sample_track_dict(7)).encode(), 1),
+        ("json frame", encode_tracks(tracks, "json"), frame),
+        ("binary batch", encode_tracks(tracks, "binary"), frame),
+    ]
+    addr = ("127.0.0.1", 5000)
+    rows = []
+    for name, data, per in cases:
+        t = time_per_call(lambda: router.datagram_received(data, addr), n // per or 1)
+        rows.append((name, per, f"{t * 1e6:.2f}", f"{t * 1e6 / per:.2f}"))
+    print(f"Router, {nodes} nodes, frames of {frame} tracks")
+    print_table(("packet", "tracks", "us/datagram", "us/track"), rows)
+
+
+def _send_paced(addr, pps: int, seconds: float, sent) -> None:
+    """
+    Sender process: `pps` track datagrams per second, in 1 ms ticks. Each
+    packet's `ts` is its send time in epoch-ns, for end-to-end latency.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tails = []
+    for i in range(1000):
+        d = sample_track_dict(i)
+        del d["ts"]
+        tails.append(b"," + json.dumps(d).encode()[1:])
+    tick = 0.001
+    per_tick = pps * tick
+    start = time.perf_counter()
+    due = 0.0
+    n = 0
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+        due += per_tick
+        while n < due:
+            try:
+                sock.sendto(b'{"ts":%d' % time.time_ns() + tails[n % 1000], addr)
+            except OSError:
+                pass  # ENOBUFS: the sender itself is saturated
+            n += 1
+        pause = (n / pps) - (time.perf_counter() - start)
+        if pause > 0:
+            time.sleep(pause)
+    sent.value = n
+    sock.close()
+
+
+async def _ingest_run(backend: str, pps: int, seconds: float, threads: int):
+    loop = asyncio.get_running_loop()
+    latencies: List[int] = []
+
+    def handler(msg) -> None:
+        latencies.append(time.time_ns() - msg.payload.ts_ns)
+
+    if backend == "asyncio":
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: UdpIngest(handler, records=True), local_addr=("127.0.0.1", 0)
+        )
+        addr = transport.get_extra_info("sockname")
+        close = transport.close
+    else:
+        sock = bind_udp("127.0.0.1", 0, rcvbuf=1 << 22)
+        reader = ThreadedUdpReader(sock, handler, loop, records=True, threads=threads)
+        reader.start()
+        addr = sock.getsockname()
+
+        def close() -> None:
+            reader.stop()
+            sock.close()
+
+    # Loop lag: how late a 5 ms timer fires while ingest is running
+    lags: List[float] = []
+
+    async def probe() -> None:
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(0.005)
+            lags.append(loop.time() - t0 - 0.005)
+
+    prober = asyncio.create_task(probe())
+    sent = multiprocessing.Value("q", 0)
+    proc = multiprocessing.Process(target=_send_paced, args=(addr, pps, seconds, sent))
+    cpu0 = time.process_time()
+    proc.start()
+    while proc.is_alive():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)  # drain what is still queued
+    cpu = time.process_time() - cpu0
+    prober.cancel()
+    close()
+
+    return sent.value, cpu, latencies, lags
+
+
+def _quantile(values: List, q: float):
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0
+
+
+def bench_ingest(
+    pps_list: Sequence[int], seconds: float, threads: int, loops: Sequence[str]
+) -> None:
+    """
+    The same paced workload on every event loop x ingest backend pair:
+    delivered rate, loss, CPU per packet, send-to-handler latency, loop lag.
+    """
+    rows = []
+    for pps in pps_list:
+        for loop_name in loops:
+            for backend in ("asyncio", "threaded"):
+                sent, cpu, lat, lags = run(
+                    _ingest_run(backend, pps, seconds, threads), loop=loop_name
+                )
+                got = len(lat)
+                lat.sort()
+                lags.sort()
+                loss = 100.0 * (1 - got / sent) if sent else 0.0
+                rows.append(
+                    (
+                        pps,
+                        loop_name,
+                        backend,
+                        f"{got / seconds:.0f}",
+                        f"{loss:.1f}",
+                        f"{cpu / max(got, 1) * 1e6:.1f}",
+                        f"{_quantile(lat, 0.5) / 1e6:.2f}",
+                        f"{_quantile(lat, 0.99) / 1e6:.2f}",
+                        f"{statistics.mean(lags) * 1e3 if lags else 0.0:.2f}",
+                        f"{_quantile(lags, 0.99) * 1e3:.2f}",
+                    )
+                )
+    print(f"UDP ingest over localhost, {seconds:g} s/run, {threads} reader thread(s)")
+    print_table(
+        (
+            "pps",
+            "loop",
+            "backend",
+            "delivered/s",
+            "loss %",
+            "cpu us/pkt",
+            "lat p50 ms",
+            "lat p99 ms",
+            "lag ms",
+            "lag p99 ms",
+        ),
+        rows,
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="tools.bench", description=__doc__)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("models", help="Track vs TrackRecord construction and memory")
+    p.add_argument("--n", type=int, default=50_000)
+    p = sub.add_parser("parse", help="parse_packet cost per validation mode")
+    p.add_argument("--n", type=int, default=50_000)
+    p.add_argument("--sample-one-in", type=int, default=16)
+    p = sub.add_parser("ts", help="RFC 3339 decoding and lazy datetimes")
+    p.add_argument("--n", type=int, default=50_000)
+    p.add_argument("--frame", type=int, default=32)
+    p = sub.add_parser("filter", help="pre-parse rejection cost under a flood")
+    p.add_argument("--n", type=int, default=50_000)
+    p = sub.add_parser("stats", help="track statistics cost per track and per scrape")
+    p.add_argument("--n", type=int, default=200_000)
+    p = sub.add_parser("forward", help="forwarder encodings: cost and bytes per track")
+    p.add_argument("--n", type=int, default=100_000)
+    p.add_argument("--batch", type=int, default=256)
+    p = sub.add_parser("route", help="consistent-hash router cost per packet shape")
+    p.add_argument("--n", type=int, default=50_000)
+    p.add_argument("--nodes", type=int, default=4)
+    p.add_argument("--frame", type=int, default=32)
+    p = sub.add_parser(
+        "ingest", help="event loops x ingest backends: rate, latency, loop lag"
+    )
+    p.add_argument("--pps", type=int, nargs="+", default=[5_000, 20_000, 50_000])
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument(
+        "--loops",
+        nargs="+",
+        default=["asyncio", "uvloop"] if uvloop_available() else ["asyncio"],
+        help="event loops to compare (default: asyncio, plus uvloop if installed)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.cmd == "models":
+        bench_models(args.n)
+    elif args.cmd == "parse":
+        bench_parse(args.n, args.sample_one_in)
+    elif args.cmd == "ts":
+        bench_ts(args.n, args.frame)
+    elif args.cmd == "filter":
+        bench_filter(args.n)
+    elif args.cmd == "stats":
+        bench_stats(args.n)
+    elif args.cmd == "forward":
+        bench_forward(args.n, args.batch)
+    elif args.cmd == "route":
+        bench_route(args.n, args.nodes, args.frame)
+    elif args.cmd == "ingest":
+        loops = list(dict.fromkeys(resolve(name) for name in args.loops))
+        for name in loops:
+            loop_factory(name)  # fail before any run if one is not installed
+        bench_ingest(args.pps, args.seconds, args.threads, loops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Track-id consistent-hash UDP router in front of several ingest nodes.
+
+Plain load balancing scatters the packets of one track over every node, so
+no node holds the whole history of a track. The router keeps each track id
+on one node: it peeks at the id without a full parse, hashes it onto a ring
+of the downstream nodes and relays the datagram there.
+
+  single track    routed by its `"id"` (one regex scan, `adapter.peek`);
+  JSON frame      parsed, its tracks grouped by owner; relayed unchanged if
+                  they all share one node, else re-encoded once per owner
+                  (other top-level keys such as `src` / `seq` are kept);
+  binary batch    ids read straight from the records (`common.codec`) and
+                  the records copied into one batch per owner;
+  health          sent to every node.
+
+Datagrams that are neither (or carry no usable id) are dropped and counted.
+Each node owns `vnodes` points on the ring, so adding a node to n moves
+about 1/(n+1) of the ids, all of them to the new node, and removing one
+moves only the ids it owned.
+
+The router is the edge: it applies the same allowlist / HMAC pre-filter as
+ingest (`ingest.allow_sources` / `ingest.hmac_keys` in `common.config`, e.g.
+RADAR_ALLOW_SOURCES and RADAR_HMAC_KEYS) and relays payloads without the
+tag. A node sees only part of each sender's sequence numbers, so run the
+nodes with `RADAR_SEQ_WINDOW=0`.
+
+Command line:
+export PYTHONPATH=src
+python -m tools.router --listen 0.0.0.0:9999 --node 10.0.0.11:9999 --node 10.0.0.12:9999
+
+With `--nodes-file` (one host:port per line) the node set is re-read on
+SIGHUP.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import signal
+import time
+from bisect import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from prometheus_client import Gauge
+
+from adapter.peek import FRAME, HEALTH, classify, track_id
+from adapter.prefilter import PreFilter, parse_cidrs, parse_keys
+from api.server import start_http_server
+from common.codec import MAGIC, binary_ids, binary_subset
+from common.config import add_arguments, load_config
+from common.loops import LOOPS, run
+from common.metrics import LocalCounter
+
+log = logging.getLogger("app")
+
+Node = Tuple[str, int]
+
+DROP_REASONS = ("invalid", "unroutable")
+
+ROUTER_DATAGRAMS_IN_TOTAL = LocalCounter(
+    "radar_router_datagrams_in_total", "Datagrams received by the router"
+)
+ROUTER_DATAGRAMS_OUT_TOTAL = LocalCounter(
+    "radar_router_datagrams_out_total",
+    "Datagrams relayed to an ingest node",
+    labelnames=("node",),
+)
+ROUTER_TRACKS_OUT_TOTAL = LocalCounter(
+    "radar_router_tracks_out_total",
+    "Tracks relayed to an ingest node",
+    labelnames=("node",),
+)
+ROUTER_FRAMES_SPLIT_TOTAL = LocalCounter(
+    "radar_router_frames_split_total",
+    "Frames whose tracks were split over more than one node",
+)
+ROUTER_DROPPED_TOTAL = LocalCounter(
+    "radar_router_dropped_total",
+    "Datagrams dropped: invalid (not a track, frame or health packet) or "
+    "unroutable (no track id)",
+    labelnames=("reason",),
+)
+ROUTER_NODES = Gauge("radar_router_nodes", "Ingest nodes on the hash ring")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer: spreads sequential track ids over the ring."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _point(node: Node, i: int) -> int:
+    digest = hashlib.blake2b(f"{node[0]}:{node[1]}#{i}".encode(), digest_size=8)
+    return int.from_bytes(digest.digest(), "little")
+
+
+class HashRing:
+    """Consistent hash of integer keys onto nodes, `vnodes` points per node."""
+
+    def __init__(
+        self, nodes: Iterable[Node] = (), vnodes: int = 160, cache_size: int = 65536
+    ):
+        if vnodes < 1:
+            raise ValueError("vnodes must be >= 1")
+        self.vnodes = vnodes
+        self.cache_size = cache_size
+        self._nodes: List[Node] = []
+        self._points: List[int] = []
+        self._owners: List[Node] = []
+        self._cache: Dict[int, Node] = {}
+        self.set_nodes(nodes)
+
+    @property
+    def nodes(self) -> List[Node]:
+        return list(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def set_nodes(self, nodes: Iterable[Node]) -> None:
+        self._nodes = sorted(set(nodes))
+        ring = sorted(
+            (_point(node, i), node) for node in self._nodes for i in range(self.vnodes)
+        )
+        self._points = [p for p, _ in ring]
+        self._owners = [node for _, node in ring]
+        self._cache.clear()
+
+    def add(self, node: Node) -> None:
+        self.set_nodes(self._nodes + [node])
+
+    def remove(self, node: Node) -> None:
+        self.set_nodes(n for n in self._nodes if n != node)
+
+    def owner(self, key: int) -> Node:
+        """Node owning `key`: the first ring point at or after its hash."""
+        node = self._cache.get(key)
+        if node is not None:
+            return node
+        if not self._owners:
+            raise LookupError("hash ring has no nodes")
+        i = bisect(self._points, _mix64(key & _MASK64))
+        node = self._owners[i if i < len(self._owners) else 0]
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = node
+        return node
+
+    def group(self, keys: Sequence[int]) -> Dict[Node, List[int]]:
+        """Indices into `keys`, grouped by owning node (in key order)."""
+        groups: Dict[Node, List[int]] = {}
+        owner = self.owner
+        for i, key in enumerate(keys):
+            node = owner(key)
+            if node in groups:
+                groups[node].append(i)
+            else:
+                groups[node] = [i]
+        return groups
+
+
+def parse_node(item: str) -> Node:
+    host, _, port = item.strip().rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"expected host:port, got {item!r}")
+    return host.strip("[]"), int(port)
+
+
+def parse_nodes(lines: Iterable[str]) -> List[Node]:
+    """host:port per item; blank items and `#` comments are skipped."""
+    nodes = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            nodes.append(parse_node(line))
+    return nodes
+
+
+def read_nodes_file(path: str) -> List[Node]:
+    with open(path, encoding="utf-8") as f:
+        return parse_nodes(f)
+
+
+class UdpRouter(asyncio.DatagramProtocol):
+    def __init__(self, ring: HashRing, prefilter: Optional[PreFilter] = None):
+        self.ring = ring
+        self.prefilter = prefilter
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._in = ROUTER_DATAGRAMS_IN_TOTAL.labels()
+        self._split = ROUTER_FRAMES_SPLIT_TOTAL.labels()
+        self._dropped = {r: ROUTER_DROPPED_TOTAL.labels(reason=r) for r in DROP_REASONS}
+        self._out: Dict[Node, tuple] = {}
+        self.set_nodes(ring.nodes)
+
+    def set_nodes(self, nodes: Iterable[Node]) -> None:
+        """Replace the node set; ids move only to or from the changed nodes."""
+        before = set(self.ring.nodes)
+        self.ring.set_nodes(nodes)
+        after = set(self.ring.nodes)
+        self._out = {}
+        for node in after:
+            label = f"{node[0]}:{node[1]}"
+            self._out[node] = (
+                ROUTER_DATAGRAMS_OUT_TOTAL.labels(node=label),
+                ROUTER_TRACKS_OUT_TOTAL.labels(node=label),
+            )
+        for node in before - after:  # node churn must not grow the series
+            label = f"{node[0]}:{node[1]}"
+            ROUTER_DATAGRAMS_OUT_TOTAL.remove(node=label)
+            ROUTER_TRACKS_OUT_TOTAL.remove(node=label)
+        ROUTER_NODES.set(len(after))
+        if before != after:
+            log.info(
+                "router: %d nodes (+%d -%d)",
+                len(after),
+                len(after - before),
+                len(before - after),
+            )
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self._in.inc()
+        if self.prefilter is not None:
+            data = self.prefilter.check(data, addr)
+            if data is None:
+                return
+        if not self.ring:
+            self._dropped["unroutable"].inc()
+            return
+        if data[:2] == MAGIC:
+            self._route_binary(data)
+            return
+        kind = classify(data)
+        if kind == HEALTH:
+            for node in self._out:
+                self._send(data, node, 0)
+        elif kind == FRAME:
+            self._route_frame(data)
+        else:
+            tid = track_id(data)
+            if tid is None:
+                self._dropped["unroutable"].inc()
+            else:
+                self._send(data, self.ring.owner(tid), 1)
+
+    def _send(self, data: bytes, node: Node, tracks: int) -> None:
+        self.transport.sendto(data, node)
+        datagrams, tracks_out = self._out[node]
+        datagrams.inc()
+        tracks_out.inc(tracks)
+
+    def _route_binary(self, data: bytes) -> None:
+        try:
+            ids = binary_ids(data)
+        except ValueError:
+            self._dropped["invalid"].inc()
+            return
+        groups = self.ring.group(ids)
+        if len(groups) == 1:
+            (node,) = groups
+            self._send(data, node, len(ids))
+            return
+        self._split.inc()
+        for node, indices in groups.items():
+            self._send(binary_subset(data, indices), node, len(indices))
+
+    def _route_frame(self, data: bytes) -> None:
+        try:
+            obj = json.loads(str(data, "utf-8"))
+            tracks = obj["tracks"]
+            ids = [t["id"] for t in tracks]
+        except (ValueError, TypeError, KeyError):
+            self._dropped["invalid"].inc()
+            return
+        if not all(type(i) is int for i in ids):
+            self._dropped["unroutable"].inc()
+            return
+        groups = self.ring.group(ids)
+        if len(groups) == 1:
+            (node,) = groups
+            self._send(data, node, len(ids))
+            return
+        self._split.inc()
+        for node, indices in groups.items():
+            part = dict(obj, tracks=[tracks[i] for i in indices])
+            self._send(
+                json.dumps(part, separators=(",", ":")).encode(), node, len(indices)
+            )
+
+
+async def start_router(
+    listen: Node,
+    nodes: Sequence[Node],
+    vnodes: int = 160,
+    prefilter: Optional[PreFilter] = None,
+) -> Tuple[asyncio.DatagramTransport, UdpRouter]:
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: UdpRouter(HashRing(nodes, vnodes), prefilter), local_addr=listen
+    )
+
+
+async def report_forever(interval_s: float = 10.0) -> None:
+    """Log relay throughput every `interval_s`."""
+    last = time.monotonic()
+    prev = (0.0, 0.0, 0.0, 0.0)
+    while True:
+        await asyncio.sleep(interval_s)
+        now = time.monotonic()
+        cur = (
+            ROUTER_DATAGRAMS_IN_TOTAL.total(),
+            ROUTER_DATAGRAMS_OUT_TOTAL.total(),
+            ROUTER_TRACKS_OUT_TOTAL.total(),
+            ROUTER_DROPPED_TOTAL.total(),
+        )
+        dt = now - last
+        rates = [(c - p) / dt for c, p in zip(cur, prev)]
+        log.info(
+            "router: %.0f datagrams/s in, %.0f datagrams/s out, "
+            "%.0f tracks/s out, %.0f dropped/s",
+            *rates,
+        )
+        last, prev = now, cur
+
+
+async def main(args) -> None:
+    nodes = list(args.node)
+    if args.nodes_file:
+        nodes += read_nodes_file(args.nodes_file)
+    ingest = load_config(args.config, args.set).ingest
+    prefilter = PreFilter(
+        allow=parse_cidrs(ingest.allow_sources), hmac_keys=parse_keys(ingest.hmac_keys)
+    )
+    transport, router = await start_router(args.listen, nodes, args.vnodes, prefilter)
+    if args.nodes_file:
+
+        def reload():
+            try:
+                router.set_nodes(list(args.node) + read_nodes_file(args.nodes_file))
+            except (OSError, ValueError) as e:
+                log.error("router: keeping node set, cannot reload: %s", e)
+
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload)
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    log.info(
+        "router on %s:%d -> %s",
+        *args.listen,
+        ", ".join(f"{h}:{p}" for h, p in router.ring.nodes) or "(no nodes)",
+    )
+    try:
+        await report_forever(args.report_interval)
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="tools.router", description=__doc__)
+    p.add_argument("--listen", type=parse_node, default=("0.0.0.0", 9999))
+    p.add_argument("--node", type=parse_node, action="append", default=[])
+    p.add_argument("--nodes-file", help="host:port per line; re-read on SIGHUP")
+    p.add_argument("--vnodes", type=int, default=160)
+    p.add_argument("--metrics-port", type=int, default=8001)
+    p.add_argument("--report-interval", type=float, default=10.0)
+    p.add_argument("--loop", choices=LOOPS, default="asyncio")
+    add_arguments(p)
+    args = p.parse_args()
+    if args.print_config:
+        print(load_config(args.config, args.set).ingest.model_dump_json(indent=2))
+        raise SystemExit(0)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    run(main(args), loop=args.loop)
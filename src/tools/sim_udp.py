@@ -1,16 +1,30 @@
 """
 Simulate a UDP data sender for radar tracks.
 
+Settings are the `simulator` section of `common.config` (target host/port,
+rate, health interval, HMAC key), from a config file, RADAR_* variables or
+`--set simulator.rate_hz=500`. SIGHUP re-reads them and applies a new rate
+and health interval without reopening the socket.
 """
 
+import argparse
 import asyncio
 import json
 import random
 import signal
-import os
+import sys
 from datetime import datetime, timezone
 from typing import Optional
 
+from adapter.prefilter import sign
+from common.config import (
+    Config,
+    SimulatorConfig,
+    add_arguments,
+    load_config,
+    reload_config,
+)
+from common.loops import describe, run
 from common.models import HealthStatus, Track
 
 
@@ -29,14 +43,29 @@ def generate_random_track(track_id: int) -> Track:
 
 class UdpSimulator:
     def __init__(
-        self, host: str = "127.0.0.1", port: int = 9999, rate_hz: float = 10.0
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9999,
+        rate_hz: float = 10.0,
+        hmac_key: Optional[bytes] = None,
+        health_every: int = 50,
     ):
         self.host = host
         self.port = port
         self.rate_hz = rate_hz
+        self.health_every = health_every
         self.transport: Optional[asyncio.DatagramTransport] = None
         self.running = False  # Control flag for the main loop
         self._track_id = 0
+        self._seq = 0  # per-sender packet sequence number (optional "seq" field)
+        self.hmac_key = hmac_key  # sign packets for an ingest with RADAR_HMAC_KEYS
+
+    def _encode(self, model) -> bytes:
+        """JSON-encode a model, stamping the next packet sequence number."""
+        self._seq += 1
+        payload = {**model.model_dump(), "seq": self._seq}
+        data = json.dumps(payload, default=str).encode()
+        return sign(data, self.hmac_key) if self.hmac_key else data
 
     async def start(self):
         """Start the UDP simulator"""
@@ -45,14 +74,23 @@ class UdpSimulator:
             lambda: asyncio.DatagramProtocol(), remote_addr=(self.host, self.port)
         )
         self.running = True
+        # Pace against a schedule, not a fixed sleep per packet: above the
+        # timer resolution (~1 kHz) each wake-up sends what has fallen due
+        rate = self.rate_hz
+        start = loop.time()
+        sent = 0
 
         while self.running:  # Loop continues until running is False
+            if self.rate_hz != rate:  # changed by a config reload
+                rate = self.rate_hz
+                start = loop.time()
+                sent = 0
             self._track_id += 1
             track = generate_random_track(self._track_id)
-            self.transport.sendto(json.dumps(track.model_dump(), default=str).encode())
+            self.transport.sendto(self._encode(track))
 
-            # Emit a synthetic health status every 50 tracks
-            if self._track_id % 50 == 0:
+            # Emit a synthetic health status every `health_every` tracks
+            if self._track_id % self.health_every == 0:
                 health = HealthStatus(
                     ts=datetime.now(timezone.utc),
                     radar_mode="OPERATIONAL",
@@ -60,11 +98,14 @@ class UdpSimulator:
                     supply_v=random.uniform(11.8, 12.6),
                     cpu_load_pct=random.uniform(5.0, 65.0),
                 )
-                self.transport.sendto(
-                    json.dumps(health.model_dump(), default=str).encode()
-                )
+                self.transport.sendto(self._encode(health))
 
-            await asyncio.sleep(1 / self.rate_hz)
+            sent += 1
+            delay = start + sent / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif not sent & 255:
+                await asyncio.sleep(0)  # behind schedule: still let signals in
 
     def stop(self):
         """Stop the simulator gracefully -- Called by signal handler when Ctrl+C is pressed"""
@@ -88,13 +129,17 @@ def test_generate_tracks():
     print(json_str)
 
 
-async def main(
-    host=os.getenv("RADAR_HOST", "127.0.0.1"),
-    port=int(os.getenv("RADAR_PORT", "9999")),
-    rate_hz=10,
-):
+async def main(args, cfg: Config):
+    sim_cfg: SimulatorConfig = cfg.simulator
+    print(f"Event loop: {describe()}")
     # Create and run simulator
-    sim = UdpSimulator(host=host, port=port, rate_hz=rate_hz)
+    sim = UdpSimulator(
+        host=sim_cfg.host,
+        port=sim_cfg.port,
+        rate_hz=sim_cfg.rate_hz,
+        hmac_key=bytes.fromhex(sim_cfg.hmac_key),
+        health_every=sim_cfg.health_every,
+    )
 
     # Setup signal handlers for graceful shutdown
     loop = asyncio.get_running_loop()
@@ -104,6 +149,20 @@ async def main(
             s, sim.stop
         )  # Register stop() as the callback for SIGINT (Ctrl+C)
 
+    def reload():
+        nonlocal cfg
+        try:
+            cfg, changed = reload_config(cfg, args.config, args.set)
+        except (OSError, ValueError) as e:
+            print(f"Config reload failed, keeping current settings: {e}")
+            return
+        sim.rate_hz = cfg.simulator.rate_hz
+        sim.health_every = cfg.simulator.health_every
+        print(f"Config reloaded: {changed or 'no changes'}")
+
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(signal.SIGHUP, reload)
+
     try:
         await sim.start()
     except Exception as e:
@@ -113,4 +172,11 @@ async def main(
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    p = argparse.ArgumentParser(prog="tools.sim_udp", description=__doc__)
+    add_arguments(p)
+    args = p.parse_args()
+    cfg = load_config(args.config, args.set)
+    if args.print_config:
+        print(cfg.simulator.model_dump_json(indent=2))
+        sys.exit(0)
+    run(main(args, cfg), loop=cfg.simulator.event_loop)
@@ -0,0 +1,139 @@
+"""
+Local sink for forwarded track batches: a stand-in C2 consumer.
+
+Listens on TCP (length-prefixed batches) and UDP (one batch per datagram),
+decodes JSON or binary batches (`common.codec`) and keeps what it received.
+Used by the tests; run it by hand to watch a forwarder:
+
+Command line:
+export PYTHONPATH=src
+python -m tools.sink --tcp-port 7000 --udp-port 7001
+RADAR_FORWARD_ENDPOINTS=tcp://127.0.0.1:7000 python -m app
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from common.codec import decode_tracks, iter_frames
+from common.loops import run
+from common.records import TrackRecord
+
+log = logging.getLogger("app")
+
+
+class TrackSink:
+    def __init__(self, host: str = "127.0.0.1", tcp_port: int = 0, udp_port: int = 0):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.tracks: List[TrackRecord] = []
+        self.batches = 0
+        self.errors = 0
+        self.tcp_addr: Optional[Tuple[str, int]] = None
+        self.udp_addr: Optional[Tuple[str, int]] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._received = asyncio.Event()
+
+    async def start(self) -> "TrackSink":
+        loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._serve_tcp, self.host, self.tcp_port
+        )
+        self.tcp_addr = self._server.sockets[0].getsockname()[:2]
+        sink = self
+
+        class _Udp(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                sink._batch(data)
+
+        self._transport, _ = await loop.create_datagram_endpoint(
+            _Udp, local_addr=(self.host, self.udp_port)
+        )
+        self.udp_addr = self._transport.get_extra_info("sockname")[:2]
+        return self
+
+    def _batch(self, body: bytes) -> None:
+        try:
+            self.tracks.extend(decode_tracks(body))
+            self.batches += 1
+        except ValueError as e:
+            self.errors += 1
+            log.error("sink: bad batch: %s", e)
+        self._received.set()
+
+    async def _serve_tcp(self, reader, writer) -> None:
+        self._writers.add(writer)
+        buf = bytearray()
+        try:
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    break
+                buf += chunk
+                for body in iter_frames(buf):
+                    self._batch(body)
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    @property
+    def connections(self) -> int:
+        return len(self._writers)
+
+    def drop_connections(self) -> None:
+        """Close every accepted TCP connection (the forwarder must reconnect)."""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def wait_for(self, n: int, timeout: float = 5.0) -> List[TrackRecord]:
+        """Wait until at least `n` tracks have arrived."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self.tracks) < n:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"sink got {len(self.tracks)} of {n} tracks")
+            self._received.clear()
+            try:
+                await asyncio.wait_for(self._received.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return self.tracks
+
+    async def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+        self.drop_connections()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def main(host: str, tcp_port: int, udp_port: int) -> None:
+    sink = await TrackSink(host, tcp_port, udp_port).start()
+    print(f"Track sink on tcp://{sink.tcp_addr} udp://{sink.udp_addr}")
+    seen = 0
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            n = len(sink.tracks)
+            print(f"{n - seen} tracks/s, {sink.batches} batches, {sink.errors} errors")
+            del sink.tracks[:-1000]  # keep memory flat when run by hand
+            seen = len(sink.tracks)
+    finally:
+        await sink.close()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="tools.sink", description=__doc__)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--tcp-port", type=int, default=7000)
+    p.add_argument("--udp-port", type=int, default=7001)
+    args = p.parse_args()
+    run(main(args.host, args.tcp_port, args.udp_port))
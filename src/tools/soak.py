@@ -0,0 +1,370 @@
+"""
+Soak test: the app under a fixed simulator load for a long period, checked
+for leaks and latency drift.
+
+The app runs in this process, as `python -m app` would run it, so its heap,
+tasks and event loop can be inspected. The simulator (`tools.sim_udp`) runs
+in a child process at `--pps`. Every `--interval` seconds one sample is
+taken:
+
+  rss_mb        resident set size of this process;
+  traced_mb     Python heap traced by tracemalloc (0 unless enabled);
+  tasks         asyncio tasks alive;
+  series        exported metric samples (label children: catches per-source
+                or per-id label leaks);
+  rate          tracks handled per second since the previous sample;
+  lag_p99_ms    how late a 10 ms timer fired, p99 over the interval;
+  lat_p99_ms    send-to-handler latency of tracks, p99 over the interval.
+
+The clock starts with the first track handled, and the simulator runs
+until after the last sample, so every interval is measured under load.
+After the warm-up, each series is fitted with a least-squares line. The run
+fails (exit status 1) when the slope of RSS, tasks, metric series or p99
+latency per hour is above its threshold.
+
+tracemalloc is off by default: tracing every allocation in the process
+under test makes the app several times slower, so at a high `--pps` the run
+would measure the harness rather than the app. To look for a leak that RSS
+has shown, re-run with `--tracemalloc-frames 1` (at a rate the traced app
+keeps up with); the top growers since the end of the warm-up are printed.
+
+`--accel N` runs the app's own timers N times faster (track TTL, snapshot
+publishing, error-log windows), so a 1 h soak churns the track table and
+the log budgets as often as N hours would. The packet rate and the
+sampling are not scaled; slopes are per hour of real time.
+
+Command line:
+export PYTHONPATH=src
+python -m tools.soak --duration 3600 --pps 5000 --interval 30
+python -m tools.soak --duration 600 --accel 10 --json soak.json --set ingest.backend=threaded
+python -m tools.soak --duration 1800 --pps 1000 --tracemalloc-frames 1
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import resource
+import signal
+import socket
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from prometheus_client import REGISTRY
+
+from common.config import Config, add_arguments, load_config
+from common.loops import run
+
+log = logging.getLogger("app")
+
+# Settings scaled down by --accel: the app's housekeeping timers
+ACCELERATED = ("tracks.ttl_s", "tracks.snapshot_interval_s", "log.error_interval_s")
+
+# Per-packet INFO lines would swamp the sample table; --set can override
+SOAK_DEFAULTS = ("log.level=WARNING",)
+
+
+class Sample(NamedTuple):
+    t_s: float
+    rss_mb: float
+    traced_mb: float
+    tasks: int
+    series: int
+    rate: float
+    lag_p99_ms: float
+    lat_p99_ms: float
+
+
+# Checked trends: sample field -> (threshold option, unit)
+TRENDS: Dict[str, Tuple[str, str]] = {
+    "rss_mb": ("max_rss_mb_per_h", "MB/h"),
+    "tasks": ("max_tasks_per_h", "tasks/h"),
+    "series": ("max_series_per_h", "series/h"),
+    "lat_p99_ms": ("max_p99_ms_per_h", "ms/h"),
+}
+
+
+def slope(xs: Sequence[float], ys: Sequence[float]) -> float:
+    """Least-squares slope of ys over xs (0.0 with fewer than two points)."""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx = sum(xs) / n
+    my = sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+
+
+def evaluate(
+    samples: Sequence[Sample], warmup_s: float, limits: Dict[str, float]
+) -> List[Tuple[str, float, float, bool]]:
+    """(field, slope per hour, limit, ok) for each trend in `TRENDS`."""
+    steady = [s for s in samples if s.t_s >= warmup_s]
+    hours = [s.t_s / 3600.0 for s in steady]
+    out = []
+    for field, (option, _) in TRENDS.items():
+        per_h = slope(hours, [getattr(s, field) for s in steady])
+        limit = limits[option]
+        out.append((field, per_h, limit, per_h <= limit))
+    return out
+
+
+def rss_bytes() -> int:
+    """Current RSS (Linux /proc); elsewhere the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def metric_series() -> int:
+    return sum(len(family.samples) for family in REGISTRY.collect())
+
+
+def _quantile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values.sort()
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def _free_udp_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def _simulate(host: str, port: int, pps: float) -> None:
+    """Child process: the UDP simulator at `pps` until it is terminated."""
+    from tools.sim_udp import UdpSimulator
+
+    asyncio.run(UdpSimulator(host=host, port=port, rate_hz=pps).start())
+
+
+def soak_config(args) -> Tuple[List[str], Config]:
+    """The app's --set overrides for this soak, and the config they give."""
+    overrides = list(SOAK_DEFAULTS) + ["http.port=0"] + list(args.set)
+    cfg = load_config(args.config, overrides)
+    if not any(o.startswith("ingest.port=") for o in args.set):
+        overrides.append(f"ingest.port={_free_udp_port(cfg.ingest.host)}")
+    if args.accel != 1:
+        flat = cfg.model_dump()
+        for key in ACCELERATED:
+            section, field = key.split(".")
+            overrides.append(f"{key}={flat[section][field] / args.accel!r}")
+    return overrides, load_config(args.config, overrides)
+
+
+async def soak(args) -> Tuple[List[Sample], List[Tuple[str, int, int]]]:
+    """Run the soak; returns the samples and the tracemalloc top growers."""
+    import app
+
+    overrides, _ = soak_config(args)
+    saved = app.ARGS, app.CONFIG
+    argv = ["--config", args.config] if args.config else []
+    for o in overrides:
+        argv += ["--set", o]
+    cfg = app.load(argv)  # as `python -m app` would; SIGHUP re-reads these
+
+    latencies: List[float] = []
+    handled = 0
+    inner = app.handle
+
+    def timed_handle(msg) -> None:
+        nonlocal handled
+        inner(msg)
+        if msg.kind == "track":
+            handled += 1
+            latencies.append((time.time_ns() - msg.payload.ts_ns) / 1e6)
+
+    app.handle = timed_handle
+
+    loop = asyncio.get_running_loop()
+    lags: List[float] = []
+
+    async def probe() -> None:
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(0.01)
+            lags.append((loop.time() - t0 - 0.01) * 1e3)
+
+    if args.tracemalloc_frames:
+        tracemalloc.start(args.tracemalloc_frames)
+    main = asyncio.create_task(app.main())
+    prober = asyncio.create_task(probe())
+    host = "127.0.0.1" if cfg.ingest.host in ("0.0.0.0", "") else cfg.ingest.host
+    # Runs until stopped after the last sample: every interval is under load
+    sim = multiprocessing.Process(
+        target=_simulate, args=(host, cfg.ingest.port, args.pps), daemon=True
+    )
+
+    samples: List[Sample] = []
+    baseline: Optional[tracemalloc.Snapshot] = None
+    growers: List[Tuple[str, int, int]] = []
+    try:
+        await asyncio.sleep(0.2)  # bound and listening
+        sim.start()
+        deadline = loop.time() + 10.0
+        while not handled:  # the clock starts with the first track handled
+            if main.done():
+                main.result()
+            if not sim.is_alive() or loop.time() > deadline:
+                raise RuntimeError("soak: no tracks from the simulator")
+            await asyncio.sleep(0.01)
+        start = loop.time()
+        last_t, last_handled = start, handled
+        lags.clear()
+        latencies.clear()
+        print(
+            f"soak: {args.pps:g} pps for {args.duration:g} s, sample every "
+            f"{args.interval:g} s, warm-up {args.warmup:g} s, accel x{args.accel:g}"
+        )
+        print("  ".join(f"{f:>10}" for f in Sample._fields))
+        while True:
+            await asyncio.sleep(args.interval)
+            now = loop.time()
+            if main.done():
+                main.result()  # the app stopped: raise its error
+            if not sim.is_alive():
+                raise RuntimeError(f"soak: simulator exited ({sim.exitcode})")
+            gc.collect()
+            sample = Sample(
+                t_s=round(now - start, 1),
+                rss_mb=rss_bytes() / 1e6,
+                traced_mb=(
+                    tracemalloc.get_traced_memory()[0] / 1e6
+                    if tracemalloc.is_tracing()
+                    else 0.0
+                ),
+                tasks=len(asyncio.all_tasks()),
+                series=metric_series(),
+                rate=(handled - last_handled) / (now - last_t),
+                lag_p99_ms=_quantile(lags, 0.99),
+                lat_p99_ms=_quantile(latencies, 0.99),
+            )
+            lags.clear()
+            latencies.clear()
+            last_t, last_handled = now, handled
+            samples.append(sample)
+            print(
+                "  ".join(
+                    f"{v:>10.2f}" if isinstance(v, float) else f"{v:>10}"
+                    for v in sample
+                )
+            )
+            if baseline is None and sample.t_s >= args.warmup:
+                if tracemalloc.is_tracing():
+                    baseline = tracemalloc.take_snapshot()
+            if now - start >= args.duration:
+                break
+        if baseline is not None:
+            diff = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+            growers = [
+                (str(d.traceback), d.size_diff, d.count_diff)
+                for d in diff[: args.top]
+                if d.size_diff > 0
+            ]
+    finally:
+        if sim.pid is not None:
+            sim.terminate()
+            sim.join(timeout=5)
+        for task in (prober, main):
+            task.cancel()
+        await asyncio.gather(prober, main, return_exceptions=True)
+        if hasattr(signal, "SIGHUP"):
+            loop.remove_signal_handler(signal.SIGHUP)  # installed by app.main
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        app.handle = inner
+        app.ARGS, app.CONFIG = saved
+        app.STATS.configure(
+            saved[1].tracks.stats_window_s, saved[1].tracks.stats_sectors
+        )
+        app.apply_tunables(saved[1])
+    return samples, growers
+
+
+def report(args, samples: List[Sample], growers: List[Tuple[str, int, int]]) -> int:
+    """Print the fits and growers; the exit status (0 pass, 1 fail, 2 no data)."""
+    limits = {option: getattr(args, option) for option, _ in TRENDS.values()}
+    steady = [s for s in samples if s.t_s >= args.warmup]
+    if growers:
+        print("\ntracemalloc top growers since warm-up:")
+        for where, size, count in growers:
+            print(f"  {size / 1024:+10.1f} KiB {count:+8d} blocks  {where}")
+    result = {
+        "samples": [s._asdict() for s in samples],
+        "growers": growers,
+        "trends": [],
+    }
+    status = 0
+    if len(steady) < 3:
+        print(f"\nsoak: only {len(steady)} samples after warm-up; need 3 to fit trends")
+        status = 2
+    else:
+        print("\ntrend after warm-up:")
+        for field, per_h, limit, ok in evaluate(samples, args.warmup, limits):
+            unit = TRENDS[field][1]
+            verdict = "ok" if ok else "FAIL"
+            print(f"  {field:<12} {per_h:+12.3f} {unit:<10} limit {limit:g}  {verdict}")
+            result["trends"].append(
+                {"field": field, "per_hour": per_h, "limit": limit, "ok": ok}
+            )
+            if not ok:
+                status = 1
+        print("soak: " + ("PASS" if status == 0 else "FAIL"))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return status
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(
+        prog="tools.soak",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    p.add_argument("--duration", type=float, default=600.0, help="seconds")
+    p.add_argument("--pps", type=float, default=5000.0, help="simulator rate")
+    p.add_argument("--interval", type=float, default=10.0, help="seconds per sample")
+    p.add_argument(
+        "--warmup", type=float, help="seconds left out of the fits (default 10%%)"
+    )
+    p.add_argument("--accel", type=float, default=1.0, help="app timer speed-up")
+    p.add_argument(
+        "--tracemalloc-frames",
+        type=int,
+        default=0,
+        help="trace allocations with this many frames (0: off; slows the app)",
+    )
+    p.add_argument("--top", type=int, default=10, help="tracemalloc growers shown")
+    p.add_argument("--max-rss-mb-per-h", type=float, default=20.0)
+    p.add_argument("--max-tasks-per-h", type=float, default=1000.0)
+    p.add_argument("--max-series-per-h", type=float, default=100.0)
+    p.add_argument("--max-p99-ms-per-h", type=float, default=5.0)
+    p.add_argument("--json", help="write samples, growers and trends here")
+    add_arguments(p)  # --config / --set for the app under test
+    args = p.parse_args(argv)
+    if args.accel <= 0:
+        p.error("--accel must be > 0")
+    if args.warmup is None:
+        args.warmup = args.duration / 10
+    if args.print_config:
+        print(json.dumps(soak_config(args)[1].model_dump(), indent=2))
+        return 0
+    cfg = soak_config(args)[1]
+    samples, growers = run(soak(args), loop=cfg.ingest.event_loop)
+    return report(args, samples, growers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Datagram factories shared by the ingest tests.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def track_pkt(track_id: int = 1, seq: Optional[int] = None, **extra) -> bytes:
+    """A JSON track packet stamped now; `extra` adds or overrides keys."""
+    obj = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "id": track_id,
+        "range_m": 100.0,
+        "az_deg": 0.0,
+        "el_deg": 1.0,
+        "vr_mps": 0.0,
+        "snr_db": 20.0,
+        **extra,
+    }
+    if seq is not None:
+        obj["seq"] = seq
+    return json.dumps(obj).encode()
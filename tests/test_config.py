@@ -0,0 +1,254 @@
+"""
+Tests for the layered runtime configuration and its hot-reload path.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+
+import pytest
+
+from adapter.forwarder import Endpoint, Forwarder
+from common.config import (
+    ENV,
+    TUNABLE,
+    Config,
+    changes,
+    flatten,
+    load_config,
+    reload_config,
+)
+from common.ratelog import RateLimitedLog, set_default_limits
+from common.records import TrackRecord
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_defaults_match_the_previous_hardcoded_values():
+    cfg = load_config(environ={})
+    assert (cfg.ingest.port, cfg.http.port) == (9999, 8000)
+    assert (cfg.simulator.rate_hz, cfg.simulator.health_every) == (10.0, 50)
+    assert cfg.sequence.window == 64
+    assert cfg.forward.batch == 256
+
+
+def test_file_env_and_overrides_layer_in_order(tmp_path):
+    path = write_json(
+        tmp_path / "radar.json",
+        {"forward": {"batch": 128, "linger_s": 0.2}, "ingest": {"port": 10000}},
+    )
+    env = {"RADAR_FORWARD_BATCH": "64", "RADAR_SEQ_WINDOW": "0"}
+    cfg = load_config(path, ["forward.batch=32"], environ=env)
+    assert cfg.forward.batch == 32  # --set beats env beats file
+    assert cfg.forward.linger_s == 0.2
+    assert cfg.ingest.port == 10000
+    assert cfg.sequence.window == 0
+
+
+def test_config_file_from_environment(tmp_path):
+    pytest.importorskip("tomllib")
+    toml = tmp_path / "radar.toml"
+    toml.write_text('[validation]\ndefault = "sampled"\nsample_one_in = 8\n')
+    cfg = load_config(environ={"RADAR_CONFIG": str(toml)})
+    assert (cfg.validation.default, cfg.validation.sample_one_in) == ("sampled", 8)
+
+
+def test_one_variable_can_set_several_fields():
+    cfg = load_config(environ={"RADAR_EVENT_LOOP": "auto", "RADAR_PORT": "7000"})
+    assert cfg.ingest.event_loop == cfg.simulator.event_loop == "auto"
+    assert cfg.simulator.port == 7000
+    assert cfg.ingest.port == 9999
+
+
+def test_every_env_variable_names_a_field():
+    fields = set(flatten(Config()))
+    assert {k for keys in ENV.values() for k in keys} <= fields
+    assert TUNABLE <= fields
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        "ingest.backend=epoll",
+        "forward.batch=0",
+        "forward.batch=70000",
+        "overload.off_delay_s=1.0",
+        "tracks.stats_sectors=7",
+        "simulator.hmac_key=xyz",
+        "ingest.nope=1",
+        "nosection.field=1",
+        "forward.batch",
+    ],
+)
+def test_invalid_settings_are_rejected(override):
+    with pytest.raises(ValueError):
+        load_config(overrides=[override], environ={})
+
+
+def test_reload_applies_tunables_and_keeps_the_rest(tmp_path, caplog):
+    path = tmp_path / "radar.json"
+    write_json(path, {"forward": {"batch": 128}, "ingest": {"port": 10000}})
+    current = load_config(str(path), environ={})
+    write_json(
+        path,
+        {
+            "forward": {"batch": 512},
+            "ingest": {"port": 10001},
+            "log": {"level": "DEBUG"},
+        },
+    )
+    with caplog.at_level(logging.WARNING, logger="app"):
+        cfg, changed = reload_config(current, str(path), environ={})
+    assert changed == {"forward.batch": 512, "log.level": "DEBUG"}
+    assert cfg.forward.batch == 512
+    assert cfg.ingest.port == 10000  # needs a restart
+    assert "ingest.port" in caplog.text
+    assert changes(cfg, current) == {"forward.batch": 128, "log.level": "INFO"}
+
+
+def test_failed_reload_raises_and_leaves_config_alone(tmp_path):
+    path = tmp_path / "radar.json"
+    write_json(path, {"forward": {"batch": 128}})
+    current = load_config(str(path), environ={})
+    path.write_text("{not json")
+    with pytest.raises(ValueError):
+        reload_config(current, str(path), environ={})
+    write_json(path, {"forward": {"batch": -1}})
+    with pytest.raises(ValueError):
+        reload_config(current, str(path), environ={})
+    assert current.forward.batch == 128
+
+
+def test_default_log_limits_follow_reload():
+    logger = logging.getLogger("test.config")
+    shared = RateLimitedLog(logger)
+    fixed = RateLimitedLog(logger, interval_s=5.0, burst=1)
+    try:
+        set_default_limits(0.25, 2)
+        assert (shared.interval_s, shared.burst) == (0.25, 2)
+        assert (fixed.interval_s, fixed.burst) == (5.0, 1)
+        assert RateLimitedLog(logger).burst == 2
+    finally:
+        set_default_limits(1.0, 5)
+    assert (shared.interval_s, shared.burst) == (1.0, 5)
+
+
+@pytest.mark.asyncio
+async def test_forwarder_tune_keeps_queued_batches():
+    fwd = Forwarder([Endpoint("udp", "127.0.0.1", 9)], batch_max=10, linger_s=60.0)
+    fwd.start()
+    try:
+        q = fwd.queues[0]
+        for w in fwd._workers:  # keep the batches queued
+            w.cancel()
+        for i in range(25):
+            fwd.submit(TrackRecord(i, i, 1.0, 0.0, 0.0, 0.0, 0.0))
+        assert (len(q), q.tracks, len(fwd._batch)) == (2, 20, 5)
+        fwd.tune(batch_max=4, buffer_tracks=1000)
+        assert (len(q), q.tracks, len(fwd._batch)) == (3, 25, 0)
+        assert fwd.batch_max == 4 and q.max_tracks == 1000
+        with pytest.raises(ValueError):
+            fwd.tune(batch_max=0)
+    finally:
+        await fwd.close(timeout_s=0)
+
+
+@pytest.mark.asyncio
+async def test_sighup_applies_tunables_without_rebinding(tmp_path, monkeypatch):
+    import app
+
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    path = tmp_path / "radar.json"
+    settings = {
+        "overload": {"keep_one_in": 4, "on_delay_s": 1.0},
+        "sequence": {"max_delay_s": 0.05},
+        "validation": {"default": "sampled", "sample_one_in": 16},
+        "tracks": {"ttl_s": 10.0},
+        "log": {"level": "WARNING", "track_one_in": 1},
+    }
+    write_json(path, settings)
+    saved = app.ARGS, app.CONFIG
+    app.load(
+        ["--config", str(path), "--set", "http.port=0"]
+        + ["--set", "ingest.host=127.0.0.1", "--set", f"ingest.port={port}"]
+    )
+
+    seen = []
+    monkeypatch.setattr(app, "handle", lambda msg: seen.append(msg.payload.id))
+    ingest = {}
+    run_udp_ingest = app.run_udp_ingest
+
+    def capture(**kwargs):
+        ingest.update(kwargs)
+        return run_udp_ingest(**kwargs)
+
+    monkeypatch.setattr(app, "run_udp_ingest", capture)
+    loop = asyncio.get_running_loop()
+    main = asyncio.create_task(app.main())
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        while not ingest:
+            await asyncio.sleep(0.01)
+        sock = ingest["sock"]
+        fileno = sock.fileno()
+
+        def send(seqs):
+            for seq in seqs:
+                pkt = {
+                    "seq": seq,
+                    "ts": "2025-11-13T22:15:04Z",
+                    "id": seq,
+                    "range_m": 1000.0,
+                    "az_deg": 0.0,
+                    "el_deg": 1.0,
+                    "vr_mps": 0.0,
+                    "snr_db": 20.0,
+                }
+                sender.sendto(json.dumps(pkt).encode(), ("127.0.0.1", port))
+
+        async def handled(n):
+            deadline = loop.time() + 5.0
+            while len(seen) < n:
+                assert loop.time() < deadline, f"{len(seen)} of {n} packets handled"
+                await asyncio.sleep(0.01)
+
+        send(range(1, 101))
+        await handled(100)
+        settings["overload"] = {"keep_one_in": 8, "on_delay_s": 2.0}
+        settings["sequence"] = {"max_delay_s": 0.2}
+        settings["validation"]["sample_one_in"] = 4
+        settings["tracks"] = {"ttl_s": 3.0}
+        settings["log"]["track_one_in"] = 50
+        settings["ingest"] = {"reader_batch": 64}  # needs a restart: ignored
+        write_json(path, settings)
+        os.kill(os.getpid(), signal.SIGHUP)
+        send(range(101, 201))  # queued on the socket behind the reload
+        await handled(200)
+        send(range(201, 301))
+        await handled(300)
+
+        assert seen == list(range(1, 301))  # none lost, still in sequence
+        assert sock.fileno() == fileno and not main.done()
+        assert ingest["overload"].keep_one_in == 8
+        assert ingest["overload"].on_delay_s == 2.0
+        assert ingest["sequencer"].max_delay_s == 0.2
+        assert ingest["validation"].sample_one_in == 4
+        assert app.TRACKS.ttl_s == 3.0
+        assert app.TRACK_LOG_ONE_IN == 50
+        assert app.CONFIG.ingest.reader_batch == 256
+    finally:
+        sender.close()
+        main.cancel()
+        await asyncio.gather(main, return_exceptions=True)
+        loop.remove_signal_handler(signal.SIGHUP)
+        app.ARGS, app.CONFIG = saved
+        app.apply_tunables(saved[1])
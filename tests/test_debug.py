@@ -0,0 +1,151 @@
+"""
+Tests for the on-demand profiling and tracemalloc debug endpoints.
+"""
+
+import asyncio
+import concurrent.futures
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from api.debug import DebugApp
+from api.server import make_app
+
+
+def call(app, path: str, qs: str = ""):
+    captured = {}
+
+    def start_response(status, headers):
+        captured["status"] = status
+        captured["headers"] = dict(headers)
+
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": qs}
+    body = b"".join(app(environ, start_response))
+    return captured["status"], captured["headers"], body
+
+
+def busy_handler():
+    # Long enough (~10 ms) that the sampler thread gets the GIL mid-call
+    return sum(i * i for i in range(200_000))
+
+
+@pytest.fixture
+def debug_app():
+    """A DebugApp attached to an event loop running busy work in another thread."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    stop = threading.Event()
+    holder = {}
+
+    async def work():
+        holder["app"] = DebugApp(loop)
+        ready.set()
+        while not stop.is_set():
+            busy_handler()
+            await asyncio.sleep(0)
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(work(),))
+    thread.daemon = True
+    thread.start()
+    ready.wait(timeout=2.0)
+    yield holder["app"]
+    stop.set()
+    thread.join(timeout=2.0)
+    loop.close()
+
+
+def test_cprofile_returns_loadable_pstats(debug_app, tmp_path):
+    status, headers, body = call(debug_app, "/debug/profile", "seconds=0.2")
+    assert status == "200 OK"
+    assert headers["Content-Type"] == "application/octet-stream"
+
+    path = tmp_path / "ingest.pstats"
+    path.write_bytes(body)
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == "busy_handler" for func in stats.stats)
+    assert isinstance(marshal.loads(body), dict)
+
+
+@pytest.mark.parametrize("block_after_s", [0.0, 0.05])
+def test_cprofile_on_blocked_loop_fails_and_leaves_profiler_off(block_after_s):
+    loop = asyncio.new_event_loop()
+    ready, block, stop = threading.Event(), threading.Event(), threading.Event()
+    holder = {}
+
+    async def work():
+        holder["app"] = DebugApp(loop, loop_timeout_s=0.1)
+        ready.set()
+        while not stop.is_set():
+            if block.is_set():
+                block.clear()
+                time.sleep(0.4)  # a handler hogging the loop
+            await asyncio.sleep(0.005)
+
+    def profiler_on_loop():
+        seen = concurrent.futures.Future()
+        loop.call_soon_threadsafe(lambda: seen.set_result(sys.getprofile()))
+        return seen.result(timeout=2.0)
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(work(),))
+    thread.start()
+    ready.wait(timeout=2.0)
+    try:
+        # Blocked before cProfile is switched on, or while it runs
+        threading.Timer(block_after_s, block.set).start()
+        time.sleep(0.01)
+        status, _, body = call(holder["app"], "/debug/profile", "seconds=0.2")
+        assert status == "503 Service Unavailable"
+        assert b"loop unresponsive" in body
+        assert profiler_on_loop() is None  # once the loop has caught up
+        assert call(holder["app"], "/debug/profile", "seconds=0.05")[0] == "200 OK"
+    finally:
+        stop.set()
+        thread.join(timeout=2.0)
+        loop.close()
+
+
+def test_sampler_returns_collapsed_stacks(debug_app):
+    status, _, body = call(
+        debug_app, "/debug/profile", "seconds=0.2&mode=sample&hz=200"
+    )
+    assert status == "200 OK"
+    lines = body.decode().strip().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert any("busy_handler (" in line for line in lines)
+
+
+def test_profile_rejects_bad_parameters(debug_app):
+    assert call(debug_app, "/debug/profile", "seconds=600")[0] == "400 Bad Request"
+    assert call(debug_app, "/debug/profile", "mode=perf")[0] == "400 Bad Request"
+
+
+def test_tracemalloc_snapshot_diff(debug_app):
+    status, _, _ = call(debug_app, "/debug/tracemalloc", "action=snapshot")
+    assert status == "409 Conflict"
+
+    assert call(debug_app, "/debug/tracemalloc", "action=start")[0] == "200 OK"
+    try:
+        status, _, body = call(debug_app, "/debug/tracemalloc", "action=snapshot")
+        assert status == "200 OK"
+        assert body.startswith(b"# Top allocations")
+
+        leak = [bytearray(1024) for _ in range(200)]  # noqa: F841
+        status, _, body = call(debug_app, "/debug/tracemalloc", "action=snapshot")
+        assert status == "200 OK"
+        assert body.startswith(b"# Top growth")
+        assert b"test_debug.py" in body
+    finally:
+        call(debug_app, "/debug/tracemalloc", "action=stop")
+    assert not tracemalloc.is_tracing()
+
+
+def test_debug_routes_absent_unless_mounted():
+    status, _, _ = call(make_app(), "/debug/profile", "seconds=1")
+    assert status == "404 Not Found"
@@ -0,0 +1,238 @@
+"""
+Tests for the track codec and the batched downstream forwarder.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from adapter.forwarder import (
+    FORWARD_DROPPED_TOTAL,
+    Batch,
+    Endpoint,
+    EndpointQueue,
+    Forwarder,
+    parse_endpoints,
+)
+from adapter.parser import parse_packet
+from common.codec import (
+    HEADER,
+    LENGTH,
+    RECORD,
+    decode_tracks,
+    encode_tracks,
+    frame,
+    iter_frames,
+)
+from common.records import TrackRecord
+from tools.sink import TrackSink
+
+
+def rec(i: int) -> TrackRecord:
+    return TrackRecord(
+        1_700_000_000_000_000_000 + i, i, 100.0 + i, 1.5, 2.0, -3.25, 20.0
+    )
+
+
+def fields(t):
+    return (t.ts_ns, t.id, t.range_m, t.az_deg, t.el_deg, t.vr_mps, t.snr_db)
+
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_codec_roundtrip(encoding):
+    tracks = [rec(i) for i in range(5)]
+    body = encode_tracks(tracks, encoding)
+    assert [fields(t) for t in decode_tracks(body)] == [fields(t) for t in tracks]
+    if encoding == "binary":
+        assert len(body) == HEADER.size + 5 * RECORD.size
+
+
+def test_json_batch_is_an_ingest_frame():
+    msg = parse_packet(encode_tracks([rec(1), rec(2)], "json"), records=True)
+    assert msg.kind == "frame"
+    assert [t.id for t in msg.payload["tracks"]] == [1, 2]
+    assert msg.payload["tracks"][0].ts_ns == rec(1).ts_ns
+
+
+def test_frames_split_a_stream():
+    bodies = [encode_tracks([rec(i)], "binary") for i in range(3)]
+    stream = b"".join(frame(b) for b in bodies)
+    buf = bytearray(stream[:10])
+    assert list(iter_frames(buf)) == []
+    buf += stream[10:]
+    assert list(iter_frames(buf)) == bodies
+    assert buf == b""
+
+
+def test_decode_rejects_malformed():
+    with pytest.raises(ValueError):
+        decode_tracks(encode_tracks([rec(1)], "binary")[:-1])
+    with pytest.raises(ValueError):
+        decode_tracks(b'{"id": 1}')
+
+
+def test_parse_endpoints():
+    assert parse_endpoints("tcp://10.0.0.9:7000, udp://[::1]:7001") == [
+        Endpoint("tcp", "10.0.0.9", 7000),
+        Endpoint("udp", "::1", 7001),
+    ]
+    with pytest.raises(ValueError):
+        parse_endpoints("http://10.0.0.9:80")
+
+
+@pytest.mark.asyncio
+async def test_queue_drops_oldest_on_overflow():
+    q = EndpointQueue(Endpoint("tcp", "overflow.test", 1), max_tracks=10)
+    before = FORWARD_DROPPED_TOTAL.get(
+        endpoint="tcp://overflow.test:1", reason="overflow"
+    )
+    for i in range(4):
+        q.put(Batch(b"%d" % i, 4, 0.0))
+    assert q.tracks == 8
+    assert (await q.get()).body == b"2"
+    dropped = FORWARD_DROPPED_TOTAL.get(
+        endpoint="tcp://overflow.test:1", reason="overflow"
+    )
+    assert dropped - before == 8
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scheme", ["tcp", "udp"])
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+async def test_forwards_batches_by_size_and_time(scheme, encoding):
+    sink = await TrackSink().start()
+    host, port = sink.tcp_addr if scheme == "tcp" else sink.udp_addr
+    fwd = Forwarder(
+        [Endpoint(scheme, host, port)], encoding=encoding, batch_max=10, linger_s=0.02
+    )
+    fwd.start()
+    try:
+        for i in range(25):  # two full batches, then 5 that wait for the linger
+            fwd.submit(rec(i))
+        got = await sink.wait_for(25)
+        assert [t.id for t in got] == list(range(25))
+        assert sink.batches == 3
+        assert fields(got[7]) == fields(rec(7))
+    finally:
+        await fwd.close()
+        await sink.close()
+
+
+@pytest.mark.asyncio
+async def test_unencodable_track_is_dropped_not_its_batch():
+    sink = await TrackSink().start()
+    ep = Endpoint("tcp", *sink.tcp_addr)
+    before = FORWARD_DROPPED_TOTAL.get(endpoint=ep.label, reason="unencodable")
+    fwd = Forwarder([ep], encoding="binary", batch_max=5, linger_s=0.02)
+    fwd.start()
+    try:
+        tracks = [rec(i) for i in range(8)]
+        tracks[2].id = 2**64  # a valid Track id, but not a uint64
+        tracks[6].ts_ns = 2**63
+        for t in tracks:  # a full batch from submit(), the rest on the linger timer
+            fwd.submit(t)
+        got = await sink.wait_for(6)
+        assert [t.id for t in got] == [0, 1, 3, 4, 5, 7]
+        dropped = FORWARD_DROPPED_TOTAL.get(endpoint=ep.label, reason="unencodable")
+        assert dropped - before == 2
+    finally:
+        await fwd.close()
+        await sink.close()
+
+
+@pytest.mark.asyncio
+async def test_tcp_reconnects_after_connection_loss():
+    sink = await TrackSink().start()
+    fwd = Forwarder(
+        [Endpoint("tcp", *sink.tcp_addr)],
+        batch_max=5,
+        connections=2,
+        backoff_min_s=0.01,
+    )
+    fwd.start()
+    try:
+        fwd.submit_many(rec(i) for i in range(5))
+        await sink.wait_for(5)
+        sink.drop_connections()
+        await asyncio.sleep(0.05)
+        for i in range(5, 50):
+            fwd.submit(rec(i))
+            await asyncio.sleep(0.005)
+        await sink.wait_for(40)
+        assert sink.connections >= 1  # reconnected
+    finally:
+        await fwd.close()
+        await sink.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_endpoint_is_bounded_and_does_not_block():
+    # Nothing listens on this port: the worker backs off, the queue stays bounded
+    sink = await TrackSink().start()
+    dead = ("127.0.0.1", sink.tcp_addr[1])
+    await sink.close()
+    fwd = Forwarder(
+        [Endpoint("tcp", *dead)], batch_max=10, buffer_tracks=30, backoff_min_s=0.01
+    )
+    fwd.start()
+    try:
+        for i in range(200):
+            fwd.submit(rec(i))
+        assert fwd.queues[0].tracks <= 30
+    finally:
+        await fwd.close(timeout_s=0.05)
+    assert fwd.queues[0].tracks == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="unacked bytes via TIOCOUTQ"
+)
+async def test_tcp_peer_closing_mid_stream_resends_unacknowledged():
+    # The first connection reads 50 tracks of a steady backlog and closes;
+    # what it had not received must come again on the next connection
+    got = []
+    conns = []
+
+    async def serve(reader, writer):
+        conns.append(writer)
+        first = len(conns) == 1
+        if first:
+            writer.write(b"hello")  # peers may talk back: EOF is not at_eof()
+        try:
+            while not (first and len(got) >= 50):
+                (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                got.extend(t.id for t in decode_tracks(await reader.readexactly(size)))
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    fwd = Forwarder(
+        [Endpoint("tcp", host, port)],
+        batch_max=5,
+        linger_s=10.0,
+        connections=1,
+        backoff_min_s=0.01,
+    )
+    fwd.start()
+    loop = asyncio.get_running_loop()
+    try:
+        for i in range(1000):
+            fwd.submit(rec(i))
+            if i % 5 == 4 and not 40 < i < 300:  # a burst while the peer closes
+                await asyncio.sleep(0.0005)
+        deadline = loop.time() + 3.0
+        while got[-1:] != [999]:
+            assert loop.time() < deadline, "forwarding did not resume"
+            await asyncio.sleep(0.01)
+        assert len(conns) == 2
+        # Only what reached the peer's socket and was never read is gone
+        assert 1000 - len(set(got)) <= 50
+        assert set(range(300, 1000)) <= set(got)
+    finally:
+        await fwd.close()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,59 @@
+"""
+Tests for event loop selection.
+"""
+
+import asyncio
+
+import pytest
+
+from common.loops import describe, loop_factory, resolve, run, uvloop_available
+
+
+def test_run_on_default_loop():
+    async def main():
+        return describe()
+
+    assert run(main(), loop="asyncio").startswith("asyncio (")
+
+
+def test_run_cancels_leftover_tasks():
+    cancelled = []
+
+    async def forever():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        asyncio.get_running_loop().create_task(forever())
+        await asyncio.sleep(0)
+        return 42
+
+    assert run(main()) == 42
+    assert cancelled == [True]
+
+
+def test_auto_picks_uvloop_only_when_installed():
+    assert resolve("auto") == ("uvloop" if uvloop_available() else "asyncio")
+    assert resolve("asyncio") == "asyncio"
+
+
+def test_unknown_loop_rejected():
+    with pytest.raises(ValueError):
+        loop_factory("trio")
+
+
+@pytest.mark.skipif(uvloop_available(), reason="uvloop is installed")
+def test_uvloop_requested_but_missing():
+    with pytest.raises(RuntimeError, match="uvloop"):
+        loop_factory("uvloop")
+
+
+@pytest.mark.skipif(not uvloop_available(), reason="uvloop not installed")
+def test_uvloop_runs():
+    async def main():
+        return describe()
+
+    assert run(main(), loop="uvloop").startswith("uvloop")
@@ -7,11 +7,12 @@ import json
 from datetime import datetime, timezone
 
 import pytest
-from prometheus_client import REGISTRY
+from prometheus_client import CollectorRegistry, generate_latest
 
 from adapter.ingest import UdpIngest
 from adapter.parser import Parsed
 from app import handle, TEMP_C, CPU_PCT, PKTS_TOTAL
+from common.metrics import LocalCounter, LocalHistogram
 from common.models import Track, HealthStatus
 
 
@@ -21,10 +22,10 @@ class TestMetricsHandler:
     def setup_method(self):
         """Reset metrics before each test."""
         # Clear all collectors to reset metrics
-        PKTS_TOTAL.labels(kind="track")._value._value = 0
-        PKTS_TOTAL.labels(kind="health")._value._value = 0
-        PKTS_TOTAL.labels(kind="frame")._value._value = 0
-        PKTS_TOTAL.labels(kind="unknown")._value._value = 0
+        PKTS_TOTAL.labels(kind="track").value = 0
+        PKTS_TOTAL.labels(kind="health").value = 0
+        PKTS_TOTAL.labels(kind="frame").value = 0
+        PKTS_TOTAL.labels(kind="unknown").value = 0
         TEMP_C.set(0)
         CPU_PCT.set(0)
 
@@ -41,9 +42,9 @@ class TestMetricsHandler:
         )
         msg = Parsed(kind="track", payload=track)
 
-        initial = PKTS_TOTAL.labels(kind="track")._value._value
+        initial = PKTS_TOTAL.labels(kind="track").value
         handle(msg)
-        final = PKTS_TOTAL.labels(kind="track")._value._value
+        final = PKTS_TOTAL.labels(kind="track").value
 
         assert final == initial + 1
 
@@ -62,7 +63,7 @@ class TestMetricsHandler:
 
         assert TEMP_C._value._value == 42.5
         assert CPU_PCT._value._value == 65.3
-        assert PKTS_TOTAL.labels(kind="health")._value._value >= 1
+        assert PKTS_TOTAL.labels(kind="health").value >= 1
 
     def test_handle_frame_increments_counter(self):
         """Test that handling a frame message increments the frame counter."""
@@ -90,9 +91,9 @@ class TestMetricsHandler:
         }
         msg = Parsed(kind="frame", payload=frame_payload)
 
-        initial = PKTS_TOTAL.labels(kind="frame")._value._value
+        initial = PKTS_TOTAL.labels(kind="frame").value
         handle(msg)
-        final = PKTS_TOTAL.labels(kind="frame")._value._value
+        final = PKTS_TOTAL.labels(kind="frame").value
 
         assert final == initial + 1
 
@@ -117,10 +118,10 @@ class TestMetricsHandler:
             snr_db=22.0,
         )
 
-        initial = PKTS_TOTAL.labels(kind="track")._value._value
+        initial = PKTS_TOTAL.labels(kind="track").value
         handle(Parsed(kind="track", payload=track1))
         handle(Parsed(kind="track", payload=track2))
-        final = PKTS_TOTAL.labels(kind="track")._value._value
+        final = PKTS_TOTAL.labels(kind="track").value
 
         assert final == initial + 2
 
@@ -150,6 +151,63 @@ class TestMetricsHandler:
         assert CPU_PCT._value._value == 75.0
 
 
+class TestLocalMetrics:
+    """Test the lock-free counters/histograms and their exposition."""
+
+    def test_counter_exposition_matches_prometheus_counter(self):
+        registry = CollectorRegistry()
+        counter = LocalCounter(
+            "radar_test_packets_total", "Test", labelnames=("kind",), registry=registry
+        )
+        cell = counter.labels(kind="track")
+        cell.inc()
+        cell.inc(2)
+
+        text = generate_latest(registry).decode()
+        assert "# TYPE radar_test_packets_total counter" in text
+        assert 'radar_test_packets_total{kind="track"} 3.0' in text
+        assert (
+            registry.get_sample_value("radar_test_packets_total", {"kind": "track"})
+            == 3
+        )
+
+    def test_counter_sums_worker_shards(self):
+        registry = CollectorRegistry()
+        counter = LocalCounter("radar_test_total", "Test", registry=registry)
+        worker = counter.shard().labels()
+        counter.inc()
+        worker.inc(4)
+
+        assert counter.get() == 5
+        assert registry.get_sample_value("radar_test_total") == 5
+
+    def test_counter_rejects_wrong_labels(self):
+        counter = LocalCounter(
+            "radar_test_labels_total", "Test", labelnames=("kind",), registry=None
+        )
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = CollectorRegistry()
+        hist = LocalHistogram(
+            "radar_test_latency_seconds", "Test", [0.001, 0.01], registry=registry
+        )
+        hist.observe(0.0005)
+        hist.shard().observe_many([0.001, 0.005, 1.0])
+
+        def sample(suffix, **labels):
+            return registry.get_sample_value(
+                f"radar_test_latency_seconds{suffix}", labels
+            )
+
+        assert sample("_bucket", le="0.001") == 2
+        assert sample("_bucket", le="0.01") == 3
+        assert sample("_bucket", le="+Inf") == 4
+        assert sample("_count") == 4
+        assert sample("_sum") == pytest.approx(1.0065)
+
+
 @pytest.mark.asyncio
 async def test_metrics_integration_with_udp_ingest():
     """Integration test: send UDP packets and verify metrics are updated."""
@@ -173,7 +231,7 @@ async def test_metrics_integration_with_udp_ingest():
     )
 
     # Reset metrics
-    initial_track_count = PKTS_TOTAL.labels(kind="track")._value._value
+    initial_track_count = PKTS_TOTAL.labels(kind="track").value
 
     # Send a track packet
     track_pkt = json.dumps(
@@ -205,7 +263,7 @@ async def test_metrics_integration_with_udp_ingest():
     await asyncio.sleep(0.4)
 
     # Verify metrics
-    final_track_count = PKTS_TOTAL.labels(kind="track")._value._value
+    final_track_count = PKTS_TOTAL.labels(kind="track").value
     assert final_track_count > initial_track_count
 
     assert TEMP_C._value._value == 48.5
@@ -0,0 +1,94 @@
+"""
+Tests for byte-level packet peeking and the overload (load shedding) controller.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from adapter.ingest import UdpIngest
+from adapter.overload import SHED_PACKETS_TOTAL, OverloadController
+from adapter.parser import Parsed
+from adapter.peek import FRAME, HEALTH, TRACK, classify, track_id
+from tests.packets import track_pkt
+
+
+HEALTH_PKT = json.dumps(
+    {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "radar_mode": "FAULT",
+        "temperature_c": 99.0,
+        "supply_v": 12.0,
+        "cpu_load_pct": 90.0,
+    }
+).encode()
+
+
+def test_peek_classify_and_track_id():
+    assert classify(track_pkt(7)) == TRACK
+    assert classify(HEALTH_PKT) == HEALTH
+    assert classify(b'{"tracks": []}') == FRAME
+    assert track_id(track_pkt(1234)) == 1234
+    assert track_id(HEALTH_PKT) is None
+
+
+def test_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        OverloadController("drop-everything")
+
+
+def test_hysteresis():
+    ctl = OverloadController(on_delay_s=0.05, off_delay_s=0.01, alpha=1.0)
+    ctl.observe_delay(0.02)
+    assert not ctl.shedding
+    ctl.observe_delay(0.06)
+    assert ctl.shedding
+    ctl.observe_delay(0.02)  # between thresholds: stays on
+    assert ctl.shedding
+    ctl.observe_delay(0.005)
+    assert not ctl.shedding
+
+
+def test_sample_policy_keeps_one_in_n_and_never_sheds_health():
+    ctl = OverloadController("sample", keep_one_in=4)
+    ctl.shedding = True
+    shed = SHED_PACKETS_TOTAL.labels(kind=TRACK)
+    before = shed.value
+
+    admitted = [ctl.admit(TRACK, track_pkt(i)) for i in range(100)]
+    assert sum(admitted) == 25
+    assert shed.value - before == 75
+    assert all(ctl.admit(HEALTH, HEALTH_PKT) for _ in range(10))
+
+
+def test_latest_policy_keeps_newest_per_id():
+    ctl = OverloadController("latest")
+    ctl.shedding = True
+    for rng in (100.0, 200.0, 300.0):
+        assert not ctl.admit(TRACK, track_pkt(1, range_m=rng))
+    assert not ctl.admit(TRACK, track_pkt(2))
+    held = ctl.take_held()
+    assert len(held) == 2
+    assert json.loads(held[0][0])["range_m"] == 300.0
+    assert ctl.take_held() == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_sheds_tracks_but_delivers_health():
+    received: list[Parsed] = []
+    ctl = OverloadController("latest", decimate_interval_s=0.05)
+    ctl.shedding = True
+    ingest = UdpIngest(received.append, overload=ctl)
+
+    for rng in range(100, 1100, 100):
+        ingest.datagram_received(track_pkt(5, range_m=float(rng)), ("127.0.0.1", 1))
+    ingest.datagram_received(HEALTH_PKT, ("127.0.0.1", 1))
+
+    # Health is handled inline, ahead of any queued track work
+    assert [m.kind for m in received] == ["health"]
+
+    await asyncio.sleep(0.15)
+    tracks = [m.payload for m in received if m.kind == "track"]
+    assert [t.range_m for t in tracks] == [1000.0]
@@ -0,0 +1,180 @@
+"""
+Tests for pre-parse rejection (allowlist, size / leading byte, HMAC) and
+rate-limited error logging.
+"""
+
+import asyncio
+import json
+import logging
+import socket
+from datetime import datetime, timezone
+
+import pytest
+
+from adapter.ingest import PARSE_ERRORS_TOTAL, UdpIngest, run_udp_ingest
+from adapter.prefilter import (
+    PREFILTER_REJECTED_TOTAL,
+    TAG_SIZE,
+    PreFilter,
+    SourceAllowlist,
+    parse_cidrs,
+    parse_keys,
+    sign,
+)
+from adapter.sequence import peek_src
+from common.ratelog import RateLimitedLog
+from tests.packets import track_pkt
+
+KEY = bytes.fromhex("00112233445566778899aabbccddeeff")
+ADDR = ("10.0.0.5", 5000)
+
+
+def rejected(reason: str) -> float:
+    return PREFILTER_REJECTED_TOTAL.get(reason=reason)
+
+
+def test_allowlist_matches_cidrs():
+    allow = SourceAllowlist(["10.0.0.0/8", "192.168.1.5", "fd00::/16"])
+    assert "10.200.3.4" in allow
+    assert "192.168.1.5" in allow
+    assert "192.168.1.6" not in allow
+    assert "fd00:1::7" in allow
+    assert "fe80::1" not in allow
+    assert "not-an-ip" not in allow
+    assert "10.200.3.4" in allow  # cached decision
+
+
+def test_allowlist_cache_is_bounded():
+    allow = SourceAllowlist(["10.0.0.0/8"], cache_size=4)
+    for i in range(20):
+        assert f"10.0.0.{i}" in allow
+    assert len(allow._cache) <= 4
+
+
+def test_size_and_leading_byte():
+    f = PreFilter(min_size=8, max_size=1024)
+    assert f.check(track_pkt(), ADDR) is not None
+    assert f.check(b"  \n" + track_pkt(), ADDR) is not None
+
+    before = {r: rejected(r) for r in ("size", "leading_byte")}
+    assert f.check(b"{}", ADDR) is None
+    assert f.check(b"{" + b" " * 2000 + b"}", ADDR) is None
+    assert f.check(b"\x00\x01garbage-bytes", ADDR) is None
+    assert f.check(b"[1, 2, 3, 4, 5]", ADDR) is None
+    assert rejected("size") - before["size"] == 2
+    assert rejected("leading_byte") - before["leading_byte"] == 2
+
+
+def test_source_rejected_before_anything_else():
+    f = PreFilter(allow=["10.0.0.0/24"])
+    before = rejected("source")
+    assert f.check(track_pkt(), ADDR) is not None
+    assert f.check(b"garbage", ("10.0.1.5", 5000)) is None
+    assert rejected("source") - before == 1
+
+
+def test_hmac_verifies_and_strips_tag():
+    f = PreFilter(hmac_keys={"radar-a": KEY, "*": b"fallback"})
+    payload = track_pkt(src="radar-a")
+    assert f.check(sign(payload, KEY), ADDR) == payload
+
+    # Key by sender host when the payload has no "src"; default key otherwise
+    plain = track_pkt()
+    assert f.check(sign(plain, b"fallback"), ADDR) == plain
+
+    before = rejected("hmac")
+    assert f.check(payload, ADDR) is None  # unsigned
+    assert f.check(sign(payload, b"wrong-key"), ADDR) is None
+    tampered = bytearray(sign(payload, KEY))
+    tampered[10] ^= 1
+    assert f.check(bytes(tampered), ADDR) is None
+    assert rejected("hmac") - before == 3
+
+
+def test_hmac_on_memoryview_uses_src_key():
+    f = PreFilter(hmac_keys={"radar-a": KEY})
+    signed = sign(track_pkt(src="radar-a"), KEY)
+    buf = bytearray(len(signed) + 16)
+    buf[16:] = signed
+    view = memoryview(buf)[16:]
+    assert peek_src(view) == "radar-a"
+    assert bytes(f.check(view, ADDR)) == signed[:-TAG_SIZE]
+
+
+def test_hmac_without_key_for_source_rejects():
+    f = PreFilter(hmac_keys={"10.9.9.9": KEY})
+    assert f.check(sign(track_pkt(), KEY), ADDR) is None
+
+
+def test_rate_limited_log_suppresses_and_reports(caplog):
+    now = [0.0]
+    rl = RateLimitedLog(
+        logging.getLogger("test.ratelog"), burst=2, clock=lambda: now[0]
+    )
+    with caplog.at_level(logging.ERROR, logger="test.ratelog"):
+        logged = [rl.error("bad", "bad packet %d", i) for i in range(10)]
+        assert logged == [True, True] + [False] * 8
+        assert rl.suppressed("bad") == 8
+        now[0] = 1.5
+        assert rl.error("bad", "bad packet %d", 10)
+    messages = [r.getMessage() for r in caplog.records]
+    assert messages == [
+        "bad packet 0",
+        "bad packet 1",
+        "bad packet 10 (8 similar suppressed)",
+    ]
+
+
+def test_parse_helpers():
+    assert parse_cidrs("10.0.0.0/8, 192.168.1.5") == ("10.0.0.0/8", "192.168.1.5")
+    assert parse_cidrs("") is None
+    with pytest.raises(ValueError):
+        parse_cidrs("10.0.0.0/33")
+    assert parse_keys("radar-a=0011, *=ff") == {"radar-a": b"\x00\x11", "*": b"\xff"}
+    with pytest.raises(ValueError):
+        parse_keys("radar-a=xyz")
+
+
+def test_ingest_drops_rejected_before_parse(caplog):
+    received = []
+    ingest = UdpIngest(received.append, records=True, prefilter=PreFilter())
+    errors = PARSE_ERRORS_TOTAL.get()
+    with caplog.at_level(logging.ERROR, logger="ingest"):
+        for _ in range(1000):
+            ingest.datagram_received(b"\xff\xfe flood", ADDR)
+    ingest._handle(track_pkt(), ADDR)
+    assert len(received) == 1
+    assert PARSE_ERRORS_TOTAL.get() == errors  # never reached the parser
+    assert len(caplog.records) < 10  # and did not log every packet
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["asyncio", "threaded"])
+async def test_signed_ingest_end_to_end(backend):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    addr = sock.getsockname()
+    received = []
+    task = asyncio.create_task(
+        run_udp_ingest(
+            lambda m: received.append(m.payload.id),
+            records=True,
+            backend=backend,
+            sock=sock,
+            prefilter=PreFilter(allow=["127.0.0.0/8"], hmac_keys={"*": KEY}),
+        )
+    )
+    await asyncio.sleep(0.05)
+    before = rejected("hmac")
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for i in range(20):
+        sender.sendto(sign(track_pkt(i), KEY), addr)
+        sender.sendto(track_pkt(1000 + i), addr)  # unsigned: rejected
+    sender.close()
+    deadline = asyncio.get_running_loop().time() + 2
+    while len(received) < 20 or rejected("hmac") - before < 20:
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert sorted(received) == list(range(20))
@@ -0,0 +1,132 @@
+"""
+Unit tests for common.records (slotted TrackRecord used on the hot path).
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from adapter.parser import parse_packet
+from common.models import Track
+from common.records import TrackRecord, datetime_to_ns, ns_to_datetime, to_ns
+
+VALID = {
+    "ts": "2025-11-13T22:15:04.123456Z",
+    "id": 137,
+    "range_m": 5230.4,
+    "az_deg": -12.7,
+    "el_deg": 7.9,
+    "vr_mps": -18.4,
+    "snr_db": 26.3,
+}
+
+
+class TestTimestamps:
+    def test_rfc3339_to_ns(self):
+        expected = datetime(2025, 11, 13, 22, 15, 4, 123456, tzinfo=timezone.utc)
+        assert to_ns(VALID["ts"]) == datetime_to_ns(expected)
+        assert to_ns("2025-11-13T23:15:04.123456+01:00") == to_ns(VALID["ts"])
+
+    def test_epoch_ns_passthrough(self):
+        assert to_ns(1_700_000_000_123_456_789) == 1_700_000_000_123_456_789
+
+    def test_round_trip_is_exact_to_the_microsecond(self):
+        dt = datetime(2031, 1, 2, 3, 4, 5, 999999, tzinfo=timezone.utc)
+        assert ns_to_datetime(datetime_to_ns(dt)) == dt
+        assert (
+            datetime_to_ns(dt - timedelta(microseconds=1)) == datetime_to_ns(dt) - 1000
+        )
+
+    def test_rejects_other_types(self):
+        for ts in (True, None, "not a time", [1]):
+            with pytest.raises(ValueError, match="ts"):
+                to_ns(ts)  # type: ignore[arg-type]
+
+
+class TestTrackRecord:
+    def test_from_dict_matches_model(self):
+        record = TrackRecord.from_dict(VALID)
+        model = Track(**VALID)
+        assert record.id == model.id
+        assert record.range_m == model.range_m
+        assert record.ts == model.ts
+        assert record.model_dump(mode="json") == model.model_dump(mode="json")
+
+    def test_is_slotted(self):
+        record = TrackRecord.from_dict(VALID)
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.extra = 1  # type: ignore[attr-defined]
+
+    def test_model_round_trip(self):
+        model = Track(**VALID)
+        record = TrackRecord.from_model(model)
+        assert record.to_model() == model
+        assert TrackRecord.from_model(record.to_model()) == record
+
+    @pytest.mark.parametrize(
+        "field,value",
+        [
+            ("id", "7"),
+            ("id", "1.0"),
+            ("id", " 7.0 "),
+            ("id", "1_000"),
+            ("id", 7.0),
+            ("range_m", 100),
+            ("range_m", " 1e3 "),
+            ("az_deg", "1.5"),
+            ("snr_db", "-3.5"),
+            ("ts", 1763072104.5),  # epoch seconds, as pydantic reads a float
+            ("ts", "1763072104"),
+            ("ts", 1763072104123.0),  # ... and milliseconds past 2e10
+        ],
+    )
+    def test_lenient_inputs_like_pydantic(self, field, value):
+        packet = {**VALID, field: value, "extra": "ignored"}
+        record, model = TrackRecord.from_dict(packet), Track(**packet)
+        assert record.model_dump(mode="json") == model.model_dump(mode="json")
+
+    @pytest.mark.parametrize(
+        "field,value",
+        [
+            ("id", -1),
+            ("id", 1.5),
+            ("id", "x"),
+            ("range_m", -0.1),
+            ("range_m", 30000.1),
+            ("range_m", float("nan")),
+            ("az_deg", 180.5),
+            ("az_deg", -180.5),
+            ("el_deg", 90.5),
+            ("el_deg", -10.5),
+            ("snr_db", "loud"),
+            ("vr_mps", None),
+            ("ts", "not a time"),
+        ],
+    )
+    def test_constraints_match_track(self, field, value):
+        bad = {**VALID, field: value}
+        with pytest.raises(ValidationError):
+            Track(**bad)
+        with pytest.raises(ValueError, match=field):
+            TrackRecord.from_dict(bad)
+
+    def test_missing_field(self):
+        bad = {k: v for k, v in VALID.items() if k != "snr_db"}
+        with pytest.raises(ValueError, match="snr_db"):
+            TrackRecord.from_dict(bad)
+
+
+def test_parse_packet_records_mode():
+    frame = json.dumps({"tracks": [VALID, {**VALID, "id": 138}]}).encode()
+    parsed = parse_packet(frame, records=True)
+    assert parsed.kind == "frame"
+    assert [type(t) for t in parsed.payload["tracks"]] == [TrackRecord] * 2
+
+    parsed = parse_packet(json.dumps(VALID).encode(), records=True)
+    assert isinstance(parsed.payload, TrackRecord)
+
+    with pytest.raises(ValueError):
+        parse_packet(json.dumps({**VALID, "el_deg": 95}).encode(), records=True)
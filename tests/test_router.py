@@ -0,0 +1,225 @@
+"""
+Tests for the track-id consistent-hash router and binary batch ingest.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from adapter.parser import parse_packet
+from adapter.peek import FRAME, classify
+from adapter.prefilter import PreFilter
+from common.codec import binary_ids, decode_tracks, encode_tracks
+from common.records import TrackRecord
+from tools.router import (
+    ROUTER_DATAGRAMS_OUT_TOTAL,
+    ROUTER_DROPPED_TOTAL,
+    ROUTER_FRAMES_SPLIT_TOTAL,
+    ROUTER_TRACKS_OUT_TOTAL,
+    HashRing,
+    UdpRouter,
+    parse_nodes,
+    start_router,
+)
+
+NODES = [("10.0.0.1", 9999), ("10.0.0.2", 9999), ("10.0.0.3", 9999)]
+
+
+def rec(i: int) -> TrackRecord:
+    return TrackRecord(1_700_000_000_000_000_000 + i, i, 100.0 + i, 1.0, 2.0, 3.0, 20.0)
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(NODES)
+    again = HashRing(reversed(NODES))
+    owners = [ring.owner(i) for i in range(30_000)]
+    assert owners == [again.owner(i) for i in range(30_000)]
+    for node in NODES:
+        assert 0.25 < owners.count(node) / len(owners) < 0.42
+
+
+def test_adding_a_node_moves_only_its_share():
+    ring = HashRing(NODES)
+    before = [ring.owner(i) for i in range(30_000)]
+    new = ("10.0.0.4", 9999)
+    ring.add(new)
+    after = [ring.owner(i) for i in range(30_000)]
+    moved = [(a, b) for a, b in zip(before, after) if a != b]
+    assert all(b == new for _, b in moved)
+    assert 0.18 < len(moved) / len(before) < 0.32  # about 1/4
+    ring.remove(new)
+    assert [ring.owner(i) for i in range(30_000)] == before
+
+
+def test_empty_ring_has_no_owner():
+    with pytest.raises(LookupError):
+        HashRing().owner(1)
+
+
+def test_node_churn_does_not_grow_metric_series():
+    def series(counter):
+        (family,) = counter.collect()
+        return {s.labels["node"] for s in family.samples if "churn" in s.labels["node"]}
+
+    router = UdpRouter(HashRing([("churn", 1)]))
+    for port in range(2, 50):
+        router.set_nodes([("churn", port - 1), ("churn", port)])
+    expected = {"churn:48", "churn:49"}
+    assert series(ROUTER_DATAGRAMS_OUT_TOTAL) == expected
+    assert series(ROUTER_TRACKS_OUT_TOTAL) == expected
+
+
+def test_parse_nodes():
+    lines = ["# ingest nodes", "10.0.0.1:9999", "", "[::1]:9998  # local"]
+    assert parse_nodes(lines) == [("10.0.0.1", 9999), ("::1", 9998)]
+    with pytest.raises(ValueError):
+        parse_nodes(["10.0.0.1"])
+
+
+def test_binary_batch_is_an_ingest_frame():
+    body = encode_tracks([rec(1), rec(2)], "binary")
+    assert classify(body) == FRAME
+    assert binary_ids(body) == [1, 2]
+    msg = parse_packet(body, records=True)
+    assert msg.kind == "frame"
+    assert [t.ts_ns for t in msg.payload["tracks"]] == [rec(1).ts_ns, rec(2).ts_ns]
+    models = parse_packet(body).payload["tracks"]
+    assert [t.range_m for t in models] == [101.0, 102.0]
+
+
+def test_binary_batch_values_are_validated():
+    body = encode_tracks([TrackRecord(1, 1, 99_999.0, 0.0, 0.0, 0.0, 0.0)], "binary")
+    with pytest.raises(ValueError):
+        parse_packet(body, records=True)
+    assert parse_packet(body, records=True, validation="structural").kind == "frame"
+    with pytest.raises(ValueError):
+        parse_packet(body[:-1], records=True)
+
+
+def test_prefilter_admits_binary_batches():
+    pf = PreFilter()
+    body = encode_tracks([rec(1)], "binary")
+    assert pf.check(body, ("127.0.0.1", 1)) == body
+    assert pf.check(b"RX" + body[2:], ("127.0.0.1", 1)) is None
+
+
+class _Node(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.datagrams = []
+
+    def datagram_received(self, data, addr):
+        self.datagrams.append(data)
+
+    def ids(self):
+        out = []
+        for data in self.datagrams:
+            if b'"radar_mode"' in data:
+                continue
+            if data.startswith(b'{"ts"'):
+                out.append(json.loads(data)["id"])
+            else:
+                out += [t.id for t in decode_tracks(data)]
+        return out
+
+
+async def _nodes(n):
+    loop = asyncio.get_running_loop()
+    out = []
+    for _ in range(n):
+        transport, proto = await loop.create_datagram_endpoint(
+            _Node, local_addr=("127.0.0.1", 0)
+        )
+        out.append((transport.get_extra_info("sockname")[:2], transport, proto))
+    return out
+
+
+async def _settle(protos, expected, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while sum(len(p.datagrams) for p in protos) < expected:
+        assert loop.time() < deadline, "router did not relay every datagram"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_router_splits_frames_by_owner():
+    nodes = await _nodes(3)
+    addrs = [a for a, _, _ in nodes]
+    protos = {a: p for a, _, p in nodes}
+    transport, router = await start_router(("127.0.0.1", 0), addrs)
+    listen = transport.get_extra_info("sockname")[:2]
+    loop = asyncio.get_running_loop()
+    sender, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, remote_addr=listen
+    )
+    split_before = ROUTER_FRAMES_SPLIT_TOTAL.get()
+    try:
+        tracks = [rec(i) for i in range(40)]
+        json_frame = json.loads(encode_tracks(tracks, "json"))
+        json_frame.update(src="radar-a", seq=7)
+        sender.sendto(json.dumps(json_frame).encode())
+        sender.sendto(encode_tracks(tracks, "binary"))
+        single = json.dumps(json_frame["tracks"][5]).encode()
+        sender.sendto(single)
+        sender.sendto(b'{"radar_mode": "tracking", "ts": "2025-01-01T00:00:00Z"}')
+        # two frames split over 3 nodes, one single track, one health per node
+        await _settle(protos.values(), 3 + 3 + 1 + 3)
+
+        owner = router.ring.owner
+        for addr, proto in protos.items():
+            ids = proto.ids()
+            assert ids and all(owner(i) == addr for i in ids)
+            assert sum(b'"radar_mode"' in d for d in proto.datagrams) == 1
+            for data in proto.datagrams:
+                if data.startswith(b'{"tracks"'):
+                    obj = json.loads(data)
+                    assert (obj["src"], obj["seq"]) == ("radar-a", 7)
+        received = sorted(i for p in protos.values() for i in p.ids())
+        assert received == sorted(list(range(40)) * 2 + [5])
+        assert ROUTER_FRAMES_SPLIT_TOTAL.get() - split_before == 2
+    finally:
+        sender.close()
+        transport.close()
+        for _, t, _ in nodes:
+            t.close()
+
+
+@pytest.mark.asyncio
+async def test_router_keeps_single_owner_frames_intact_and_drops_junk():
+    nodes = await _nodes(2)
+    addrs = [a for a, _, _ in nodes]
+    protos = [p for _, _, p in nodes]
+    transport, router = await start_router(("127.0.0.1", 0), addrs)
+    listen = transport.get_extra_info("sockname")[:2]
+    loop = asyncio.get_running_loop()
+    sender, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, remote_addr=listen
+    )
+    unroutable = ROUTER_DROPPED_TOTAL.get(reason="unroutable")
+    invalid = ROUTER_DROPPED_TOTAL.get(reason="invalid")
+    try:
+        target = router.ring.owner(0)
+        same = [i for i in range(200) if router.ring.owner(i) == target][:5]
+        body = encode_tracks([rec(i) for i in same], "binary")
+        sender.sendto(body)
+        sender.sendto(b'{"range_m": 1.0}')  # no id
+        sender.sendto(b'{"tracks": [}')  # not JSON
+        sender.sendto(body[:-3])  # truncated binary batch
+        await _settle(protos, 1)
+        await asyncio.sleep(0.05)
+        assert [d for p in protos for d in p.datagrams] == [body]
+        assert ROUTER_DROPPED_TOTAL.get(reason="unroutable") - unroutable == 1
+        assert ROUTER_DROPPED_TOTAL.get(reason="invalid") - invalid == 2
+
+        router.set_nodes(addrs[:1])
+        sender.sendto(encode_tracks([rec(i) for i in range(10)], "binary"))
+        await _settle(protos, 2)
+        assert protos[0].datagrams[-1] == encode_tracks(
+            [rec(i) for i in range(10)], "binary"
+        )
+    finally:
+        sender.close()
+        transport.close()
+        for _, t, _ in nodes:
+            t.close()
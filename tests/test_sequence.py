@@ -0,0 +1,189 @@
+"""
+Tests for per-source sequence tracking (dedup, reorder buffer, loss accounting).
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from adapter.ingest import UdpIngest
+from adapter.sequence import SEQ_EVENTS_TOTAL, SequenceTracker, peek_seq, peek_src
+from tests.packets import track_pkt
+
+_counter = iter(range(1 << 30))
+
+
+class Recorder:
+    def __init__(self):
+        self.seqs = []
+
+    def __call__(self, data, addr):
+        self.seqs.append(int(data))
+
+
+def new_tracker(**kwargs):
+    """Tracker plus a unique source name so metric cells start at zero."""
+    rec = Recorder()
+    return SequenceTracker(rec, **kwargs), rec, f"test-{next(_counter)}"
+
+
+def events(source):
+    return {
+        e: SEQ_EVENTS_TOTAL.get(source=source, event=e)
+        for e in ("duplicate", "reordered", "gap", "lost", "late", "reset")
+    }
+
+
+def push_all(tracker, source, seqs, now=0.0):
+    for s in seqs:
+        tracker.push(source, s, str(s).encode(), None, now)
+
+
+def test_peek_seq_and_src():
+    assert peek_seq(b'{"seq": 42, "id": 1}') == 42
+    assert peek_seq(b'{"id": 1}') is None
+    assert peek_src(b'{"src": "radar-b", "seq": 1}') == "radar-b"
+    assert peek_src(b'{"seq": 1}') is None
+
+
+def test_in_order_passes_straight_through():
+    tracker, rec, src = new_tracker()
+    push_all(tracker, src, range(100, 110))
+    assert rec.seqs == list(range(100, 110))
+    assert tracker.held == 0
+    assert not any(events(src).values())
+
+
+def test_duplicates_dropped():
+    tracker, rec, src = new_tracker()
+    push_all(tracker, src, [1, 2, 3, 2, 3, 1, 4, 6, 6])
+    assert rec.seqs == [1, 2, 3, 4]
+    assert events(src)["duplicate"] == 4
+
+
+def test_reordering_within_window():
+    tracker, rec, src = new_tracker()
+    push_all(tracker, src, [1, 3, 4, 2, 5])
+    assert rec.seqs == [1, 2, 3, 4, 5]
+    ev = events(src)
+    assert ev["reordered"] == 1
+    assert ev["lost"] == 0
+
+
+def test_gap_released_after_max_delay():
+    tracker, rec, src = new_tracker(max_delay_s=0.05)
+    tracker.push(src, 1, b"1", None, 0.0)
+    tracker.push(src, 3, b"3", None, 0.01)
+    tracker.push(src, 4, b"4", None, 0.02)
+    assert rec.seqs == [1]
+
+    tracker.expire(0.04)
+    assert rec.seqs == [1]
+    tracker.expire(0.07)
+    assert rec.seqs == [1, 3, 4]
+    ev = events(src)
+    assert (ev["gap"], ev["lost"]) == (1, 1)
+
+    # The lost packet finally turns up: too late to deliver
+    tracker.push(src, 2, b"2", None, 0.08)
+    assert rec.seqs == [1, 3, 4]
+    assert events(src)["late"] == 1
+
+
+def test_gap_released_when_window_full():
+    tracker, rec, src = new_tracker(window=4)
+    push_all(tracker, src, [1, 3, 4, 5])
+    assert rec.seqs == [1]
+    tracker.push(src, 6, b"6", None, 0.0)  # needs room: give up on 2
+    assert rec.seqs == [1, 3, 4, 5, 6]
+    assert events(src)["lost"] == 1
+
+
+def test_large_jump_counts_every_missing_packet():
+    tracker, rec, src = new_tracker(window=8, max_delay_s=0.05)
+    push_all(tracker, src, [1, 1001])
+    tracker.expire(1.0)
+    assert rec.seqs == [1, 1001]
+    assert events(src)["lost"] == 999
+
+
+def test_sender_restart_resets_window():
+    tracker, rec, src = new_tracker()
+    push_all(tracker, src, [5000, 5001, 1, 2])
+    assert rec.seqs == [5000, 5001, 1, 2]
+    assert events(src)["reset"] == 1
+
+
+def test_sources_are_independent():
+    tracker, rec, src = new_tracker()
+    other = src + "-b"
+    push_all(tracker, src, [1, 2])
+    push_all(tracker, other, [1, 2])
+    assert rec.seqs == [1, 2, 1, 2]
+    assert events(src)["duplicate"] == 0
+
+
+def test_many_sources_bounded():
+    tracker, rec, src = new_tracker(max_sources=300)
+    for i in range(400):
+        push_all(tracker, f"{src}-{i}", [1, 1])
+    assert len(tracker.sources) == 300
+    # Untracked sources pass through without dedup
+    assert len(rec.seqs) == 300 + 2 * 100
+
+
+@pytest.mark.asyncio
+async def test_ingest_dedups_and_reorders():
+    received = []
+    tracker = SequenceTracker(max_delay_s=0.05)
+    ingest = UdpIngest(received.append, sequencer=tracker)
+    addr = ("10.9.8.7", next(_counter) % 60000 + 1)
+
+    for seq in (1, 3, 2, 2, 4, 6):
+        ingest.datagram_received(track_pkt(seq, seq=seq), addr)
+    await asyncio.sleep(0.15)  # reorder timeout for the hole at 5
+
+    assert [m.payload.id for m in received] == [1, 2, 3, 4, 6]
+    source = f"{addr[0]}:{addr[1]}"
+    assert SEQ_EVENTS_TOTAL.get(source=source, event="duplicate") == 1
+    assert SEQ_EVENTS_TOTAL.get(source=source, event="lost") == 1
+
+
+def test_idle_sources_are_forgotten_with_their_metrics():
+    tracker, rec, src = new_tracker(max_sources=2, idle_ttl_s=10.0)
+    other = f"{src}-b"
+    push_all(tracker, src, [1, 2, 4], now=0.0)  # one gap: a metric child exists
+    tracker.expire(1.0)
+    push_all(tracker, other, [1], now=1.0)
+    assert events(src)["gap"] == 1
+    addr = ("10.0.0.7", 40001)
+    assert tracker.source_for(b'{"seq": 1}', addr) == "10.0.0.7:40001"
+
+    # Both slots are taken: a third source passes through unsequenced
+    push_all(tracker, "new-source", [5, 5], now=2.0)
+    assert rec.seqs[-2:] == [5, 5]
+
+    # `src` goes quiet; `other` keeps sending
+    push_all(tracker, other, [2], now=9.0)
+    push_all(tracker, "new-source", [7, 7], now=12.0)
+    assert set(tracker.sources) == {other, "new-source"}
+    assert rec.seqs[-1] == 7  # tracked now: the duplicate was dropped
+    labels = {
+        s.labels["source"] for s in next(iter(SEQ_EVENTS_TOTAL.collect())).samples
+    }
+    assert src not in labels and other in labels
+    assert addr not in tracker._addr_names
+
+
+def test_only_held_packets_are_copied():
+    out = []
+    tracker = SequenceTracker(lambda data, addr: out.append(data))
+    src = f"test-{next(_counter)}"
+    buf = bytearray(b"1234")
+    views = [memoryview(buf)[i : i + 1] for i in range(4)]
+    for seq in (1, 3, 2, 4):
+        tracker.push(src, seq, views[seq - 1], None, 0.0)
+    assert out[0] is views[0] and out[1] is views[1] and out[3] is views[3]
+    assert type(out[2]) is bytes and out[2] == b"3"  # held past the gap: copied
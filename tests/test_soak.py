@@ -0,0 +1,105 @@
+"""
+Tests for the soak harness's trend fitting, app configuration and a short run.
+"""
+
+import argparse
+import multiprocessing
+
+import pytest
+
+import app
+from tools.soak import Sample, evaluate, slope, soak, soak_config
+
+LIMITS = {
+    "max_rss_mb_per_h": 20.0,
+    "max_tasks_per_h": 1000.0,
+    "max_series_per_h": 100.0,
+    "max_p99_ms_per_h": 5.0,
+}
+
+
+def samples(rss_per_h=0.0, p99_per_h=0.0, n=13, step_s=300.0):
+    out = []
+    for i in range(n):
+        t = i * step_s
+        h = t / 3600.0
+        noise = 0.5 if i % 2 else -0.5
+        out.append(
+            Sample(
+                t_s=t,
+                rss_mb=100.0 + rss_per_h * h + noise,
+                traced_mb=0.0,
+                tasks=6,
+                series=136,
+                rate=5000.0,
+                lag_p99_ms=1.0,
+                lat_p99_ms=2.0 + p99_per_h * h,
+            )
+        )
+    return out
+
+
+def test_slope():
+    assert slope([0, 1, 2, 3], [1, 3, 5, 7]) == pytest.approx(2.0)
+    assert slope([0, 1, 2], [4, 4, 4]) == 0.0
+    assert slope([1], [5]) == slope([2, 2], [1, 3]) == 0.0
+
+
+def test_flat_run_passes():
+    assert all(ok for *_, ok in evaluate(samples(), 0.0, LIMITS))
+
+
+def test_leak_and_latency_drift_fail():
+    trends = {
+        f: (per_h, ok)
+        for f, per_h, _, ok in evaluate(
+            samples(rss_per_h=50.0, p99_per_h=12.0), 0.0, LIMITS
+        )
+    }
+    assert trends["rss_mb"][0] == pytest.approx(50.0, rel=0.05)
+    assert not trends["rss_mb"][1] and not trends["lat_p99_ms"][1]
+    assert trends["tasks"] == (0.0, True)
+
+
+def test_warmup_growth_is_not_a_leak():
+    run = samples()
+    warm = [s._replace(rss_mb=s.rss_mb - 60.0) for s in run[:2]] + run[2:]
+    assert not dict((f, ok) for f, _, _, ok in evaluate(warm, 0.0, LIMITS))["rss_mb"]
+    assert all(ok for *_, ok in evaluate(warm, 600.0, LIMITS))
+
+
+def test_accel_scales_app_timers_and_picks_a_port():
+    args = argparse.Namespace(config=None, set=["tracks.ttl_s=20"], accel=10.0)
+    overrides, cfg = soak_config(args)
+    assert cfg.tracks.ttl_s == pytest.approx(2.0)
+    assert cfg.tracks.snapshot_interval_s == pytest.approx(0.05)
+    assert cfg.log.error_interval_s == pytest.approx(0.1)
+    assert cfg.http.port == 0 and cfg.ingest.port != 9999
+    assert cfg.log.level == "WARNING"
+    assert overrides[-3:] == [
+        "tracks.ttl_s=2.0",
+        "tracks.snapshot_interval_s=0.05",
+        "log.error_interval_s=0.1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_short_soak_samples_under_load_and_restores_the_app():
+    args = argparse.Namespace(
+        duration=1.5,
+        interval=0.5,
+        pps=200.0,
+        warmup=0.0,
+        accel=10.0,
+        tracemalloc_frames=0,
+        top=5,
+        config=None,
+        set=[],
+    )
+    handle, saved = app.handle, (app.ARGS, app.CONFIG)
+    run, growers = await soak(args)
+    assert len(run) == 3 and run[-1].t_s >= args.duration
+    assert all(s.rate > 0 for s in run)  # the simulator ran to the last sample
+    assert growers == [] and all(s.traced_mb == 0.0 for s in run)
+    assert app.handle is handle and (app.ARGS, app.CONFIG) == saved
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,79 @@
+"""
+Tests for RFC 3339 / epoch-ns timestamp decoding.
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from adapter.parser import parse_packet
+from common.timestamps import datetime_to_ns, parse_rfc3339, rfc3339_to_ns
+
+
+def reference(ts: str) -> int:
+    return datetime_to_ns(parse_rfc3339(ts))
+
+
+@pytest.mark.parametrize(
+    "ts",
+    [
+        "2025-11-13T22:15:04Z",
+        "2025-11-13T22:15:04.123456Z",
+        "2025-11-13T22:15:04.1Z",
+        "2025-11-13t22:15:04.5z",
+        "2025-11-13 22:15:04.250+00:00",
+        "2025-11-13T22:15:04.123456+05:30",
+        "2025-11-13T02:15:04.123456-08:00",
+        "2025-11-13T22:15:04",
+        "2024-02-29T23:59:59.999999Z",
+        "1970-01-01T00:00:00Z",
+    ],
+)
+def test_matches_fromisoformat(ts):
+    assert rfc3339_to_ns(ts) == reference(ts)
+    assert rfc3339_to_ns(ts) == reference(ts)  # again: the last-string memo
+
+
+def test_repeated_string_hits_memo_and_stays_correct():
+    a = "2025-11-13T22:15:04.100000Z"
+    b = "2025-11-13T22:15:04.200000Z"
+    for ts in (a, a, b, a, b, b):
+        assert rfc3339_to_ns(ts) == reference(ts)
+
+
+@pytest.mark.parametrize(
+    "ts",
+    [
+        "2025-11-13T22:15:60Z",
+        "2025-11-13T22:61:00Z",
+        "2025-02-30T22:15:04Z",
+        "2025-11-13T25:15:04Z",
+        "2025-11-13T22:15:04.12aZ",
+        "2025-11-13T22:15:04+24:00",
+        "2025-11-13T22: 5:04Z",
+        "yesterday at noon",
+        "",
+    ],
+)
+def test_rejects_invalid(ts):
+    with pytest.raises(ValueError, match="ts"):
+        rfc3339_to_ns(ts)
+
+
+@pytest.mark.parametrize("records", [False, True])
+def test_parse_packet_accepts_epoch_ns(records):
+    dt = datetime(2025, 11, 13, 22, 15, 4, 123456, tzinfo=timezone.utc)
+    obj = {
+        "ts": datetime_to_ns(dt),
+        "id": 3,
+        "range_m": 10.0,
+        "az_deg": 0.0,
+        "el_deg": 0.0,
+        "vr_mps": 0.0,
+        "snr_db": 5.0,
+    }
+    msg = parse_packet(json.dumps(obj).encode(), records=records)
+    assert msg.payload.ts == dt
+    frame = parse_packet(json.dumps({"tracks": [obj, obj]}).encode(), records=records)
+    assert [t.ts for t in frame.payload["tracks"]] == [dt, dt]
@@ -0,0 +1,139 @@
+"""
+Tests for streaming track statistics.
+"""
+
+import math
+import random
+
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+
+from adapter.parser import parse_packet
+from common.records import TrackRecord
+from common.track_stats import TrackStats, WindowedSketch
+from common.track_table import TrackTable
+
+
+def rec(i: int, range_m=1000.0, az=0.0, snr=20.0, vr=0.0) -> TrackRecord:
+    return TrackRecord(1_000, i, range_m, az, 1.0, vr, snr)
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def test_sketch_quantiles_within_resolution():
+    rng = random.Random(1)
+    values = [rng.uniform(0, 30000) for _ in range(20000)]
+    sketch = WindowedSketch(0.0, 30000.0, 25.0)
+    sketch.add_many(values, now=0.0)
+    for q, got in zip((0.5, 0.9, 0.99), sketch.quantiles((0.5, 0.9, 0.99))):
+        assert abs(got - exact_quantile(values, q)) <= 25.0
+
+
+def test_sketch_clamps_and_empty():
+    sketch = WindowedSketch(-20.0, 80.0, 0.25)
+    assert all(math.isnan(v) for v in sketch.quantiles((0.5,)))
+    sketch.add_many([-500.0, 500.0], now=0.0)
+    lo, hi = sketch.quantiles((0.0, 1.0))
+    assert -20.0 <= lo < -19.5 and 79.5 < hi <= 80.0
+
+
+def test_sketch_window_forgets_old_slices():
+    sketch = WindowedSketch(0.0, 100.0, 1.0, window_s=60.0, slices=6)
+    sketch.add_many([10.0] * 100, now=0.0)
+    sketch.add_many([90.0] * 100, now=35.0)
+    assert sketch.count() == 200
+    sketch.rotate(61.0)  # the first slice has left the window
+    assert sketch.count() == 100
+    assert sketch.quantiles((0.5,))[0] == pytest.approx(90.5, abs=0.5)
+    sketch.rotate(1000.0)
+    assert sketch.count() == 0
+
+
+def test_flush_bins_pending_batch():
+    stats = TrackStats(registry=None, batch_max=1000)
+    for i in range(10):
+        stats.add(rec(i, range_m=2000.0 + i, snr=15.0, vr=-30.0))
+    assert stats.range_sketch.count() == 0  # queued, not yet binned
+    assert stats.flush() == 10
+    assert stats.range_sketch.count() == 10
+    assert stats.flush() == 0
+
+    stats.add_many([rec(i) for i in range(1000)])  # hits batch_max
+    assert stats.range_sketch.count() == 1010
+
+
+def test_non_finite_snr_and_velocity_are_skipped():
+    registry = CollectorRegistry()
+    stats = TrackStats(registry=registry, batch_max=3)
+    packet = (
+        b'{"ts": 1000, "id": 1, "range_m": 1000.0, "az_deg": 0.0, "el_deg": 1.0,'
+        b' "vr_mps": %s, "snr_db": %s}'
+    )
+    for vr, snr in ((b"0.0", b"NaN"), (b"Infinity", b"-Infinity"), (b"NaN", b"20.0")):
+        stats.add(parse_packet(packet % (vr, snr), records=True).payload)
+    # batch_max reached in add(): binned without raising
+    assert stats.range_sketch.count() == 3
+    assert stats.snr_sketch.count() == 1
+    assert stats.snr_sketch.quantiles((0.5,))[0] == pytest.approx(20.0, abs=0.25)
+    for hist in (stats.snr_hist, stats.vr_hist):
+        (family,) = hist.collect()
+        assert all(math.isfinite(s.value) for s in family.samples)
+        assert family.samples[-1].labels == {"le": "+Inf"}
+        assert family.samples[-1].value == 1
+
+
+def test_sector_counts_from_snapshot():
+    table = TrackTable()
+    for i, az in enumerate([-179.0, -10.0, -0.5, 0.0, 29.9, 179.9, 180.0]):
+        table.update(rec(i, az=az))
+    table.publish()
+    stats = TrackStats(table, sectors=12, registry=None)
+    counts = stats.sector_counts()
+    assert len(counts) == 12
+    assert sum(counts) == 7
+    assert counts[0] == 1  # -180:-150
+    assert counts[5] == 2  # -30:0
+    assert counts[6] == 2  # 0:30
+    assert counts[11] == 2  # 150:180, including az=180
+
+
+def test_exported_series_are_fixed():
+    registry = CollectorRegistry()
+    table = TrackTable()
+    stats = TrackStats(table, registry=registry)
+
+    def series():
+        return [
+            line.split(" ")[0]
+            for line in generate_latest(registry).decode().splitlines()
+            if line and not line.startswith("#")
+        ]
+
+    before = series()
+    rng = random.Random(2)
+    for i in range(5000):
+        t = rec(
+            i,
+            range_m=rng.uniform(0, 30000),
+            az=rng.uniform(-180, 180),
+            snr=rng.uniform(-30, 90),
+            vr=rng.uniform(-200, 200),
+        )
+        stats.add(t)
+        table.update(t)
+    stats.flush()
+    table.publish()
+    after = series()
+    assert after == before
+    text = generate_latest(registry).decode()
+    assert "radar_track_range_m_count 5000.0" in text
+    assert 'radar_active_tracks_by_sector{sector="0:30"}' in text
+    assert 'radar_track_snr_quantile_db{quantile="0.99"}' in text
+
+
+def test_sectors_must_divide_circle():
+    with pytest.raises(ValueError):
+        TrackStats(sectors=7, registry=None)
@@ -0,0 +1,157 @@
+"""
+Tests for the active track table and the /tracks query API.
+"""
+
+import json
+import urllib.request
+from datetime import datetime, timezone
+
+import pytest
+
+from api.server import start_http_server
+from api.tracks import TrackQuery, TrackQueryApp, run_query
+from common.models import Track
+from common.track_table import TrackTable
+
+
+def make_track(track_id: int, range_m: float, az_deg: float, snr_db: float) -> Track:
+    return Track(
+        ts=datetime.now(timezone.utc),
+        id=track_id,
+        range_m=range_m,
+        az_deg=az_deg,
+        el_deg=2.0,
+        vr_mps=-1.0,
+        snr_db=snr_db,
+    )
+
+
+def call(app, path: str, qs: str = "", **headers):
+    """Invoke a WSGI app and return (status, headers, body)."""
+    captured = {}
+
+    def start_response(status, response_headers):
+        captured["status"] = status
+        captured["headers"] = dict(response_headers)
+
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": qs}
+    environ.update({f"HTTP_{k.upper()}": v for k, v in headers.items()})
+    body = b"".join(app(environ, start_response))
+    return captured["status"], captured["headers"], body
+
+
+@pytest.fixture
+def table() -> TrackTable:
+    table = TrackTable(ttl_s=5.0)
+    table.publish(now=100.0)  # pin the table clock for expiry tests
+    table.update(make_track(1, 1000.0, 0.0, 25.0))
+    table.update(make_track(2, 4000.0, -8.0, 15.0))
+    table.update(make_track(3, 9000.0, 5.0, 30.0))
+    table.update(make_track(4, 2000.0, 45.0, 35.0))
+    table.publish(now=100.0)
+    return table
+
+
+class TestTrackTable:
+    def test_updates_are_invisible_until_published(self):
+        table = TrackTable()
+        table.update(make_track(1, 100.0, 0.0, 20.0))
+        assert table.snapshot.version == 0
+        assert table.snapshot.tracks == ()
+
+        snap = table.publish()
+        assert snap.version == 1
+        assert [t.id for t in snap.tracks] == [1]
+
+    def test_publish_without_changes_keeps_version(self, table):
+        v = table.snapshot.version
+        assert table.publish(now=101.0).version == v
+
+    def test_latest_update_wins(self, table):
+        table.update(make_track(1, 1500.0, 0.0, 25.0))
+        snap = table.publish(now=101.0)
+        assert snap.by_id[1].range_m == 1500.0
+
+    def test_stale_tracks_expire(self, table):
+        table.publish(now=101.0)
+        table.update(make_track(3, 9000.0, 5.0, 30.0))
+        snap = table.publish(now=104.0)
+        assert len(snap.tracks) == 4
+        snap = table.publish(now=106.0)
+        assert [t.id for t in snap.tracks] == [3]
+
+    def test_old_snapshot_is_unchanged_by_later_publish(self, table):
+        old = table.snapshot
+        table.update(make_track(5, 100.0, 0.0, 20.0))
+        table.publish(now=101.0)
+        assert 5 not in old.by_id
+        assert len(old.tracks) == 4
+
+
+class TestTrackQuery:
+    def test_bounding_box_and_snr(self, table):
+        q = TrackQuery.from_query_string(
+            "range_max=5000&az_min=-10&az_max=10&snr_min=20"
+        )
+        result = run_query(table.snapshot, q)
+        assert [t["id"] for t in result["tracks"]] == [1]
+
+    def test_ids_and_paging(self, table):
+        q = TrackQuery.from_query_string("id=4,2,3&limit=2&offset=1")
+        result = run_query(table.snapshot, q)
+        assert result["total"] == 3
+        assert [t["id"] for t in result["tracks"]] == [3, 4]
+
+    @pytest.mark.parametrize("qs", ["limit=0", "offset=-1", "snr_min=abc", "id=x"])
+    def test_malformed_parameters(self, qs):
+        with pytest.raises(ValueError):
+            TrackQuery.from_query_string(qs)
+
+
+class TestTrackQueryApp:
+    def test_list_and_single(self, table):
+        app = TrackQueryApp(table)
+        status, _, body = call(app, "/tracks", "snr_min=30")
+        assert status == "200 OK"
+        assert [t["id"] for t in json.loads(body)["tracks"]] == [3, 4]
+
+        status, _, body = call(app, "/tracks/2")
+        assert status == "200 OK"
+        assert json.loads(body)["track"]["id"] == 2
+
+        status, _, _ = call(app, "/tracks/99")
+        assert status == "404 Not Found"
+
+    def test_bad_request(self, table):
+        status, _, body = call(TrackQueryApp(table), "/tracks", "limit=5000")
+        assert status == "400 Bad Request"
+        assert "limit" in json.loads(body)["error"]
+
+    def test_etag_revalidation_per_snapshot_version(self, table):
+        app = TrackQueryApp(table)
+        _, headers, _ = call(app, "/tracks")
+        etag = headers["ETag"]
+
+        status, _, body = call(app, "/tracks", if_none_match=etag)
+        assert status == "304 Not Modified"
+        assert body == b""
+
+        table.update(make_track(5, 100.0, 0.0, 20.0))
+        table.publish(now=101.0)
+        status, headers, _ = call(app, "/tracks", if_none_match=etag)
+        assert status == "200 OK"
+        assert headers["ETag"] != etag
+
+    def test_served_next_to_metrics(self, table):
+        httpd, _ = start_http_server(
+            0, addr="127.0.0.1", routes={"/tracks": TrackQueryApp(table)}
+        )
+        try:
+            base = f"http://127.0.0.1:{httpd.server_port}"
+            with urllib.request.urlopen(f"{base}/tracks?id=1") as resp:
+                assert json.loads(resp.read())["tracks"][0]["id"] == 1
+            with urllib.request.urlopen(f"{base}/metrics") as resp:
+                assert resp.status == 200
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
@@ -0,0 +1,156 @@
+"""
+Tests for structural parsing and the per-source validation policy.
+"""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+from prometheus_client import REGISTRY
+
+from adapter.ingest import UdpIngest
+from adapter.parser import parse_packet
+from adapter.validation import (
+    FULL,
+    SAMPLED,
+    STRUCTURAL,
+    ValidationPolicy,
+    parse_sources,
+)
+from common.models import HealthStatus, Track
+from common.records import TrackRecord
+
+
+def track_obj(**overrides):
+    obj = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "id": 7,
+        "range_m": 1200.0,
+        "az_deg": 10.0,
+        "el_deg": 2.0,
+        "vr_mps": -1.0,
+        "snr_db": 22.0,
+    }
+    obj.update(overrides)
+    return obj
+
+
+def pkt(**overrides) -> bytes:
+    return json.dumps(track_obj(**overrides)).encode()
+
+
+def mode_metric(source: str, mode: str) -> float:
+    return REGISTRY.get_sample_value(
+        "radar_validation_mode", {"source": source, "radar_validation_mode": mode}
+    )
+
+
+@pytest.mark.parametrize("records", [False, True])
+def test_structural_parse_matches_full(records):
+    data = pkt(range_m=1200)
+    full = parse_packet(data, records=records)
+    structural = parse_packet(data, records=records, validation="structural")
+    assert type(structural.payload) is (TrackRecord if records else Track)
+    assert structural.payload.range_m == 1200.0
+    assert isinstance(structural.payload.range_m, float)
+    assert structural.payload.ts == full.payload.ts
+
+
+@pytest.mark.parametrize("records", [False, True])
+def test_structural_skips_ranges_but_checks_shape(records):
+    out_of_range = parse_packet(
+        pkt(range_m=99999.0), records=records, validation="structural"
+    )
+    assert out_of_range.payload.range_m == 99999.0
+    with pytest.raises(ValueError):
+        parse_packet(pkt(range_m=99999.0), records=records)
+
+    bad = track_obj()
+    del bad["az_deg"]
+    with pytest.raises(ValueError, match="az_deg"):
+        parse_packet(json.dumps(bad).encode(), records=records, validation="structural")
+    with pytest.raises(ValueError):
+        parse_packet(pkt(snr_db="loud"), records=records, validation="structural")
+
+
+def test_structural_health():
+    health = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "radar_mode": "OPERATIONAL",
+        "temperature_c": 40,
+        "supply_v": 12.0,
+        "cpu_load_pct": 10.0,
+    }
+    msg = parse_packet(json.dumps(health).encode(), validation="structural")
+    assert isinstance(msg.payload, HealthStatus)
+    assert msg.payload.temperature_c == 40.0
+    assert isinstance(msg.payload.ts, datetime)
+    with pytest.raises(ValueError, match="radar_mode"):
+        health["radar_mode"] = "PANIC"
+        parse_packet(json.dumps(health).encode(), validation="structural")
+
+
+def test_parse_packet_rejects_unknown_validation():
+    with pytest.raises(ValueError):
+        parse_packet(pkt(), validation="vibes")
+
+
+def test_sampled_validates_one_in_n():
+    policy = ValidationPolicy(SAMPLED, sample_one_in=4)
+    modes = [policy.validation_for("s-sampled") for _ in range(12)]
+    assert modes.count("full") == 3
+    assert modes[0] == "full"  # first packet of a new source is checked
+
+
+def test_modes_per_source_and_metric():
+    policy = ValidationPolicy(FULL, sources={"trusted-1": STRUCTURAL})
+    assert policy.validation_for("trusted-1") == "structural"
+    assert policy.validation_for("other-1") == "full"
+    assert mode_metric("trusted-1", STRUCTURAL) == 1.0
+    assert mode_metric("other-1", FULL) == 1.0
+
+
+def test_failure_promotes_to_full_until_reconfigured():
+    policy = ValidationPolicy(SAMPLED, sample_one_in=8)
+    policy.validation_for("flaky-1")
+    policy.failed("flaky-1")
+    assert policy.mode("flaky-1") == FULL
+    assert all(policy.validation_for("flaky-1") == "full" for _ in range(20))
+    assert mode_metric("flaky-1", FULL) == 1.0
+    assert mode_metric("flaky-1", SAMPLED) == 0.0
+
+    policy.configure("flaky-1", SAMPLED)
+    assert policy.mode("flaky-1") == SAMPLED
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        ValidationPolicy("trusting")
+    with pytest.raises(ValueError):
+        ValidationPolicy(FULL, sources={"x": "sometimes"})
+
+
+def test_parse_sources():
+    assert parse_sources("10.0.0.5=sampled, radar-b=structural") == {
+        "10.0.0.5": "sampled",
+        "radar-b": "structural",
+    }
+    assert parse_sources("") == {}
+    with pytest.raises(ValueError):
+        parse_sources("10.0.0.5")
+
+
+def test_ingest_promotes_source_on_bad_sampled_packet():
+    received = []
+    policy = ValidationPolicy(sources={"10.1.2.3": SAMPLED}, sample_one_in=1000)
+    ingest = UdpIngest(received.append, records=True, validation=policy)
+    addr = ("10.1.2.3", 5000)
+
+    ingest._handle(pkt(), addr)  # first packet: fully validated sample
+    ingest._handle(pkt(range_m=-5.0), addr)  # unchecked: accepted as is
+    assert [m.payload.range_m for m in received] == [1200.0, -5.0]
+
+    ingest._handle(pkt(range_m="far"), addr)  # structurally bad
+    assert policy.mode("10.1.2.3") == FULL
+    ingest._handle(pkt(range_m=-5.0), addr)  # now rejected
+    assert len(received) == 2